@@ -1,3 +1,7 @@
-from . import xtal, mapping, xtallib, scripts
+import casmam._lazy as _lazy
 
 __all__ = ["xtal", "mapping", "xtallib", "scripts"]
+
+
+__getattr__ = _lazy.make_getattr(__name__, __all__)
+__dir__ = _lazy.make_dir(__name__, __all__)
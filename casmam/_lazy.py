@@ -0,0 +1,47 @@
+import sys
+import importlib
+
+
+def make_getattr(module_name: str, submodules: list[str]):
+    """Module ``__getattr__`` for the package ``module_name`` that
+    imports its ``submodules`` on first use, so that importing the
+    package does not import casm, numpy and pandas
+
+    Parameters
+    ----------
+    module_name : str
+        ``__name__`` of the package
+    submodules : list[str]
+        Names of the submodules to import lazily
+
+    Returns
+    -------
+    callable
+
+    """
+
+    def __getattr__(name):
+        if name in submodules:
+            return importlib.import_module("." + name, module_name)
+
+        raise AttributeError(
+            "module " + repr(module_name) + " has no attribute " + repr(name)
+        )
+
+    return __getattr__
+
+
+def make_dir(module_name: str, submodules: list[str]):
+    """Module ``__dir__`` for the package ``module_name`` that lists its
+    lazily imported ``submodules``, see :func:`make_getattr`
+
+    Returns
+    -------
+    callable
+
+    """
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[module_name])) | set(submodules))
+
+    return __dir__
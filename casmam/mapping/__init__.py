@@ -1,3 +1,20 @@
-from . import mapping
+import casmam._lazy as _lazy
 
-__all__ = ["mapping"]
+__all__ = [
+    "benchmark",
+    "cache",
+    "checkpoint",
+    "instrumentation",
+    "mapping",
+    "parents",
+    "prefilter",
+    "progress",
+    "scheduling",
+    "server",
+    "snapshot",
+    "store",
+]
+
+
+__getattr__ = _lazy.make_getattr(__name__, __all__)
+__dir__ = _lazy.make_dir(__name__, __all__)
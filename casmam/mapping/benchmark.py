@@ -0,0 +1,459 @@
+from __future__ import annotations
+
+import sys
+import json
+import time
+import typing
+import platform
+import subprocess
+import importlib.metadata
+import numpy as np
+import pandas as pd
+
+# casm and the modules that need it are imported only by the mapping
+# stages, so that startup can be timed, and results compared, without it
+if typing.TYPE_CHECKING:
+    import casm.xtal
+    import casmam.mapping.mapping as casmammapping
+    import casmam.mapping.parents as casmamparents
+
+# bump whenever the layout of benchmark results changes
+benchmark_format_version = 1
+
+# interpreter arguments of the startup stages, timed in fresh processes.
+# "python_startup" is the floor that the others cannot go below
+startup_commands = {
+    "python_startup": ["-c", "pass"],
+    "import_casmam": ["-c", "import casmam"],
+    "cli_help": ["-m", "casmam.scripts.casm_alloy_manager", "--help"],
+    "import_mapping": ["-c", "import casmam.mapping.mapping"],
+}
+
+
+def make_synthetic_child_structures(
+    parent_library: casmamparents.ParentLibrary,
+    n_children: int,
+    max_volume: int = 2,
+    strain: float = 0.02,
+    displacement: float = 0.05,
+    seed: int = 0,
+) -> tuple[list[casm.xtal.Structure], list[str]]:
+    """Child structures made from parents of ``parent_library``, each a
+    random supercell of a random parent with a random symmetric strain
+    and random displacements of its sites, decorated with two atom types
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+    n_children : int
+        Number of child structures
+    max_volume : int, optional
+        Largest supercell volume, in units of the parent volume
+    strain : float, optional
+        Standard deviation of the components of the strain
+    displacement : float, optional
+        Standard deviation in Angstrom of the displacement of each site
+        along each axis
+    seed : int, optional
+        Seed of the random number generator
+
+    Returns
+    -------
+    tuple[list[casm.xtal.Structure], list[str]]
+        Child structures, and made up casm style paths for them
+
+    """
+    import casmam.xtal.xtal as casmamxtal
+
+    rng = np.random.default_rng(seed)
+
+    child_structures = []
+    child_paths = []
+    for child_index in range(n_children):
+        prim = parent_library.prims[rng.integers(len(parent_library))]
+        supercell_size = np.ones(3, dtype=int)
+        supercell_size[rng.integers(3)] = rng.integers(1, max_volume + 1)
+
+        translations = np.array(
+            np.meshgrid(*[np.arange(size) for size in supercell_size], indexing="ij")
+        ).reshape(3, -1)
+        frac_coords = (
+            np.array(prim.coordinate_frac())[:, :, np.newaxis]
+            + translations[:, np.newaxis, :]
+        ).reshape(3, -1) / supercell_size[:, np.newaxis]
+
+        strain_tensor = rng.normal(0, strain, (3, 3))
+        lattice = (
+            (np.eye(3) + (strain_tensor + strain_tensor.T) / 2)
+            @ np.array(prim.lattice().column_vector_matrix())
+            @ np.diag(supercell_size)
+        )
+        frac_coords = frac_coords + np.linalg.solve(
+            lattice, rng.normal(0, displacement, frac_coords.shape)
+        )
+
+        n_sites = frac_coords.shape[1]
+        child_structures.append(
+            casmamxtal.casm_structure_from_structure_info(
+                lattice, frac_coords % 1.0, list(rng.choice(["A", "B"], n_sites))
+            )
+        )
+        child_paths.append(
+            "benchmark/training_data/SCEL"
+            + str(n_sites)
+            + "_"
+            + str(child_index)
+            + "/0/structure.json"
+        )
+
+    return child_structures, child_paths
+
+
+def time_function(function, *args, n_repeats: int = 3) -> list[float]:
+    """Wall-clock time of calling ``function(*args)`` ``n_repeats`` times
+
+    Returns
+    -------
+    list[float]
+        Time in seconds of each call
+
+    """
+    times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+def time_startup(arguments: list[str], n_repeats: int = 3) -> list[float]:
+    """Wall-clock time of running a fresh python interpreter with
+    ``arguments``, which includes every import it makes
+
+    Returns
+    -------
+    list[float]
+        Time in seconds of each run
+
+    """
+    return time_function(
+        lambda: subprocess.run(
+            [sys.executable, *arguments], capture_output=True, check=True
+        ),
+        n_repeats=n_repeats,
+    )
+
+
+def map_every_pair(
+    parent_library: casmamparents.ParentLibrary,
+    child_structures: list[casm.xtal.Structure],
+    child_paths: list[str],
+) -> list[list[list[casmammapping.MappingResult]]]:
+    """Map every child onto every parent with
+    :func:`casmam.mapping.mapping.map_child_structure_onto_parent_structure`,
+    without prefiltering, scheduling or caching, so that only the mapper
+    itself is timed
+
+    Returns
+    -------
+    list[list[list[MappingResult]]]
+        Mapping results of every child onto every parent
+
+    """
+    import casm.xtal
+    import casmam.mapping.mapping as casmammapping
+
+    mapping_results = []
+    for child_structure, child_path in zip(child_structures, child_paths):
+        child_fg = casm.xtal.make_structure_factor_group(child_structure)
+        mapping_results.append(
+            [
+                casmammapping.map_child_structure_onto_parent_structure(
+                    parent_library,
+                    parent_index,
+                    child_structure,
+                    child_fg,
+                    child_path,
+                )
+                for parent_index in range(len(parent_library))
+            ]
+        )
+
+    return mapping_results
+
+
+def get_package_version() -> str:
+    """Installed version of casm-alloy-manager, "unknown" if it is not
+    installed"""
+    try:
+        return importlib.metadata.version("casm-alloy-manager")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def run_benchmarks(
+    scales: list[int] = (10, 100),
+    library: str = "common",
+    n_repeats: int = 3,
+    max_mapped_children: int = 10,
+    seed: int = 0,
+    quiet=True,
+    startup_only: bool = False,
+) -> dict:
+    """Time the startup of the command line interface and of imports
+    (see :data:`startup_commands`), and the stages of a mapping run on
+    synthetic child structures (see
+    :func:`make_synthetic_child_structures`) made from a bundled parent
+    library: reading the parents with and without their binary index,
+    constructing factor groups, mapping (child, parent) pairs,
+    :func:`casmam.mapping.mapping.organize_mapping_results` and
+    :func:`casmam.mapping.mapping.analyze_mapping_data`. The stages
+    that depend on the number of children are timed at every scale.
+    Mapping is by far the slowest stage, so only up to
+    ``max_mapped_children`` children are mapped, once, and their results
+    are reused for the other children at larger scales
+
+    Parameters
+    ----------
+    scales : list[int], optional
+        Numbers of child structures
+    library : str, optional
+        Bundled parent library, "common" or "all"
+    n_repeats : int, optional
+        Number of times every stage other than mapping is timed
+    max_mapped_children : int, optional
+        Largest number of children mapped at any scale
+    seed : int, optional
+        Seed of the random number generator
+    quiet : bool, optional
+        If ``False``, report each stage as it is timed
+    startup_only : bool, optional
+        If ``True``, only time the startup
+
+    Returns
+    -------
+    dict
+        Description of the environment, and a record per stage and scale
+        with the time in seconds of every repeat. Can be written with
+        :func:`write_benchmark_results`
+
+    """
+    records = []
+
+    def add_record(name, scale, n_items, times):
+        records.append(
+            {
+                "name": name,
+                "scale": int(scale),
+                "n_items": int(n_items),
+                "seconds": times,
+            }
+        )
+        if not quiet:
+            print(
+                name
+                + " (scale "
+                + str(scale)
+                + "): "
+                + format(min(times), ".4g")
+                + " s, "
+                + format(min(times) / max(n_items, 1), ".4g")
+                + " s per item"
+            )
+
+    for name, arguments in startup_commands.items():
+        add_record(name, 1, 1, time_startup(arguments, n_repeats))
+
+    if not startup_only:
+        time_mapping_stages(
+            add_record, scales, library, n_repeats, max_mapped_children, seed
+        )
+
+    return {
+        "benchmark_format_version": benchmark_format_version,
+        "casmam_version": get_package_version(),
+        "python_version": platform.python_version(),
+        "numpy_version": np.__version__,
+        "pandas_version": pd.__version__,
+        "machine": platform.machine(),
+        "library": library,
+        "seed": seed,
+        "records": records,
+    }
+
+
+def time_mapping_stages(
+    add_record,
+    scales: list[int],
+    library: str,
+    n_repeats: int,
+    max_mapped_children: int,
+    seed: int,
+):
+    """Time the mapping stages of :func:`run_benchmarks`, passing the
+    name, scale, number of items and times of each to ``add_record``"""
+    import casm.xtal
+    import casmam.mapping.mapping as casmammapping
+    import casmam.mapping.parents as casmamparents
+
+    parent_paths = casmammapping.get_parent_library_paths(library)
+    add_record(
+        "load_parents_from_poscars",
+        len(parent_paths),
+        len(parent_paths),
+        time_function(
+            casmamparents.ParentLibrary.from_poscars, parent_paths, n_repeats=n_repeats
+        ),
+    )
+    parent_library = casmammapping.make_parent_library(library)
+    add_record(
+        "load_parents_from_index",
+        len(parent_library),
+        len(parent_library),
+        time_function(casmammapping.make_parent_library, library, n_repeats=n_repeats),
+    )
+    add_record(
+        "prim_factor_groups",
+        len(parent_library),
+        len(parent_library),
+        time_function(
+            lambda: [
+                casm.xtal.make_prim_factor_group(prim) for prim in parent_library.prims
+            ],
+            n_repeats=n_repeats,
+        ),
+    )
+
+    child_structures, child_paths = make_synthetic_child_structures(
+        parent_library, max(scales), seed=seed
+    )
+    child_structures = casmammapping.mask_child_structure_atom_types(child_structures)
+
+    n_mapped = min(max_mapped_children, max(scales))
+    start = time.perf_counter()
+    mapped_results = map_every_pair(
+        parent_library, child_structures[:n_mapped], child_paths[:n_mapped]
+    )
+    add_record(
+        "map_structures",
+        n_mapped,
+        n_mapped * len(parent_library),
+        [time.perf_counter() - start],
+    )
+
+    for scale in scales:
+        add_record(
+            "structure_factor_groups",
+            scale,
+            scale,
+            time_function(
+                lambda: [
+                    casm.xtal.make_structure_factor_group(child_structure)
+                    for child_structure in child_structures[:scale]
+                ],
+                n_repeats=n_repeats,
+            ),
+        )
+
+        # mappings are kept, so that organizing handles as much as a real run
+        mapping_results = [
+            casmammapping.copy_mapping_results_for_child(
+                mapped_results[child_index % n_mapped],
+                child_paths[child_index],
+                keep_mappings=True,
+            )
+            for child_index in range(scale)
+        ]
+        add_record(
+            "organize_mapping_results",
+            scale,
+            scale,
+            time_function(
+                casmammapping.organize_mapping_results,
+                mapping_results,
+                n_repeats=n_repeats,
+            ),
+        )
+
+        mapping_data = casmammapping.organize_mapping_results(mapping_results)
+        add_record(
+            "analyze_mapping_data",
+            scale,
+            scale,
+            time_function(
+                casmammapping.analyze_mapping_data, mapping_data, n_repeats=n_repeats
+            ),
+        )
+
+
+def write_benchmark_results(results: dict, path: str):
+    """Write the output of :func:`run_benchmarks` to a json file"""
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def read_benchmark_results(path: str) -> dict:
+    """Read a json file written by :func:`write_benchmark_results`
+
+    Raises
+    ------
+    RuntimeError
+        If the file has an unknown format version
+
+    """
+    with open(path, "r") as f:
+        results = json.load(f)
+
+    if results.get("benchmark_format_version") != benchmark_format_version:
+        raise RuntimeError(
+            "Benchmark results " + str(path) + " have an unknown format version"
+        )
+
+    return results
+
+
+def compare_benchmark_results(
+    baseline: dict, results: dict, tolerance: float = 0.2
+) -> pd.DataFrame:
+    """Compare the best time of every stage and scale timed in both
+    ``baseline`` and ``results``, e.g. of two versions
+
+    Parameters
+    ----------
+    baseline : dict
+        Output of :func:`run_benchmarks` to compare to
+    results : dict
+        Output of :func:`run_benchmarks` to compare
+    tolerance : float, optional
+        Relative slowdown above which a stage counts as a regression
+
+    Returns
+    -------
+    pd.DataFrame
+        Best time in seconds of the baseline and of the results, their
+        ratio and whether it is a regression, indexed by stage and scale
+
+    """
+
+    def get_best_times(benchmark_results):
+        return {
+            (record["name"], record["scale"]): min(record["seconds"])
+            for record in benchmark_results["records"]
+        }
+
+    baseline_times = get_best_times(baseline)
+    times = get_best_times(results)
+    comparison = pd.DataFrame(
+        [
+            [name, scale, baseline_times[(name, scale)], times[(name, scale)]]
+            for name, scale in times
+            if (name, scale) in baseline_times
+        ],
+        columns=["name", "scale", "baseline_seconds", "seconds"],
+    ).set_index(["name", "scale"])
+    comparison["ratio"] = comparison["seconds"] / comparison["baseline_seconds"]
+    comparison["regression"] = comparison["ratio"] > 1 + tolerance
+
+    return comparison
@@ -0,0 +1,276 @@
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+# bump whenever the cached objects or the meaning of keys change
+cache_format_version = 1
+
+
+def default_cache_directory() -> str:
+    """Directory of the mapping cache, ``$CASMAM_CACHE_DIR`` if set and
+    ``~/.cache/casmam/mappings`` otherwise
+
+    Returns
+    -------
+    str
+
+    """
+    if "CASMAM_CACHE_DIR" in os.environ:
+        return os.environ["CASMAM_CACHE_DIR"]
+
+    return os.path.join(os.path.expanduser("~"), ".cache", "casmam", "mappings")
+
+
+class MappingCache:
+
+    """On-disk cache of mapping results of (child, parent) pairs, shared
+    across runs and projects. Entries are keyed by content hashes of the
+    masked child structure, of the parent structure and of the mapping
+    options, so paths and names play no role. When the cache grows over
+    ``max_size`` bytes, the least recently used entries are evicted.
+    Several processes can use the same cache directory at once
+
+    Attributes
+    ----------
+    directory : str
+        Directory where entries are stored
+    max_size : int
+        Size in bytes above which entries are evicted
+    hits : int
+        Number of lookups that found an entry
+    misses : int
+        Number of lookups that did not
+    writes : int
+        Number of entries written
+    evictions : int
+        Number of entries evicted
+
+    """
+
+    def __init__(self, directory: str = None, max_size: int = 2**30):
+        """Open (or create) the cache in ``directory``
+
+        Parameters
+        ----------
+        directory : str, optional
+            Directory of the cache. By default uses
+            :func:`default_cache_directory`
+        max_size : int, optional
+            Size in bytes above which entries are evicted. 1 GiB by default
+
+        """
+        if directory is None:
+            directory = default_cache_directory()
+
+        self.directory = str(directory)
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.size = sum(entry[2] for entry in self.entries())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # counters of a copy, e.g. in a worker process, start from zero
+        for counter in ["hits", "misses", "writes", "evictions"]:
+            state[counter] = 0
+
+        return state
+
+    @staticmethod
+    def make_key(
+        child_content_hash: str, parent_content_hash: str, mapping_options: dict
+    ) -> str:
+        """Key of the entry for a (child, parent) pair
+
+        Parameters
+        ----------
+        child_content_hash : str
+            :func:`casmam.xtal.xtal.make_structure_content_hash` of the
+            masked child structure
+        parent_content_hash : str
+            :func:`casmam.xtal.xtal.make_structure_content_hash` of the
+            parent structure
+        mapping_options : dict
+            Mapping options
+
+        Returns
+        -------
+        str
+            Hexadecimal key
+
+        """
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    cache_format_version,
+                    child_content_hash,
+                    parent_content_hash,
+                    mapping_options,
+                ],
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+
+    def path(self, key: str) -> str:
+        """Path of the file holding the entry for ``key``"""
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    def get(self, key: str):
+        """Look up an entry and mark it as recently used
+
+        Parameters
+        ----------
+        key : str
+            Key from :meth:`make_key`
+
+        Returns
+        -------
+        Any | None
+            Cached value, ``None`` if there is no entry
+
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # missing, being evicted by someone else, or partially written
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value):
+        """Store an entry, evicting old entries if the cache is full
+
+        Parameters
+        ----------
+        key : str
+            Key from :meth:`make_key`
+        value : Any
+            Picklable value to store
+
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temporary file first so readers never see half an entry
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp"
+        )
+        with os.fdopen(file_descriptor, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(temporary_path)
+        # an entry that is replaced no longer counts
+        try:
+            size -= os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+        os.replace(temporary_path, path)
+
+        self.writes += 1
+        self.size += size
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self) -> list[tuple[str, float, int]]:
+        """Every entry in the cache
+
+        Returns
+        -------
+        list[tuple[str, float, int]]
+            Path, last use time and size in bytes of every entry
+
+        """
+        entries = []
+        for subdirectory in os.scandir(self.directory):
+            if not subdirectory.is_dir():
+                continue
+
+            for entry in os.scandir(subdirectory.path):
+                if not entry.name.endswith(".pkl"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache is at most
+        90 % of ``max_size``, so that eviction does not run on every
+        write"""
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        self.size = sum(entry[2] for entry in entries)
+
+        for path, _, size in entries:
+            if self.size <= 0.9 * self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+            self.evictions += 1
+
+    def add_stats(self, stats: dict):
+        """Add counters from :meth:`pop_stats` of a copy of this cache,
+        e.g. in a worker process"""
+        for counter, value in stats.items():
+            setattr(self, counter, getattr(self, counter) + value)
+
+    def pop_stats(self) -> dict:
+        """Return the counters and reset them to zero
+
+        Returns
+        -------
+        dict
+
+        """
+        stats = {
+            counter: getattr(self, counter)
+            for counter in ["hits", "misses", "writes", "evictions"]
+        }
+        for counter in stats:
+            setattr(self, counter, 0)
+
+        return stats
+
+    def report(self) -> str:
+        """Summary of cache usage
+
+        Returns
+        -------
+        str
+
+        """
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups != 0 else 0.0
+
+        return (
+            "Mapping cache "
+            + self.directory
+            + ": "
+            + str(self.hits)
+            + " hits, "
+            + str(self.misses)
+            + " misses ("
+            + format(hit_rate, ".1%")
+            + " hit rate), "
+            + str(self.writes)
+            + " writes, "
+            + str(self.evictions)
+            + " evictions, "
+            + format(self.size / 2**20, ".1f")
+            + " MiB in use"
+        )
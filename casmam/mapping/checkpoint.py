@@ -0,0 +1,169 @@
+import os
+import pickle
+
+# bump whenever the layout of checkpoint files changes
+checkpoint_format_version = 2
+
+
+class MappingCheckpoint:
+
+    """Append-only file of the mapping results of every child structure
+    that has finished, so that a run that dies can be resumed without
+    mapping those children again. The file starts with a header
+    describing the run, followed by one record per child: its pickled
+    path and the size of its results, then its pickled results. A record
+    that was only partially written when the run died is dropped when
+    the checkpoint is resumed. Only the paths of the children in the
+    checkpoint are kept in memory, their results are read back from the
+    file when needed, see :meth:`load_results`
+
+    Attributes
+    ----------
+    path : str
+        Path of the checkpoint file
+    run_description : dict
+        Everything the results depend on other than the child
+        structures, e.g. parent structures and mapping options. A
+        checkpoint can only be resumed by a run with the same description
+    record_offsets : dict[str, int]
+        Position in the file of the record of every child in the
+        checkpoint, by child path
+
+    """
+
+    def __init__(self, path: str, run_description: dict, resume: bool = False):
+        """Start a new checkpoint, or resume an existing one
+
+        Parameters
+        ----------
+        path : str
+            Path of the checkpoint file
+        run_description : dict
+            Description of the run, see ``run_description``
+        resume : bool, optional
+            If ``True`` and ``path`` exists, find the children already in
+            it and append to it. Otherwise ``path`` is overwritten
+
+        Raises
+        ------
+        RuntimeError
+            If resuming a checkpoint written by a different run
+
+        """
+        self.path = str(path)
+        self.run_description = run_description
+        self.record_offsets = {}
+
+        if resume and os.path.exists(self.path):
+            self.read()
+        else:
+            with open(self.path, "wb") as f:
+                pickle.dump(
+                    (checkpoint_format_version, run_description),
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+
+    @property
+    def completed(self):
+        """Paths of the children in the checkpoint"""
+        return self.record_offsets.keys()
+
+    def read(self):
+        """Read the header and find every complete record of the
+        checkpoint file, without reading the results in them, and cut
+        off a trailing partial record so that new records are appended
+        after the last complete one
+
+        Raises
+        ------
+        RuntimeError
+            If the checkpoint was written by a different run
+
+        """
+        file_size = os.path.getsize(self.path)
+        with open(self.path, "rb+") as f:
+            try:
+                version, run_description = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError, ValueError):
+                raise RuntimeError(
+                    "Could not read the header of checkpoint " + self.path
+                ) from None
+
+            if (
+                version != checkpoint_format_version
+                or run_description != self.run_description
+            ):
+                raise RuntimeError(
+                    "Checkpoint "
+                    + self.path
+                    + " was written by a different mapping run (other parent "
+                    + "structures or mapping settings), cannot resume it"
+                )
+
+            end_of_last_record = f.tell()
+            while True:
+                try:
+                    child_path, n_bytes = pickle.load(f)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, AttributeError):
+                    # partially written when the run died
+                    break
+
+                if f.tell() + n_bytes > file_size:
+                    # results partially written when the run died
+                    break
+
+                self.record_offsets[child_path] = end_of_last_record
+                f.seek(n_bytes, os.SEEK_CUR)
+                end_of_last_record = f.tell()
+
+            f.truncate(end_of_last_record)
+
+    def append(self, child_path: str, mapping_results: list[list]):
+        """Write the results of one child to disk before returning
+
+        Parameters
+        ----------
+        child_path : str
+            Path of the child structure
+        mapping_results : list[list[MappingResult]]
+            Mapping results of the child onto every parent
+
+        """
+        results = pickle.dumps(mapping_results, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(
+                pickle.dumps(
+                    (child_path, len(results)), protocol=pickle.HIGHEST_PROTOCOL
+                )
+                + results
+            )
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.record_offsets[child_path] = offset
+
+    def load_results(self, child_paths: list[str]):
+        """Read the results of children in the checkpoint back from the
+        file, one child at a time
+
+        Parameters
+        ----------
+        child_paths : list[str]
+            Paths of children in the checkpoint
+
+        Yields
+        ------
+        list[list[MappingResult]]
+            Mapping results of each child onto every parent, in the order
+            of ``child_paths``
+
+        """
+        with open(self.path, "rb") as f:
+            for child_path in child_paths:
+                f.seek(self.record_offsets[child_path])
+                _, n_bytes = pickle.load(f)
+                yield pickle.loads(f.read(n_bytes))
@@ -0,0 +1,240 @@
+import time
+import json
+import contextlib
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, memory is then not recorded
+    resource = None
+
+
+def get_max_rss() -> float:
+    """High-water mark of the resident memory of this process in MiB,
+    NaN where it cannot be measured"""
+    if resource is None:
+        return float("nan")
+
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+class MappingProfile:
+
+    """Opt-in record of where the time of a mapping run goes: wall time
+    of each phase (reading children, factor groups, organizing results,
+    ...) and of every (child, parent) pair, with its number of maps.
+    Copies in worker processes record on their own, and their records
+    are collected with :meth:`pop_records` and :meth:`add_records`
+
+    Attributes
+    ----------
+    phases : dict[str, list]
+        Total wall time in seconds and number of calls of each phase
+    pairs : list[list]
+        Child path, parent path, wall time in seconds, number of maps,
+        whether the pair was found in the cache and whether it timed out,
+        of every mapped pair
+    max_rss : float
+        Highest memory high-water mark in MiB of the processes that
+        recorded, see :func:`get_max_rss`
+
+    """
+
+    pair_columns = [
+        "child_path",
+        "parent_path",
+        "seconds",
+        "n_maps",
+        "cached",
+        "timed_out",
+    ]
+
+    def __init__(self):
+        self.phases = {}
+        self.pairs = []
+        self.max_rss = get_max_rss()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Context manager adding its wall time to the phase ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float, n_calls: int = 1):
+        """Add wall time to the phase ``name``"""
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += seconds
+        phase[1] += n_calls
+
+    def add_pair(
+        self,
+        child_path: str,
+        parent_path: str,
+        seconds: float,
+        n_maps: int,
+        cached: bool = False,
+        timed_out: bool = False,
+    ):
+        """Record the wall time of mapping one (child, parent) pair"""
+        self.pairs.append([child_path, parent_path, seconds, n_maps, cached, timed_out])
+
+    def pop_records(self) -> dict:
+        """Return everything recorded and start over, e.g. to send the
+        records of a worker process to the main process
+
+        Returns
+        -------
+        dict
+
+        """
+        records = {
+            "phases": self.phases,
+            "pairs": self.pairs,
+            "max_rss": get_max_rss(),
+        }
+        self.phases = {}
+        self.pairs = []
+
+        return records
+
+    def add_records(self, records: dict):
+        """Add records from :meth:`pop_records` of another profile"""
+        for name, (seconds, n_calls) in records["phases"].items():
+            self.add_phase(name, seconds, n_calls)
+        self.pairs.extend(records["pairs"])
+        self.max_rss = max(self.max_rss, records["max_rss"])
+
+    def get_pair_table(self) -> pd.DataFrame:
+        """Table of the pairs, one row per mapped pair
+
+        Returns
+        -------
+        pd.DataFrame
+
+        """
+        return pd.DataFrame(self.pairs, columns=self.pair_columns)
+
+    def get_phase_table(self) -> pd.DataFrame:
+        """Table of the phases, one row per phase
+
+        Returns
+        -------
+        pd.DataFrame
+
+        """
+        return pd.DataFrame(
+            [
+                [name, seconds, n_calls]
+                for name, (seconds, n_calls) in self.phases.items()
+            ],
+            columns=["phase", "seconds", "n_calls"],
+        )
+
+    def write(self, path: str):
+        """Write the records to ``path``. A .json file gets the phases,
+        pairs and memory high-water mark, any other file gets the table
+        of pairs as csv
+
+        Parameters
+        ----------
+        path : str
+            Path of the output file
+
+        """
+        if not path.endswith(".json"):
+            self.get_pair_table().to_csv(path, index=False)
+            return
+
+        self.max_rss = max(self.max_rss, get_max_rss())
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "phases": self.get_phase_table().to_dict(orient="records"),
+                    "pairs": self.get_pair_table().to_dict(orient="records"),
+                    "max_rss_mib": self.max_rss,
+                },
+                f,
+                indent=2,
+            )
+
+    def summary(self, n_slowest: int = 5) -> str:
+        """Wall time of every phase and of all pairs, the memory
+        high-water mark, and the parents and children that took longest
+        to map in total
+
+        Parameters
+        ----------
+        n_slowest : int, optional
+            Number of parents and children to list
+
+        Returns
+        -------
+        str
+
+        """
+        self.max_rss = max(self.max_rss, get_max_rss())
+        pairs = self.get_pair_table()
+
+        lines = ["Mapping profile:"]
+        for name, (seconds, n_calls) in self.phases.items():
+            lines.append(
+                "  "
+                + name
+                + ": "
+                + format(seconds, ".3f")
+                + " s in "
+                + str(n_calls)
+                + " calls"
+            )
+        lines.append(
+            "  mapping "
+            + str(len(pairs))
+            + " pairs: "
+            + format(pairs["seconds"].sum(), ".3f")
+            + " s, "
+            + str(int(pairs["n_maps"].sum()))
+            + " maps, "
+            + str(int(pairs["cached"].sum()))
+            + " from cache, "
+            + str(int(pairs["timed_out"].sum()))
+            + " timed out"
+        )
+        lines.append(
+            "  memory high-water mark: " + format(self.max_rss, ".1f") + " MiB"
+        )
+
+        for column, label in [("parent_path", "parents"), ("child_path", "children")]:
+            slowest = (
+                pairs.groupby(column)["seconds"]
+                .sum()
+                .sort_values(ascending=False)
+                .head(n_slowest)
+            )
+            lines.append("  slowest " + label + ":")
+            for path, seconds in slowest.items():
+                lines.append("    " + format(seconds, ".3f") + " s  " + str(path))
+
+        return "\n".join(lines)
+
+
+def profile_phase(profile: MappingProfile | None, name: str):
+    """:meth:`MappingProfile.phase` if there is a profile, and a context
+    manager that does nothing otherwise
+
+    Parameters
+    ----------
+    profile : MappingProfile | None
+        Profile of the run, if any
+    name : str
+        Name of the phase
+
+    """
+    if profile is None:
+        return contextlib.nullcontext()
+
+    return profile.phase(name)
@@ -1,21 +1,58 @@
 import os
+import re
+import copy
 import json
+import time
+import heapq
+import concurrent.futures
 import casm.xtal
 import numpy as np
 import pandas as pd
 import importlib.resources
 import casmam.xtal.xtal as casmamxtal
+import casmam.mapping.cache as casmamcache
+import casmam.mapping.checkpoint as casmamcheckpoint
+import casmam.mapping.instrumentation as casmaminstrumentation
+import casmam.mapping.progress as casmamprogress
+import casmam.mapping.parents as casmamparents
+import casmam.mapping.prefilter as casmamprefilter
+import casmam.mapping.scheduling as casmamscheduling
+import casmam.mapping.snapshot as casmamsnapshot
 import casm.mapping.info as mapperinfo
 import casm.mapping.methods as mappermethods
 
+# whitespace between json values
+_json_whitespace = re.compile(r"[ \t\n\r]*")
+# the end of a buffer that cuts off a literal, number or escape sequence
+_json_token_fragment = re.compile(r"[\\\w.+-]{1,6}")
+
 
 class MappingResult:
 
     """An object containing all the mapping result
-    info and which can be dumped as a picke
+    info and which can be dumped as a picke. Attributes are in
+    ``__slots__``, since there is one ``MappingResult`` per map of every
+    (child, parent) pair
 
     """
 
+    __slots__ = [
+        "parent_path",
+        "child_path",
+        "atomic_cost",
+        "lattice_cost",
+        "total_cost",
+        "deformation_gradient",
+        "transformation_matrix_to_super",
+        "reorientation",
+        "isometry",
+        "left_stretch",
+        "displacement",
+        "permutation",
+        "translation",
+        "timed_out",
+    ]
+
     def __init__(self):
         """TODO: to be defined."""
         self.parent_path = "not available"
@@ -40,6 +77,44 @@ class MappingResult:
         self.permutation = np.nan
         self.translation = np.nan
 
+        # set if mapping was abandoned after exceeding its time budget
+        self.timed_out = False
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: dict):
+        """Also reads pickles written before ``MappingResult`` had
+        ``__slots__``, e.g. in older hdf5 files, caches and checkpoints,
+        whose state is the instance ``__dict__``. Attributes missing from
+        older pickles keep their defaults
+
+        Parameters
+        ----------
+        state : dict
+            Attribute values
+
+        """
+        if isinstance(state, tuple):
+            dict_state, slot_state = state
+            state = dict(dict_state or {}, **(slot_state or {}))
+
+        self.__init__()
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def has_mappings(self) -> bool:
+        """Returns if lattice and atom mappings were kept, which is not
+        the case for dummies or results mapped with ``costs_only`` (see
+        :func:`default_mapping_options`)
+
+        Returns
+        -------
+        bool
+
+        """
+        return np.ndim(self.permutation) != 0
+
     def is_dummy(self):
         """Returns if MappingResult is a dummy
 
@@ -62,6 +137,28 @@ class MappingResult:
         string += str(self.total_cost)
         return string
 
+    @classmethod
+    def dummy(cls, parent_path="not available", child_path="not available"):
+        """Dummy ``MappingResult`` for a pair with no valid map
+
+        Parameters
+        ----------
+        parent_path : str, optional
+            Path of the parent structure
+        child_path : str, optional
+            Path of the child structure
+
+        Returns
+        -------
+        MappingResult
+
+        """
+        result = cls()
+        result.parent_path = parent_path
+        result.child_path = child_path
+
+        return result
+
     @classmethod
     def from_casm_mapping_result(
         cls,
@@ -70,12 +167,16 @@ class MappingResult:
         ],
         parent_path="Not available",
         child_path="Not available",
+        costs_only: bool = False,
     ):
         """TODO: Docstring for from_casm_mapping_result.
 
         Parameters
         ----------
         casm_mapping_result: TODO
+        costs_only : bool, optional
+            If ``True``, only keep the costs, leaving the lattice and
+            atom mapping attributes unset
 
         Returns
         -------
@@ -92,11 +193,14 @@ class MappingResult:
         result.lattice_cost = casm_mapping_result[0].lattice_cost()
         result.total_cost = casm_mapping_result[0].total_cost()
 
+        if costs_only:
+            return result
+
         # populate lattice mapping attributes
         lattice_mapping = casm_mapping_result[1].lattice_mapping()
         result.deformation_gradient = lattice_mapping.deformation_gradient()
-        result.transformation_matrix_to_super = (
-            lattice_mapping.transformation_matrix_to_super()
+        result.transformation_matrix_to_super = np.asarray(
+            lattice_mapping.transformation_matrix_to_super(), dtype=np.int32
         )
         result.reorientation = lattice_mapping.reorientation()
         result.isometry = lattice_mapping.isometry()
@@ -105,7 +209,7 @@ class MappingResult:
         # populate atom mapping attributes
         atom_mapping = casm_mapping_result[1].atom_mapping()
         result.displacement = atom_mapping.displacement()
-        result.permutation = atom_mapping.permutation()
+        result.permutation = np.asarray(atom_mapping.permutation(), dtype=np.int32)
         result.translation = atom_mapping.translation()
 
         return result
@@ -138,6 +242,70 @@ def get_casm_root_dir() -> str:
             cwd = os.path.dirname(cwd)
 
 
+def get_parent_library_paths(library: str) -> list[str]:
+    """Paths of the POSCAR files of one of the bundled libraries of
+    parent crystal structures, in a fixed order
+
+    Parameters
+    ----------
+    library : str
+        "common" for BCC, FCC, HCP, Omega, SC, DHCP or "all" for those
+        followed by the rest of Sanjeev's database
+
+    Returns
+    -------
+    list[str]
+
+    Raises
+    ------
+    RuntimeError
+        If ``library`` is an invalid library name
+
+    """
+    if library not in ["common", "all"]:
+        raise RuntimeError("Invalid library (" + library + ") of structures")
+
+    packages = ["casmam.xtallib.common"]
+    if library == "all":
+        packages.append("casmam.xtallib")
+
+    paths = []
+    for package in packages:
+        paths += sorted(
+            str(file)
+            for file in importlib.resources.files(package).iterdir()
+            if ".vasp" in str(file)
+        )
+
+    return paths
+
+
+def get_parent_library_index_path(library: str) -> str:
+    """Path of the binary index of one of the bundled libraries of
+    parent crystal structures (see
+    :meth:`casmam.mapping.parents.ParentLibrary.save_index`). The index
+    is kept next to the library, or in ``~/.cache/casmam/xtallib`` if the
+    installation is not writable
+
+    Parameters
+    ----------
+    library : str
+        "common" or "all"
+
+    Returns
+    -------
+    str
+
+    """
+    library_dir = str(importlib.resources.files("casmam.xtallib"))
+    if os.access(library_dir, os.W_OK):
+        index_dir = library_dir
+    else:
+        index_dir = os.path.join(os.path.expanduser("~"), ".cache", "casmam", "xtallib")
+
+    return os.path.join(index_dir, "." + library + "_index.npz")
+
+
 def default_parent_crystal_structures_with_paths() -> tuple[
     list[casm.xtal.Prim], list[str]
 ]:
@@ -149,17 +317,8 @@ def default_parent_crystal_structures_with_paths() -> tuple[
         A list of casm ``Prim`` which can be used as an input for mapping
 
     """
-    prims_with_names = [
-        (
-            casm.xtal.Prim.from_poscar(str(file)),
-            str(file),
-        )
-        for file in importlib.resources.files("casmam.xtallib.common").iterdir()
-        if ".vasp" in str(file)
-    ]
-
-    prims = [entry[0] for entry in prims_with_names]
-    paths = [entry[1] for entry in prims_with_names]
+    paths = get_parent_library_paths("common")
+    prims = [casm.xtal.Prim.from_poscar(path) for path in paths]
 
     return prims, paths
 
@@ -175,22 +334,50 @@ def all_parent_crystal_structures_with_paths() -> tuple[
     List[casm.xtal.Prim]
 
     """
-    prims_with_names = default_parent_crystal_structures_with_paths()
-    prims_with_names += [
-        (
-            casm.xtal.Prim.from_poscar(str(file)),
-            str(file),
-        )
-        for file in importlib.resources.files("casmam.xtallib").iterdir()
-        if ".vasp" in str(file)
-    ]
-
-    prims = [entry[0] for entry in prims_with_names]
-    paths = [entry[2] for entry in prims_with_names]
+    paths = get_parent_library_paths("all")
+    prims = [casm.xtal.Prim.from_poscar(path) for path in paths]
 
     return prims, paths
 
 
+def make_parent_library(
+    parent_paths: str | list[str] | casmamparents.ParentLibrary,
+) -> casmamparents.ParentLibrary:
+    """Construct a ``ParentLibrary`` from either the name of one of the
+    bundled libraries ("common" or "all") or a list of POSCAR paths.
+    Bundled libraries are read from their binary index (see
+    :func:`get_parent_library_index_path`), which is rebuilt whenever
+    one of their POSCAR files changes. A ``ParentLibrary`` is returned
+    as it is, so that one that is already loaded can be passed on
+
+    Parameters
+    ----------
+    parent_paths : str | list[str] | casmam.mapping.parents.ParentLibrary
+        "common", "all", a list of paths to parent POSCAR files or a
+        parent library
+
+    Returns
+    -------
+    casmam.mapping.parents.ParentLibrary
+
+    Raises
+    ------
+    RuntimeError
+        If ``parent_paths`` is an invalid library name
+
+    """
+    if isinstance(parent_paths, casmamparents.ParentLibrary):
+        return parent_paths
+
+    if isinstance(parent_paths, str):
+        return casmamparents.ParentLibrary.from_poscars(
+            get_parent_library_paths(parent_paths),
+            get_parent_library_index_path(parent_paths),
+        )
+
+    return casmamparents.ParentLibrary.from_poscars(parent_paths)
+
+
 def max_vol(parent: casm.xtal.Prim, child: casm.xtal.Structure) -> int | None:
     """Returns if number of atoms in child is divisible by number of atoms
     in parent structure. Mapping algorithm by default finds supercells of parent,
@@ -248,270 +435,2700 @@ def mask_child_structure_atom_types(
     ]
 
 
-def get_child_structures(child_paths: list[str]) -> list[casm.xtal.Structure]:
-    """Given a list of child paths, if the file type is json,
-    it assumes it's of proeprties.calc.json/structure.json type
-    and constructs a casm ``Structure``
+def read_child_structure(child_path: str) -> casm.xtal.Structure:
+    """If the file type of ``child_path`` is json, it assumes it's of
+    properties.calc.json/structure.json type and constructs a casm
+    ``Structure``
 
     Parameters
     ----------
-    child_paths : list[str]
-        List of child paths
+    child_path : str
+        Path of the child structure
 
     Returns
     -------
-    list[casm.xtal.Structure]
-        List of casm ``Structure`` objects
+    casm.xtal.Structure
 
     """
-    child_structures = []
-    for child_path in child_paths:
-        if ".json" in os.path.basename(child_path):
-            with open(child_path, "r") as f:
-                properties_dictionary = json.load(f)
-
-            child_structures.append(
-                casmamxtal.casm_structure_from_properties_json(properties_dictionary)
-            )
-        else:
-            raise NotImplementedError(
-                "Reading child structures from POSCAR not implemented yet"
-            )
-
-    return child_structures
+    return casmamxtal.casm_structure_from_structure_info(
+        *read_child_structure_infos([child_path])[0]
+    )
 
 
-def get_properties_json_paths(
-    config_names: list[str], calctype="default", relaxed=True
-):
-    """TODO: Docstring for get_properties_json_paths.
+def read_structure_keys(child_path: str) -> dict:
+    """Read the :data:`casmam.xtal.xtal.structure_keys` of a
+    properties.calc.json/structure.json file, dropping everything else
+    (e.g. forces) as soon as the file is parsed
 
     Parameters
     ----------
-    config_names : TODO
+    child_path : str
+        Path of the child structure
 
     Returns
     -------
-    TODO
+    dict
 
     """
-    casm_root_dir = get_casm_root_dir()
-    if relaxed:
-        return [
-            os.path.join(
-                casm_root_dir,
-                "training_data",
-                config_name,
-                "calctype." + calctype,
-                "properties.calc.json",
-            )
-            for config_name in config_names
-        ]
+    if ".json" not in os.path.basename(child_path):
+        raise NotImplementedError(
+            "Reading child structures from POSCAR not implemented yet"
+        )
 
-    else:
-        return [
-            os.path.join(casm_root_dir, "training_data", config_name, "structure.json")
-            for config_name in config_names
-        ]
+    with open(child_path, "rb") as f:
+        properties_dictionary = json.loads(f.read())
 
+    return {key: properties_dictionary[key] for key in casmamxtal.structure_keys}
 
-# TODO: Currently only works if child_paths is a list of .json files
-# TODO: If child_paths is poscar types it doesn't work, needs implementing Structure.from_poscar
-# TODO: Need to add shorten parent paths argmument
-def map_configurations_onto_parent_structures(
+
+def read_child_structure_infos(
     child_paths: list[str],
-    parent_paths: str | list[str],
-    quiet=False,
-    **kwargs,
-):
-    """Top-level function that constructs child structures,
-    parent structures and maps them onto each other
+    n_threads: int = 8,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+) -> list[tuple[np.ndarray, np.ndarray, list[str]]]:
+    """Read child structures as the plain arrays of
+    :func:`casmam.xtal.xtal.get_structure_info_from_casm_structure`.
+    Files are read by ``n_threads`` threads at once, which hides the
+    latency of network filesystems, and coordinates of all children are
+    converted at once with
+    :func:`casmam.xtal.xtal.get_structure_infos_from_properties_jsons`
 
     Parameters
     ----------
-    child_paths : TODO
-    parent_paths : TODO
-    **kwargs : TODO
+    child_paths : list[str]
+        Paths of properties.calc.json/structure.json files
+    n_threads : int, optional
+        Number of files read at once
+    snapshot : casmam.mapping.snapshot.ChildStructureSnapshot, optional
+        Snapshot that children are taken from instead of their files.
+        Only children missing from it, or whose file changed since it was
+        taken, are read
 
     Returns
     -------
-    TODO
+    list[tuple[np.ndarray, np.ndarray, list[str]]]
+        Lattice, fractional coordinates and atom types of each child
 
     """
-    # sanitize kwargs
-    if isinstance(parent_paths, str):
-        if parent_paths == "common":
-            (
-                parent_structures,
-                parent_paths,
-            ) = default_parent_crystal_structures_with_paths()
+    if snapshot is None:
+        return read_child_structure_files(child_paths, n_threads)
+
+    child_structure_infos = snapshot.get_structure_infos(child_paths)
+    unread_indices = [
+        child_index
+        for child_index, child_structure_info in enumerate(child_structure_infos)
+        if child_structure_info is None
+    ]
+    for child_index, child_structure_info in zip(
+        unread_indices,
+        read_child_structure_files(
+            [child_paths[child_index] for child_index in unread_indices], n_threads
+        ),
+    ):
+        child_structure_infos[child_index] = child_structure_info
 
-        elif parent_paths == "all":
-            parent_structures, parent_paths = all_parent_crystal_structures_with_paths()
+    return child_structure_infos
 
-        else:
-            raise RuntimeError("Invalid library (" + parent_paths + ") of structures")
 
-    if isinstance(parent_paths, list):
-        parent_structures = [
-            casm.xtal.Prim.from_poscar(parent_path) for parent_path in parent_paths
+def read_child_structure_files(
+    child_paths: list[str], n_threads: int = 8
+) -> list[tuple[np.ndarray, np.ndarray, list[str]]]:
+    """:func:`read_child_structure_infos` from the files themselves"""
+    if n_threads <= 1 or len(child_paths) <= 1:
+        properties_dictionaries = [
+            read_structure_keys(child_path) for child_path in child_paths
         ]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+            properties_dictionaries = list(
+                executor.map(read_structure_keys, child_paths)
+            )
 
-    # parent_paths = [os.path.basename(path) for path in parent_paths]
+    return casmamxtal.get_structure_infos_from_properties_jsons(properties_dictionaries)
 
-    child_structures = get_child_structures(child_paths)
-    masked_child_structures = mask_child_structure_atom_types(child_structures)
 
-    mapping_results = map_child_structures_onto_parent_structures(
-        parent_structures, masked_child_structures, parent_paths, child_paths, quiet
-    )
-    mapping_results = organize_mapping_results(mapping_results)
+def iter_child_structure_infos(
+    child_paths: list[str],
+    batch_size: int = 64,
+    n_threads: int = 8,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+):
+    """:func:`read_child_structure_infos` of every child, one at a time.
+    Children are read ``batch_size`` at a time, and the next batch is
+    read in the background while the current one is used, e.g. mapped.
+    Children are taken from ``snapshot`` where it is up to date
 
-    return mapping_results
+    Yields
+    ------
+    tuple[np.ndarray, np.ndarray, list[str]]
+        Lattice, fractional coordinates and atom types of each child, in
+        the order of ``child_paths``
 
+    """
+    batches = [
+        child_paths[start : start + batch_size]
+        for start in range(0, len(child_paths), batch_size)
+    ]
+    if len(batches) == 0:
+        return
 
-def default_mapping_options() -> dict:
-    """Returns a dictionary of default mapping options
-    used
+    with concurrent.futures.ThreadPoolExecutor(1) as prefetcher:
+        future = prefetcher.submit(
+            read_child_structure_infos, batches[0], n_threads, snapshot
+        )
+        for next_batch in batches[1:] + [None]:
+            child_structure_infos = future.result()
+            if next_batch is not None:
+                future = prefetcher.submit(
+                    read_child_structure_infos, next_batch, n_threads, snapshot
+                )
+
+            yield from child_structure_infos
+
+
+def get_child_structures(
+    child_paths: list[str],
+    n_threads: int = 8,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+) -> list[casm.xtal.Structure]:
+    """Given a list of child paths, if the file type is json,
+    it assumes it's of proeprties.calc.json/structure.json type
+    and constructs a casm ``Structure``. Files are read concurrently, see
+    :func:`read_child_structure_infos`. See :func:`iter_mappings` to
+    read and map children one at a time instead
+
+    Parameters
+    ----------
+    child_paths : list[str]
+        List of child paths
+    n_threads : int, optional
+        Number of files read at once
+    snapshot : casmam.mapping.snapshot.ChildStructureSnapshot, optional
+        Snapshot that up to date children are taken from
 
     Returns
     -------
-    dict
-        Dictionary of default mapping options
+    list[casm.xtal.Structure]
+        List of casm ``Structure`` objects
 
     """
-    return {
-        "use_parent_symmetry": True,
-        "use_child_symmetry": True,
-        "min_cost": -0.0001,
-        "max_cost": 0.1,
-        "strain_cost_method": "symmetry_breaking_strain_cost",
-        "atom_cost_method": "symmetry_breaking_atom_cost",
-    }
+    return [
+        casmamxtal.casm_structure_from_structure_info(*child_structure_info)
+        for child_structure_info in read_child_structure_infos(
+            child_paths, n_threads, snapshot
+        )
+    ]
 
 
-def map_child_structures_onto_parent_structures(
-    parent_structures: list[casm.xtal.Prim],
-    child_structures: list[casm.xtal.Structure],
-    parent_paths: list[str] = None,
-    child_paths: list[str] = None,
-    quiet=True,
-    **kwargs,
-) -> list[list[list[MappingResult]]]:
-    """Cycle through child crystal structures and map each of them
-    onto the parent structures. Assumes ``parent_structures`` and
-    ``child_structures`` have the desired atom types. If not, use
-    helper :func:``casmam.mapping.mask_child_structure_atom_types``
-    function. Need ``parent_paths`` and ``child_paths`` to keep track of
-    these files in ``MappingResult``.
+def get_child_n_sites(
+    child_paths: list[str], snapshot: casmamsnapshot.ChildStructureSnapshot = None
+) -> np.ndarray:
+    """Number of sites of each child structure, read without
+    constructing the structures
 
     Parameters
     ----------
-    parent_structures : List[casm.xtal.Prim]
-        List of parent crystal structures as casm ``Prim``
-    child_structures : List[casm.xtal.Structure]
-        List of child crystal structures as casm ``Structure``
-    **kwargs : TODO
+    child_paths : list[str]
+        Paths of properties.calc.json/structure.json files
+    snapshot : casmam.mapping.snapshot.ChildStructureSnapshot, optional
+        Snapshot that up to date children are taken from
 
     Returns
     -------
-    list[list[MappingResult]]
+    np.ndarray
+        Number of sites of each child structure
 
     """
-    if parent_paths is None:
-        parent_paths = ["not available"] * len(parent_structures)
+    if snapshot is not None:
+        child_n_sites = snapshot.get_n_sites(child_paths)
+    else:
+        child_n_sites = np.full(len(child_paths), -1, dtype=int)
 
-    if child_paths is None:
-        child_paths = ["not available"] * len(child_structures)
+    for child_index in np.flatnonzero(child_n_sites == -1):
+        with open(child_paths[child_index], "r") as f:
+            child_n_sites[child_index] = len(json.load(f)["atom_type"])
 
-    # TODO: Sanitize args and kwargs. Think about what to expose to the user
-    mapping_results = []
+    return np.array(child_n_sites, dtype=int)
 
-    for child_structure, child_path in zip(child_structures, child_paths):
-        child_fg = casm.xtal.make_structure_factor_group(child_structure)
 
-        mapping_results_for_one_child = []
-        for parent_structure, parent_path in zip(parent_structures, parent_paths):
-            # make child structure factor group
-            parent_fg = casm.xtal.make_prim_factor_group(parent_structure)
-            # map child onto parent
-            max_volume = max_vol(parent_structure, child_structure)
-            if max_volume is not None:
-                results = mappermethods.map_structures(
-                    parent_structure,
-                    child_structure,
-                    max_vol=max_volume,
-                    prim_factor_group=parent_fg,
-                    structure_factor_group=child_fg,
-                    strain_cost_method="symmetry_breaking_strain_cost",
-                    atom_cost_method="symmetry_breaking_atom_cost",
-                    min_cost=-0.0001,
-                    max_cost=0.1,
-                )
-            else:
-                results = []
-
-            if len(results) == 0:
-                empty_mapping_result = MappingResult()
-                empty_mapping_result.child_path = child_path
-                empty_mapping_result.parent_path = parent_path
-                casmam_results = [empty_mapping_result]
-
-            else:
-                casmam_results = [
-                    MappingResult.from_casm_mapping_result(
-                        result, parent_path, child_path
-                    )
-                    for result in results
-                ]
+def make_child_structure_snapshot(
+    child_paths: list[str],
+    previous: casmamsnapshot.ChildStructureSnapshot = None,
+    n_threads: int = 8,
+) -> casmamsnapshot.ChildStructureSnapshot:
+    """Read child structures into a snapshot, which
+    :meth:`casmam.mapping.snapshot.ChildStructureSnapshot.save` writes
+    to a single file
 
-            if not quiet:
-                print("Finished mapping " + child_path + " to " + parent_path + "...")
+    Parameters
+    ----------
+    child_paths : list[str]
+        Paths of properties.calc.json/structure.json files
+    previous : casmam.mapping.snapshot.ChildStructureSnapshot, optional
+        Earlier snapshot whose up to date children are not read again
+    n_threads : int, optional
+        Number of files read at once
 
-            # convert the results to casmam MappingResult object which is
-            # pickle dumpable
-            mapping_results_for_one_child.append(casmam_results)
+    Returns
+    -------
+    casmam.mapping.snapshot.ChildStructureSnapshot
 
-        mapping_results.append(mapping_results_for_one_child)
+    """
+    # taken before reading, so that a file changing meanwhile counts as stale
+    signatures = casmamparents.get_file_signatures(child_paths)
 
-    return mapping_results
+    return casmamsnapshot.ChildStructureSnapshot.from_structure_infos(
+        child_paths,
+        read_child_structure_infos(child_paths, n_threads, previous),
+        signatures,
+    )
 
 
-def get_casm_config_name_from_child_path(child_path: str) -> str:
-    """This assumes that the child path is in casm directory
-    style like "*/training_data/SCEL.../*/structure.json"
-    or "*/training_data/SCEL.../*/calctype.*/properties.json"
-    and only return SCEL.../* part
+def select_child_paths_of_shard(
+    child_paths: list[str],
+    parent_library: casmamparents.ParentLibrary,
+    shard_index: int,
+    n_shards: int,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+) -> list[str]:
+    """Child paths that belong to one of ``n_shards`` shards of a
+    mapping run. Children are split so that every shard has nearly the
+    same estimated mapping cost (see
+    :func:`casmam.mapping.scheduling.estimate_pair_costs`), and the
+    split only depends on ``child_paths`` and the parents, so every job
+    of a sharded run computes the same split
+
+    Parameters
+    ----------
+    child_paths : list[str]
+        Paths of every child structure of the run
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+    shard_index : int
+        Index of the shard, from 0 to ``n_shards - 1``
+    n_shards : int
+        Number of shards
+    snapshot : casmam.mapping.snapshot.ChildStructureSnapshot, optional
+        Snapshot that up to date children are taken from
 
     Returns
     -------
-    str
-        config name
+    list[str]
+        Paths of the children in the shard, in their original order
 
-    """
-    if os.path.basename(child_path) == "structure.json":
-        i = 0
-        dirname = child_path
-        while i <= 2:
-            dirname = os.path.dirname(dirname)
-            i += 1
+    Raises
+    ------
+    RuntimeError
+        If ``shard_index`` is not a valid index
 
-        config_name = child_path.replace(dirname + "/", "").replace(
-            "/structure.json", ""
+    """
+    if not 0 <= shard_index < n_shards:
+        raise RuntimeError(
+            "Invalid shard "
+            + str(shard_index)
+            + " of "
+            + str(n_shards)
+            + ", shards are numbered from 0 to "
+            + str(n_shards - 1)
         )
 
-    elif os.path.basename(child_path) == "properties.calc.json":
-        i = 0
-        dirname = child_path
-        while i <= 3:
-            dirname = os.path.dirname(dirname)
-            if i == 0:
-                child_path = child_path.replace(os.path.basename(dirname) + "/", "")
-            i += 1
+    # every child costs at least reading it, even if nothing is mapped
+    child_costs = (
+        casmamscheduling.estimate_pair_costs(
+            get_child_n_sites(child_paths, snapshot), parent_library.n_sites
+        ).sum(axis=1)
+        + 1
+    )
+    shard_indices = casmamscheduling.partition_into_shards(child_costs, n_shards)
 
-        config_name = child_path.replace(dirname + "/", "").replace(
-            "/properties.calc.json", ""
-        )
+    return [
+        child_path
+        for child_path, child_shard_index in zip(child_paths, shard_indices)
+        if child_shard_index == shard_index
+    ]
+
+
+def iter_ccasm_query_configurations(
+    configurations_path: str, select: str = None, chunk_size: int = 2**20
+):
+    """Configurations of a ccasm query json file, parsed one at a time
+    while the file is read ``chunk_size`` characters at a time, so that
+    neither the file nor the whole list of configurations is ever in
+    memory
+
+    Parameters
+    ----------
+    configurations_path : str
+        Path of a json list of configurations, as written by ccasm query
+    select : str, optional
+        Only yield configurations whose ``select`` column is true, e.g.
+        "selected" or "is_calculated". By default yields all of them
+    chunk_size : int, optional
+        Number of characters read at a time
+
+    Yields
+    ------
+    dict
+        Each configuration, e.g. with its "name"
+
+    Raises
+    ------
+    json.JSONDecodeError
+        If the file is not a json list of configurations, as ``json.load``
+        would. Decoding stops at the first invalid character
+
+    """
+    decoder = json.JSONDecoder()
+
+    with open(configurations_path, "r") as f:
+        buffer, position = _skip_json_whitespace(f, "", 0, chunk_size)
+        if buffer[position] != "[":
+            raise json.JSONDecodeError(
+                "Configurations " + configurations_path + " are not a json list",
+                buffer,
+                position,
+            )
+        buffer, position = _skip_json_whitespace(f, buffer, position + 1, chunk_size)
+
+        while buffer[position] != "]":
+            configuration, buffer, position = _decode_json_value(
+                decoder, f, buffer, position, chunk_size
+            )
+            if select is None or configuration.get(select):
+                yield configuration
+
+            buffer, position = _skip_json_whitespace(f, buffer, position, chunk_size)
+            if buffer[position] == ",":
+                buffer, position = _skip_json_whitespace(
+                    f, buffer, position + 1, chunk_size
+                )
+                if buffer[position] == "]":
+                    raise json.JSONDecodeError(
+                        "Illegal trailing comma before end of array", buffer, position
+                    )
+            elif buffer[position] != "]":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+
+        # only whitespace may follow the list
+        position += 1
+        while True:
+            position = _json_whitespace.match(buffer, position).end()
+            if position < len(buffer):
+                raise json.JSONDecodeError("Extra data", buffer, position)
+            buffer, position = f.read(chunk_size), 0
+            if buffer == "":
+                break
+
+
+def _skip_json_whitespace(
+    f, buffer: str, position: int, chunk_size: int
+) -> tuple[str, int]:
+    """Skip whitespace from ``position`` on, reading chunks of ``f``
+    where ``buffer`` ends. Returns the buffer and the position of the
+    next character"""
+    position = _json_whitespace.match(buffer, position).end()
+    while position == len(buffer):
+        buffer = f.read(chunk_size)
+        if buffer == "":
+            raise json.JSONDecodeError(
+                "Configurations " + f.name + " end unexpectedly", buffer, 0
+            )
+        position = _json_whitespace.match(buffer).end()
+
+    return buffer, position
+
+
+def _decode_json_value(
+    decoder: json.JSONDecoder, f, buffer: str, position: int, chunk_size: int
+) -> tuple[object, str, int]:
+    """Decode the json value at ``position``, reading more of ``f`` while
+    the value may continue past the end of the buffer. Returns the value,
+    the buffer and the position after the value. Every read at least
+    doubles the buffer, so a long value is decoded in linear time"""
+    while True:
+        try:
+            value, position = decoder.raw_decode(buffer, position)
+            return value, buffer, position
+        except json.JSONDecodeError as error:
+            if not _is_truncated_json(error, buffer):
+                raise
+
+            chunk = f.read(max(chunk_size, len(buffer) - position))
+            if chunk == "":
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+
+
+def _is_truncated_json(error: json.JSONDecodeError, buffer: str) -> bool:
+    """Returns if ``error`` may only be due to the end of ``buffer``:
+    it is at the end, in a string that is not closed, or in a literal,
+    number or escape sequence cut off by the end"""
+    if error.pos >= len(buffer) or error.msg.startswith("Unterminated string"):
+        return True
+
+    return _json_token_fragment.fullmatch(buffer, error.pos) is not None
+
+
+def iter_ccasm_query_config_names(
+    configurations_path: str, select: str = None, chunk_size: int = 2**20
+):
+    """Names of the configurations of a ccasm query json file, see
+    :func:`iter_ccasm_query_configurations`
+
+    Yields
+    ------
+    str
+        Name of each configuration
+
+    """
+    for configuration in iter_ccasm_query_configurations(
+        configurations_path, select, chunk_size
+    ):
+        yield configuration["name"]
+
+
+def iter_properties_json_paths(config_names, calctype="default", relaxed=True):
+    """Paths of the properties.calc.json files of calctype ``calctype``
+    of configurations if ``relaxed``, otherwise of their structure.json
+    files, as ``config_names`` yields them
+
+    Parameters
+    ----------
+    config_names : Iterable[str]
+        Names of configurations, e.g. from
+        :func:`iter_ccasm_query_config_names`
+    calctype : str, optional
+        Calctype of the properties.calc.json files
+    relaxed : bool, optional
+        If ``False``, give the structure.json files
+
+    Yields
+    ------
+    str
+        Path of each file
+
+    """
+    casm_root_dir = get_casm_root_dir()
+    for config_name in config_names:
+        if relaxed:
+            yield os.path.join(
+                casm_root_dir,
+                "training_data",
+                config_name,
+                "calctype." + calctype,
+                "properties.calc.json",
+            )
+        else:
+            yield os.path.join(
+                casm_root_dir, "training_data", config_name, "structure.json"
+            )
+
+
+def get_properties_json_paths(
+    config_names: list[str], calctype="default", relaxed=True
+):
+    """:func:`iter_properties_json_paths` as a list
+
+    Parameters
+    ----------
+    config_names : Iterable[str]
+        Names of configurations
+    calctype : str, optional
+        Calctype of the properties.calc.json files
+    relaxed : bool, optional
+        If ``False``, give the structure.json files
+
+    Returns
+    -------
+    list[str]
+
+    """
+    return list(iter_properties_json_paths(config_names, calctype, relaxed))
+
+
+# TODO: Currently only works if child_paths is a list of .json files
+# TODO: If child_paths is poscar types it doesn't work, needs implementing Structure.from_poscar
+# TODO: Need to add shorten parent paths argmument
+def map_configurations_onto_parent_structures(
+    child_paths: list[str],
+    parent_paths: str | list[str],
+    quiet=False,
+    n_workers: int = 1,
+    pair_time_budget: float = None,
+    prefilter: str = "none",
+    best_only: bool = False,
+    deduplicate: bool = False,
+    cache: casmamcache.MappingCache = None,
+    checkpoint_path: str = None,
+    resume: bool = False,
+    shard: tuple[int, int] = None,
+    deduplicate_parents: bool = False,
+    max_maps_per_pair: int = None,
+    costs_only: bool = False,
+    profile: casmaminstrumentation.MappingProfile = None,
+    progress: casmamprogress.MappingProgress = None,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+    **kwargs,
+):
+    """Top-level function that constructs child structures,
+    parent structures and maps them onto each other. If
+    ``checkpoint_path`` is given, the results of every child are written
+    to it as soon as they are complete, and with ``resume`` the children
+    already in it are not mapped again
+
+    Parameters
+    ----------
+    child_paths : TODO
+    parent_paths : TODO
+    n_workers : int, optional
+        Number of worker processes to map with. By default maps serially
+    pair_time_budget : float, optional
+        Wall-clock time in seconds after which mapping a single
+        (child, parent) pair is abandoned. By default there is no limit
+    prefilter : str, optional
+        "safe", "heuristic" or "none". See
+        :func:`map_child_structures_onto_parent_structures`
+    best_only : bool, optional
+        Only guarantee finding the best parent of each child and parents
+        tied with it. See :func:`map_child_structures_onto_parent_structures`
+    deduplicate : bool, optional
+        Map equivalent masked child structures only once. See
+        :func:`map_child_structures_onto_parent_structures`
+    cache : casmam.mapping.cache.MappingCache, optional
+        On-disk cache of mapping results
+    checkpoint_path : str, optional
+        Path of a :class:`casmam.mapping.checkpoint.MappingCheckpoint`.
+        By default no checkpoint is written
+    resume : bool, optional
+        If ``True``, resume from the checkpoint at ``checkpoint_path``
+        if it exists, instead of overwriting it
+    shard : tuple[int, int], optional
+        Shard index and number of shards. If given, only the children of
+        that shard are mapped, see :func:`select_child_paths_of_shard`.
+        The outputs of all shards are combined with
+        :func:`merge_mapping_results`
+    deduplicate_parents : bool, optional
+        Map onto equivalent parents only once. See
+        :func:`map_child_structures_onto_parent_structures`
+    max_maps_per_pair : int, optional
+        Number of lowest cost maps kept for each (child, parent) pair.
+        By default every valid map is kept, see
+        :func:`default_mapping_options`
+    costs_only : bool, optional
+        If ``True``, only the costs of the kept maps are kept
+    profile : casmam.mapping.instrumentation.MappingProfile, optional
+        Profile to record the wall time of each phase and pair in. By
+        default nothing is recorded
+    progress : casmam.mapping.progress.MappingProgress, optional
+        Progress to report the run with, e.g. to write progress events
+        to a file. By default progress is printed every 10 seconds
+        unless ``quiet``
+    snapshot : casmam.mapping.snapshot.ChildStructureSnapshot, optional
+        Snapshot of the children, see
+        :func:`make_child_structure_snapshot`. Children are read from
+        their files only if they are missing from it or changed since
+        it was taken
+    **kwargs : TODO
+
+    Returns
+    -------
+    TODO
+
+    """
+    with casmaminstrumentation.profile_phase(profile, "load_parents"):
+        parent_library = make_parent_library(parent_paths)
+    mapping_options = make_configuration_mapping_options(max_maps_per_pair, costs_only)
+
+    if shard is not None:
+        child_paths = select_child_paths_of_shard(
+            child_paths, parent_library, *shard, snapshot=snapshot
+        )
+
+    checkpoint = None
+    completed_child_paths = set()
+    if checkpoint_path is not None:
+        checkpoint = open_mapping_checkpoint(
+            checkpoint_path,
+            parent_library,
+            child_paths,
+            mapping_options,
+            prefilter,
+            best_only,
+            deduplicate_parents,
+            resume,
+            quiet,
+        )
+        completed_child_paths = set(checkpoint.completed)
+
+    remaining_child_paths = [
+        child_path
+        for child_path in child_paths
+        if child_path not in completed_child_paths
+    ]
+    with casmaminstrumentation.profile_phase(profile, "read_child_structures"):
+        child_structures = get_child_structures(
+            remaining_child_paths, snapshot=snapshot
+        )
+        masked_child_structures = mask_child_structure_atom_types(child_structures)
+
+    remaining_mapping_results = map_child_structures_onto_parent_structures(
+        parent_library,
+        masked_child_structures,
+        child_paths=remaining_child_paths,
+        quiet=quiet,
+        n_workers=n_workers,
+        mapping_options=mapping_options,
+        pair_time_budget=pair_time_budget,
+        prefilter=prefilter,
+        best_only=best_only,
+        deduplicate=deduplicate,
+        cache=cache,
+        checkpoint=checkpoint,
+        deduplicate_parents=deduplicate_parents,
+        profile=profile,
+        progress=progress,
+    )
+
+    remaining_mapping_results = iter(remaining_mapping_results)
+    completed_mapping_results = iter([])
+    if checkpoint is not None:
+        completed_mapping_results = checkpoint.load_results(
+            [
+                child_path
+                for child_path in child_paths
+                if child_path in completed_child_paths
+            ]
+        )
+    mapping_results = [
+        next(completed_mapping_results)
+        if child_path in completed_child_paths
+        else next(remaining_mapping_results)
+        for child_path in child_paths
+    ]
+    with casmaminstrumentation.profile_phase(profile, "organize_mapping_results"):
+        mapping_results = organize_mapping_results(mapping_results)
+    mapping_results.attrs["parent_content_hashes"] = get_parent_content_hashes(
+        parent_library
+    )
+    mapping_results.attrs["mapping_options"] = dict(mapping_options)
+
+    return mapping_results
+
+
+def get_parent_content_hashes(
+    parent_library: casmamparents.ParentLibrary,
+) -> dict[str, str]:
+    """:attr:`casmam.mapping.parents.ParentLibrary.content_hashes` of
+    every parent by its name in the table of
+    :func:`organize_mapping_results`. Tables keep them in
+    ``attrs["parent_content_hashes"]`` and are written with them, so
+    that :func:`find_reusable_parents` knows which crystal structures
+    the results are of
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+
+    Returns
+    -------
+    dict[str, str]
+
+    """
+    return {
+        os.path.basename(parent_path): content_hash
+        for parent_path, content_hash in zip(
+            parent_library.paths, parent_library.content_hashes
+        )
+    }
+
+
+def open_mapping_checkpoint(
+    checkpoint_path: str,
+    parent_library: casmamparents.ParentLibrary,
+    child_paths: list[str],
+    mapping_options: dict,
+    prefilter: str,
+    best_only: bool,
+    deduplicate_parents: bool,
+    resume: bool,
+    quiet=True,
+) -> casmamcheckpoint.MappingCheckpoint:
+    """Start or resume the checkpoint of a run of
+    :func:`map_configurations_onto_parent_structures` or
+    :func:`iter_configuration_mappings`
+
+    Parameters
+    ----------
+    checkpoint_path : str
+        Path of the checkpoint
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+    child_paths : list[str]
+        Paths of every child of the run
+    mapping_options : dict
+        Mapping options
+    prefilter : str
+        Prefilter mode
+    best_only : bool
+        Whether only the best parents are guaranteed to be found
+    deduplicate_parents : bool
+        Whether equivalent parents are mapped onto only once
+    resume : bool
+        If ``True``, resume the checkpoint if it exists
+    quiet : bool, optional
+        If ``False``, report how many children are already mapped
+
+    Returns
+    -------
+    casmam.mapping.checkpoint.MappingCheckpoint
+
+    """
+    checkpoint = casmamcheckpoint.MappingCheckpoint(
+        checkpoint_path,
+        make_run_description(
+            parent_library,
+            mapping_options,
+            prefilter,
+            best_only,
+            deduplicate_parents,
+        ),
+        resume,
+    )
+
+    n_completed = len(set(child_paths) & set(checkpoint.completed))
+    if not quiet and n_completed != 0:
+        print(
+            "Resuming from "
+            + checkpoint_path
+            + ", "
+            + str(n_completed)
+            + " of "
+            + str(len(child_paths))
+            + " child structures are already mapped"
+        )
+
+    return checkpoint
+
+
+def make_run_description(
+    parent_library: casmamparents.ParentLibrary,
+    mapping_options: dict,
+    prefilter: str,
+    best_only: bool,
+    deduplicate_parents: bool = False,
+) -> dict:
+    """Everything that mapping results depend on other than the child
+    structures. Used to check that a checkpoint is resumed by the same
+    kind of run that wrote it
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+    mapping_options : dict
+        Mapping options
+    prefilter : str
+        Prefilter mode
+    best_only : bool
+        Whether only the best parents are guaranteed to be found
+    deduplicate_parents : bool, optional
+        Whether equivalent parents are mapped onto only once
+
+    Returns
+    -------
+    dict
+
+    """
+    return {
+        "parents": list(parent_library.content_hashes),
+        "mapping_options": dict(mapping_options),
+        "prefilter": prefilter,
+        "best_only": best_only,
+        "deduplicate_parents": deduplicate_parents,
+    }
+
+
+def default_mapping_options() -> dict:
+    """Returns a dictionary of default mapping options
+    used. Besides the options of the casm mapper, "max_maps_per_pair"
+    is the number of lowest cost maps kept for each (child, parent)
+    pair (``None`` keeps every valid map, 1 only the best one), and
+    with "costs_only" only the costs of those maps are kept
+
+    Returns
+    -------
+    dict
+        Dictionary of default mapping options
+
+    """
+    return {
+        "use_parent_symmetry": True,
+        "use_child_symmetry": True,
+        "min_cost": -0.0001,
+        "max_cost": 0.1,
+        "strain_cost_method": "symmetry_breaking_strain_cost",
+        "atom_cost_method": "symmetry_breaking_atom_cost",
+        "max_maps_per_pair": None,
+        "costs_only": False,
+    }
+
+
+def make_configuration_mapping_options(
+    max_maps_per_pair: int = None, costs_only: bool = False
+) -> dict:
+    """:func:`default_mapping_options` with the given "max_maps_per_pair"
+    and "costs_only", the options configurations are mapped with. Tables
+    of mapping results keep them in ``attrs["mapping_options"]`` and are
+    written with them, so that results mapped with other options are not
+    reused, see :func:`find_reusable_parents`
+
+    Returns
+    -------
+    dict
+
+    """
+    return dict(
+        default_mapping_options(),
+        max_maps_per_pair=max_maps_per_pair,
+        costs_only=costs_only,
+    )
+
+
+def map_child_structure_onto_parent_structure(
+    parent_library: casmamparents.ParentLibrary,
+    parent_index: int,
+    child_structure: casm.xtal.Structure,
+    child_fg: list[casm.xtal.SymOp],
+    child_path: str = "not available",
+    mapping_options: dict = None,
+    time_budget: float = None,
+    cache: casmamcache.MappingCache = None,
+    profile: casmaminstrumentation.MappingProfile = None,
+    time_budget_worker: casmamscheduling.TimeBudgetWorker = None,
+) -> list[MappingResult]:
+    """Map one child structure onto one parent structure of
+    ``parent_library``
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures with their factor groups
+    parent_index : int
+        Index of the parent structure in ``parent_library``
+    child_structure : casm.xtal.Structure
+        Child structure with the desired atom types
+    child_fg : list[casm.xtal.SymOp]
+        Factor group of ``child_structure``
+    child_path : str, optional
+        Path of the child structure
+    mapping_options : dict, optional
+        Mapping options. By default uses :func:`default_mapping_options`
+    time_budget : float, optional
+        Wall-clock time in seconds after which mapping is abandoned and a
+        dummy ``MappingResult`` with ``timed_out`` set is returned. By
+        default there is no limit
+    cache : casmam.mapping.cache.MappingCache, optional
+        Cache to look the pair up in before mapping, and to store the
+        results in after. Timed out pairs are not stored
+    profile : casmam.mapping.instrumentation.MappingProfile, optional
+        Profile to record the wall time and number of maps of the pair in
+    time_budget_worker : casmam.mapping.scheduling.TimeBudgetWorker, optional
+        Worker to map in with a ``time_budget``, kept for the whole run.
+        By default a worker is started for this pair only
+
+    Returns
+    -------
+    list[MappingResult]
+        Every valid map, or a single dummy ``MappingResult`` if
+        there is none
+
+    """
+    if mapping_options is None:
+        mapping_options = default_mapping_options()
+
+    parent_path = parent_library.paths[parent_index]
+
+    max_volume = max_vol(parent_library.prims[parent_index], child_structure)
+    if max_volume is None:
+        return [MappingResult.dummy(parent_path, child_path)]
+
+    start = time.perf_counter()
+    cached_results = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            casmamxtal.make_structure_content_hash(
+                *casmamxtal.get_structure_info_from_casm_structure(child_structure)
+            ),
+            parent_library.content_hashes[parent_index],
+            mapping_options,
+        )
+        cached_results = cache.get(cache_key)
+
+    if cached_results is not None:
+        results = cached_results
+        for result in results:
+            result.parent_path = parent_path
+            result.child_path = child_path
+    else:
+        results = map_structures_within_time_budget(
+            time_budget,
+            parent_library,
+            parent_index,
+            child_structure,
+            child_fg,
+            child_path,
+            mapping_options,
+            max_volume,
+            time_budget_worker=time_budget_worker,
+        )
+        if cache is not None and not results[0].timed_out:
+            cache.put(cache_key, results)
+
+    if profile is not None:
+        profile.add_pair(
+            child_path,
+            parent_path,
+            time.perf_counter() - start,
+            0 if results[0].is_dummy() else len(results),
+            cached_results is not None,
+            results[0].timed_out,
+        )
+
+    return results
+
+
+def map_structures_within_time_budget(
+    time_budget: float,
+    *mapping_arguments,
+    time_budget_worker: casmamscheduling.TimeBudgetWorker = None,
+) -> list[MappingResult]:
+    """:func:`map_structures_to_mapping_results` abandoned after
+    ``time_budget`` seconds of wall-clock time
+
+    Parameters
+    ----------
+    time_budget : float
+        Time budget in seconds. ``None`` for no limit
+    *mapping_arguments
+        Arguments of :func:`map_structures_to_mapping_results`
+    time_budget_worker : casmam.mapping.scheduling.TimeBudgetWorker, optional
+        Worker process to map in. By default one is started and stopped
+        for this call
+
+    Returns
+    -------
+    list[MappingResult]
+        Mapping results, or a single dummy ``MappingResult`` with
+        ``timed_out`` set if the time budget ran out
+
+    """
+    if time_budget is None:
+        return map_structures_to_mapping_results(*mapping_arguments)
+
+    parent_library, parent_index, *child_arguments = mapping_arguments
+    worker = time_budget_worker
+    if worker is None:
+        worker = casmamscheduling.TimeBudgetWorker()
+
+    try:
+        # only the parent being mapped onto is sent to the worker
+        return worker.call(
+            map_structures_to_mapping_results,
+            time_budget,
+            parent_library.select([parent_index]),
+            0,
+            *child_arguments,
+        )
+    except TimeoutError:
+        timed_out_mapping_result = MappingResult.dummy(
+            parent_library.paths[parent_index], child_arguments[2]
+        )
+        timed_out_mapping_result.timed_out = True
+        return [timed_out_mapping_result]
+    finally:
+        if time_budget_worker is None:
+            worker.stop()
+
+
+def map_structures_to_mapping_results(
+    parent_library: casmamparents.ParentLibrary,
+    parent_index: int,
+    child_structure: casm.xtal.Structure,
+    child_fg: list[casm.xtal.SymOp],
+    child_path: str,
+    mapping_options: dict,
+    max_volume: int,
+) -> list[MappingResult]:
+    """Call the casm mapper on one (child, parent) pair and convert
+    its results to ``MappingResult``
+
+    Returns
+    -------
+    list[MappingResult]
+        Every valid map, or a single dummy ``MappingResult`` if
+        there is none
+
+    """
+    parent_path = parent_library.paths[parent_index]
+    results = mappermethods.map_structures(
+        parent_library.prims[parent_index],
+        child_structure,
+        max_vol=max_volume,
+        prim_factor_group=parent_library.factor_groups[parent_index],
+        structure_factor_group=child_fg,
+        strain_cost_method=mapping_options["strain_cost_method"],
+        atom_cost_method=mapping_options["atom_cost_method"],
+        min_cost=mapping_options["min_cost"],
+        max_cost=mapping_options["max_cost"],
+    )
+
+    # convert the results to casmam MappingResult object which is
+    # pickle dumpable
+    if len(results) == 0:
+        return [MappingResult.dummy(parent_path, child_path)]
+
+    # highly symmetric parents can have many equally valid maps, only
+    # the ones that are kept are converted
+    max_maps_per_pair = mapping_options.get("max_maps_per_pair")
+    if max_maps_per_pair is not None:
+        results = heapq.nsmallest(
+            max_maps_per_pair, results, key=lambda result: result[0].total_cost()
+        )
+
+    return [
+        MappingResult.from_casm_mapping_result(
+            result,
+            parent_path,
+            child_path,
+            mapping_options.get("costs_only", False),
+        )
+        for result in results
+    ]
+
+
+def make_progress(
+    progress: casmamprogress.MappingProgress = None, quiet=True
+) -> casmamprogress.MappingProgress | None:
+    """Progress of a run: ``progress`` if it is given, otherwise one
+    printed every 10 seconds unless ``quiet``
+
+    Parameters
+    ----------
+    progress : casmam.mapping.progress.MappingProgress, optional
+        Progress given by the caller
+    quiet : bool, optional
+        If ``True`` and no progress is given, there is none
+
+    Returns
+    -------
+    casmam.mapping.progress.MappingProgress | None
+
+    """
+    if progress is None and not quiet:
+        progress = casmamprogress.MappingProgress()
+
+    return progress
+
+
+class MappingSettings:
+
+    """Settings of a mapping run that are the same for every
+    (child, parent) pair. Sent to each worker process once
+
+    Attributes
+    ----------
+    mapping_options : dict
+        Mapping options, see :func:`default_mapping_options`
+    time_budget : float | None
+        Wall-clock time in seconds after which mapping a single pair is
+        abandoned
+    time_budget_worker : casmam.mapping.scheduling.TimeBudgetWorker | None
+        Worker process that pairs are mapped in with a ``time_budget``,
+        one per process of the run
+    tol : float
+        Tolerance within which costs are considered tied
+    cache : casmam.mapping.cache.MappingCache | None
+        Cache of mapping results
+    quiet : bool
+        If ``False``, report progress
+    profile : casmam.mapping.instrumentation.MappingProfile | None
+        Profile recording where the time of the run goes
+    progress : casmam.mapping.progress.MappingProgress | None
+        Progress of the run
+
+    """
+
+    def __init__(
+        self,
+        mapping_options: dict = None,
+        time_budget: float = None,
+        tol: float = 1e-4,
+        cache: casmamcache.MappingCache = None,
+        quiet=True,
+        profile: casmaminstrumentation.MappingProfile = None,
+        progress: casmamprogress.MappingProgress = None,
+    ):
+        if mapping_options is None:
+            mapping_options = default_mapping_options()
+
+        self.mapping_options = mapping_options
+        self.time_budget = time_budget
+        self.time_budget_worker = None
+        if time_budget is not None:
+            self.time_budget_worker = casmamscheduling.TimeBudgetWorker()
+        self.tol = tol
+        self.cache = cache
+        self.quiet = quiet
+        self.profile = profile
+        self.progress = progress
+
+    def add_worker_stats(self, worker_stats: dict):
+        """Add the cache counters, profile records and progress counts
+        of a worker process, see :func:`pop_worker_stats`"""
+        if worker_stats["cache"] is not None:
+            self.cache.add_stats(worker_stats["cache"])
+        if worker_stats["profile"] is not None:
+            self.profile.add_records(worker_stats["profile"])
+        if worker_stats["progress"] is not None:
+            self.progress.add_counts(worker_stats["progress"])
+
+    def add_pairs(self, n_mapped: int = 1, n_skipped: int = 0):
+        """Count mapped and skipped pairs if the run has a progress"""
+        if self.progress is not None:
+            self.progress.add_pairs(n_mapped, n_skipped)
+
+
+def map_child_structure_onto_parent_structures_best_only(
+    parent_library: casmamparents.ParentLibrary,
+    parent_order: np.ndarray,
+    child_structure: casm.xtal.Structure,
+    child_fg: list[casm.xtal.SymOp],
+    child_path: str,
+    pairs_to_map: np.ndarray,
+    settings: MappingSettings,
+) -> list[list[MappingResult]]:
+    """Map one child structure onto the parent structures in
+    ``parent_order``, lowering ``max_cost`` after every successful map
+    to the best total cost found so far plus ``settings.tol``. The best
+    parent, and every parent within ``tol`` of it, are still found, but
+    the search space for the other parents shrinks
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures with their factor groups
+    parent_order : np.ndarray
+        Indices of parents in the order to try them
+    child_structure : casm.xtal.Structure
+        Child structure with the desired atom types
+    child_fg : list[casm.xtal.SymOp]
+        Factor group of ``child_structure``
+    child_path : str
+        Path of the child structure
+    pairs_to_map : np.ndarray
+        Boolean array, ``False`` for parents to skip
+    settings : MappingSettings
+        Settings of the run. ``max_cost`` of its mapping options is the
+        initial bound
+
+    Returns
+    -------
+    list[list[MappingResult]]
+        Mapping results onto every parent, in library order
+
+    """
+    mapping_results = [None] * len(parent_library)
+    max_cost = settings.mapping_options["max_cost"]
+    for parent_index in parent_order:
+        if not pairs_to_map[parent_index]:
+            mapping_results[parent_index] = [
+                MappingResult.dummy(parent_library.paths[parent_index], child_path)
+            ]
+            settings.add_pairs(0, 1)
+            continue
+
+        results = map_child_structure_onto_parent_structure(
+            parent_library,
+            parent_index,
+            child_structure,
+            child_fg,
+            child_path,
+            dict(settings.mapping_options, max_cost=max_cost),
+            settings.time_budget,
+            settings.cache,
+            settings.profile,
+            settings.time_budget_worker,
+        )
+        mapping_results[parent_index] = results
+        settings.add_pairs()
+
+        if not results[0].is_dummy():
+            best_total_cost = min(result.total_cost for result in results)
+            max_cost = min(max_cost, best_total_cost + settings.tol)
+
+    return mapping_results
+
+
+# state of a worker process, set up once by initialize_mapping_worker
+_worker_parent_library = None
+_worker_settings = None
+
+
+def initialize_mapping_worker(
+    parent_library: casmamparents.ParentLibrary, settings: MappingSettings
+):
+    """Process pool initializer. Keeps the parent library, which is
+    unpickled (and its factor groups rebuilt) once per worker, and the
+    settings of the run for all the pairs that worker maps
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures with their factor groups
+    settings : MappingSettings
+        Settings of the run
+
+    """
+    global _worker_parent_library, _worker_settings
+    _worker_parent_library = parent_library
+    _worker_settings = settings
+    # drop the records and counts of the main process the copies came with
+    if settings.profile is not None:
+        settings.profile.pop_records()
+    if settings.progress is not None:
+        settings.progress.pop_counts()
+
+
+def pop_worker_stats() -> dict:
+    """Counters of the worker's cache, records of its profile and
+    counts of its progress since
+    the last call, to be added to those of the main process with
+    :meth:`MappingSettings.add_worker_stats`
+
+    Returns
+    -------
+    dict
+        "cache", "profile" and "progress", each ``None`` if the run has
+        none
+
+    """
+    cache = _worker_settings.cache
+    profile = _worker_settings.profile
+    progress = _worker_settings.progress
+
+    return {
+        "cache": cache.pop_stats() if cache is not None else None,
+        "profile": profile.pop_records() if profile is not None else None,
+        "progress": progress.pop_counts() if progress is not None else None,
+    }
+
+
+def map_child_structure_onto_parent_structures_in_worker(
+    child_index: int,
+    child_structure_info: tuple[np.ndarray, np.ndarray, list[str]],
+    child_path: str,
+    parent_indices: np.ndarray,
+) -> tuple[int, np.ndarray, list[list[MappingResult]], dict]:
+    """Map one child onto some parents in a worker process set up by
+    :func:`initialize_mapping_worker`, building the child structure and
+    its factor group once for all of them
+
+    Parameters
+    ----------
+    child_index : int
+        Index of the child structure
+    child_structure_info : tuple[np.ndarray, np.ndarray, list[str]]
+        Child structure as returned by
+        :func:`casmam.xtal.xtal.get_structure_info_from_casm_structure`
+    child_path : str
+        Path of the child structure
+    parent_indices : np.ndarray
+        Indices of the parent structures in the worker's parent library
+
+    Returns
+    -------
+    tuple[int, np.ndarray, list[list[MappingResult]], dict]
+        ``child_index``, ``parent_indices``, the mapping results onto
+        each of them and :func:`pop_worker_stats`
+
+    """
+    child_structure = casmamxtal.casm_structure_from_structure_info(
+        *child_structure_info
+    )
+    with casmaminstrumentation.profile_phase(
+        _worker_settings.profile, "structure_factor_groups"
+    ):
+        child_fg = casm.xtal.make_structure_factor_group(child_structure)
+
+    mapping_results = []
+    for parent_index in parent_indices:
+        mapping_results.append(
+            map_child_structure_onto_parent_structure(
+                _worker_parent_library,
+                int(parent_index),
+                child_structure,
+                child_fg,
+                child_path,
+                _worker_settings.mapping_options,
+                _worker_settings.time_budget,
+                _worker_settings.cache,
+                _worker_settings.profile,
+                _worker_settings.time_budget_worker,
+            )
+        )
+        _worker_settings.add_pairs()
+
+    return child_index, parent_indices, mapping_results, pop_worker_stats()
+
+
+def map_child_structure_onto_parent_structures_best_only_in_worker(
+    child_index: int,
+    child_structure_info: tuple[np.ndarray, np.ndarray, list[str]],
+    child_path: str,
+    parent_order: np.ndarray,
+    pairs_to_map: np.ndarray,
+) -> tuple[int, list[list[MappingResult]], dict]:
+    """Run :func:`map_child_structure_onto_parent_structures_best_only`
+    for one child in a worker process set up by
+    :func:`initialize_mapping_worker`
+
+    Returns
+    -------
+    tuple[int, list[list[MappingResult]], dict]
+        ``child_index``, its mapping results onto every parent and
+        :func:`pop_worker_stats`
+
+    """
+    child_structure = casmamxtal.casm_structure_from_structure_info(
+        *child_structure_info
+    )
+    with casmaminstrumentation.profile_phase(
+        _worker_settings.profile, "structure_factor_groups"
+    ):
+        child_fg = casm.xtal.make_structure_factor_group(child_structure)
+    mapping_results = map_child_structure_onto_parent_structures_best_only(
+        _worker_parent_library,
+        parent_order,
+        child_structure,
+        child_fg,
+        child_path,
+        pairs_to_map,
+        _worker_settings,
+    )
+
+    return child_index, mapping_results, pop_worker_stats()
+
+
+def iter_child_mapping_results_serially(
+    parent_library: casmamparents.ParentLibrary,
+    child_structures: list[casm.xtal.Structure],
+    child_paths: list[str],
+    pairs_to_map: np.ndarray,
+    settings: MappingSettings,
+    parent_orders: np.ndarray = None,
+):
+    """Map every child onto every parent in this process. Pairs that
+    are not in ``pairs_to_map`` get a dummy ``MappingResult``. If
+    ``parent_orders`` is given, each child is mapped with
+    :func:`map_child_structure_onto_parent_structures_best_only`
+
+    Yields
+    ------
+    tuple[int, list[list[MappingResult]]]
+        Index of a child and its mapping results onto every parent
+
+    """
+    for child_index, (child_structure, child_path) in enumerate(
+        zip(child_structures, child_paths)
+    ):
+        if not pairs_to_map[child_index].any():
+            # nothing to map, so no factor group is needed
+            settings.add_pairs(0, len(parent_library))
+            yield child_index, [
+                [MappingResult.dummy(parent_path, child_path)]
+                for parent_path in parent_library.paths
+            ]
+            continue
+
+        with casmaminstrumentation.profile_phase(
+            settings.profile, "structure_factor_groups"
+        ):
+            child_fg = casm.xtal.make_structure_factor_group(child_structure)
+
+        if parent_orders is not None:
+            yield child_index, map_child_structure_onto_parent_structures_best_only(
+                parent_library,
+                parent_orders[child_index],
+                child_structure,
+                child_fg,
+                child_path,
+                pairs_to_map[child_index],
+                settings,
+            )
+            continue
+
+        mapping_results_for_one_child = []
+        for parent_index in range(len(parent_library)):
+            if not pairs_to_map[child_index, parent_index]:
+                mapping_results_for_one_child.append(
+                    [
+                        MappingResult.dummy(
+                            parent_library.paths[parent_index], child_path
+                        )
+                    ]
+                )
+                settings.add_pairs(0, 1)
+                continue
+
+            mapping_results_for_one_child.append(
+                map_child_structure_onto_parent_structure(
+                    parent_library,
+                    parent_index,
+                    child_structure,
+                    child_fg,
+                    child_path,
+                    settings.mapping_options,
+                    settings.time_budget,
+                    settings.cache,
+                    settings.profile,
+                    settings.time_budget_worker,
+                )
+            )
+            settings.add_pairs()
+
+        yield child_index, mapping_results_for_one_child
+
+
+def iter_child_mapping_results_in_parallel(
+    parent_library: casmamparents.ParentLibrary,
+    child_structure_infos: list[tuple[np.ndarray, np.ndarray, list[str]]],
+    child_paths: list[str],
+    pairs_to_map: np.ndarray,
+    settings: MappingSettings,
+    n_workers: int,
+    parent_orders: np.ndarray = None,
+):
+    """Map every child onto every parent, distributing (child, parent)
+    pairs over ``n_workers`` processes. The parent library and settings
+    are sent to each worker once. Pairs are sent in batches of pairs of
+    one child (see :func:`casmam.mapping.scheduling.batch_pairs_by_child`),
+    each with the child as plain arrays, so that a worker builds the
+    child's factor group once per batch. Batches are small enough that
+    there are a few per worker, so that a handful of children still keep
+    every worker busy. Children are submitted from the most to the least
+    expensive according to
+    :func:`casmam.mapping.scheduling.estimate_pair_costs`, so that a few
+    expensive children do not end up running alone at the end, with the
+    batches of each child submitted together so that children finish,
+    and are checkpointed, one after another. Pairs that are not in
+    ``pairs_to_map``, or whose site counts are not divisible, are never
+    sent to a worker and get a dummy ``MappingResult``. At most a few
+    batches per worker are in flight at any time. If ``parent_orders``
+    is given, see :func:`iter_child_mapping_results_best_only_in_parallel`
+
+    Yields
+    ------
+    tuple[int, list[list[MappingResult]]]
+        Index of a child and its mapping results onto every parent, in
+        the order in which children finish
+
+    """
+    if parent_orders is not None:
+        yield from iter_child_mapping_results_best_only_in_parallel(
+            parent_library,
+            child_structure_infos,
+            child_paths,
+            pairs_to_map,
+            settings,
+            n_workers,
+            parent_orders,
+        )
+        return
+
+    n_parents = len(parent_library)
+    pair_costs = casmamscheduling.estimate_pair_costs(
+        [len(info[2]) for info in child_structure_infos], parent_library.n_sites
+    )
+    pair_costs[~pairs_to_map] = 0
+
+    results_per_child = {}
+
+    def add_results(child_index, parent_index, results):
+        results_for_one_child = results_per_child.setdefault(
+            child_index, [None] * n_parents
+        )
+        results_for_one_child[parent_index] = results
+        if all(result is not None for result in results_for_one_child):
+            return results_per_child.pop(child_index)
+
+        return None
+
+    # pairs that are skipped or not divisible are answered without a worker
+    settings.add_pairs(0, int(np.count_nonzero(pair_costs == 0)))
+    for child_index, parent_index in zip(*np.nonzero(pair_costs == 0)):
+        completed_child = add_results(
+            child_index,
+            parent_index,
+            [
+                MappingResult.dummy(
+                    parent_library.paths[parent_index], child_paths[child_index]
+                )
+            ],
+        )
+        if completed_child is not None:
+            yield child_index, completed_child
+
+    n_pairs = int(np.count_nonzero(pair_costs))
+    batches = casmamscheduling.batch_pairs_by_child(
+        pair_costs, max(1, -(-n_pairs // (4 * n_workers)))
+    )
+    calls = (
+        (
+            child_index,
+            child_structure_infos[child_index],
+            child_paths[child_index],
+            parent_indices,
+        )
+        for child_index, parent_indices in batches
+    )
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=initialize_mapping_worker,
+        initargs=(parent_library, settings),
+    ) as executor:
+        for (
+            child_index,
+            parent_indices,
+            mapping_results,
+            worker_stats,
+        ) in casmamscheduling.iter_results_as_completed(
+            executor,
+            map_child_structure_onto_parent_structures_in_worker,
+            calls,
+            4 * n_workers,
+        ):
+            settings.add_worker_stats(worker_stats)
+
+            for parent_index, results in zip(parent_indices, mapping_results):
+                completed_child = add_results(child_index, parent_index, results)
+                if completed_child is not None:
+                    yield child_index, completed_child
+
+
+def iter_child_mapping_results_best_only_in_parallel(
+    parent_library: casmamparents.ParentLibrary,
+    child_structure_infos: list[tuple[np.ndarray, np.ndarray, list[str]]],
+    child_paths: list[str],
+    pairs_to_map: np.ndarray,
+    settings: MappingSettings,
+    n_workers: int,
+    parent_orders: np.ndarray,
+):
+    """Map every child with
+    :func:`map_child_structure_onto_parent_structures_best_only`,
+    distributing children over ``n_workers`` processes. Parents of one
+    child are tried one after another, since each tightens the bound for
+    the next, so whole children are scheduled longest first
+
+    Yields
+    ------
+    tuple[int, list[list[MappingResult]]]
+        Index of a child and its mapping results onto every parent, in
+        the order in which children finish
+
+    """
+    pair_costs = casmamscheduling.estimate_pair_costs(
+        [len(info[2]) for info in child_structure_infos], parent_library.n_sites
+    )
+    pair_costs[~pairs_to_map] = 0
+    calls = (
+        (
+            child_index,
+            child_structure_infos[child_index],
+            child_paths[child_index],
+            parent_orders[child_index],
+            pairs_to_map[child_index],
+        )
+        for child_index in casmamscheduling.longest_first_order(pair_costs.sum(axis=1))
+    )
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=initialize_mapping_worker,
+        initargs=(parent_library, settings),
+    ) as executor:
+        for (
+            child_index,
+            mapping_results_for_one_child,
+            worker_stats,
+        ) in casmamscheduling.iter_results_as_completed(
+            executor,
+            map_child_structure_onto_parent_structures_best_only_in_worker,
+            calls,
+            4 * n_workers,
+        ):
+            settings.add_worker_stats(worker_stats)
+
+            yield child_index, mapping_results_for_one_child
+
+
+def make_screening_descriptors(
+    parent_library: casmamparents.ParentLibrary,
+    child_structure_infos: list[tuple[np.ndarray, np.ndarray, list[str]]],
+    include_coordination_number: bool = False,
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """Compute screening descriptors of every child and every parent
+    with :func:`casmam.mapping.prefilter.make_structure_descriptors`
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+    child_structure_infos : list[tuple[np.ndarray, np.ndarray, list[str]]]
+        Child structures as returned by
+        :func:`casmam.xtal.xtal.get_structure_info_from_casm_structure`
+    include_coordination_number : bool, optional
+        Whether to compute coordination numbers, which are needed for
+        the "heuristic" prefilter and for prefilter scores
+
+    Returns
+    -------
+    tuple[dict[str, np.ndarray], dict[str, np.ndarray]]
+        Descriptors of children and of parents
+
+    """
+    child_descriptors = casmamprefilter.make_structure_descriptors(
+        [info[0] for info in child_structure_infos],
+        [info[1] for info in child_structure_infos],
+        include_coordination_number,
+    )
+    parent_descriptors = casmamprefilter.make_structure_descriptors(
+        [prim.lattice().column_vector_matrix() for prim in parent_library.prims],
+        [prim.coordinate_frac() for prim in parent_library.prims],
+        include_coordination_number,
+    )
+
+    return child_descriptors, parent_descriptors
+
+
+def order_parents_by_likelihood(
+    parent_library: casmamparents.ParentLibrary, prefilter_scores: np.ndarray
+) -> np.ndarray:
+    """Order in which to try parents for each child in best only
+    mapping: parents from the common library first, then by increasing
+    prefilter score, then in library order
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+    prefilter_scores : np.ndarray
+        Number of children by number of parents array of scores from
+        :func:`casmam.mapping.prefilter.get_prefilter_scores`
+
+    Returns
+    -------
+    np.ndarray
+        Number of children by number of parents array of parent indices
+
+    """
+    common_library_dir = str(importlib.resources.files("casmam.xtallib.common"))
+    is_not_common = np.array(
+        [os.path.dirname(path) != common_library_dir for path in parent_library.paths]
+    )
+
+    return np.array(
+        [
+            np.lexsort((np.arange(len(parent_library)), scores, is_not_common))
+            for scores in prefilter_scores
+        ],
+        dtype=int,
+    ).reshape(prefilter_scores.shape)
+
+
+def group_equivalent_child_structures(
+    child_structure_infos: list[tuple[np.ndarray, np.ndarray, list[str]]],
+) -> list[list[int]]:
+    """Group child structures that are the same mapping problem, i.e.
+    that have the same
+    :func:`casmam.xtal.xtal.make_structure_fingerprint`
+
+    Parameters
+    ----------
+    child_structure_infos : list[tuple[np.ndarray, np.ndarray, list[str]]]
+        Child structures as returned by
+        :func:`casmam.xtal.xtal.get_structure_info_from_casm_structure`
+
+    Returns
+    -------
+    list[list[int]]
+        Indices of the child structures in each group, in order of first
+        appearance
+
+    """
+    child_groups = {}
+    for child_index, child_structure_info in enumerate(child_structure_infos):
+        fingerprint = casmamxtal.make_structure_fingerprint(*child_structure_info)
+        child_groups.setdefault(fingerprint, []).append(child_index)
+
+    return list(child_groups.values())
+
+
+def copy_mapping_results_for_child(
+    mapping_results: list[list[MappingResult]],
+    child_path: str,
+    keep_mappings: bool = False,
+) -> list[list[MappingResult]]:
+    """Copy the mapping results of one child onto every parent for an
+    equivalent child at ``child_path``. Costs are the same, but lattice
+    and atom mappings relate the lattice and site order of the original
+    child to the parent, so unless ``keep_mappings`` they are left unset,
+    as with ``costs_only`` (see :meth:`MappingResult.has_mappings`)
+
+    Parameters
+    ----------
+    mapping_results : list[list[MappingResult]]
+        Mapping results of one child onto every parent
+    child_path : str
+        Path of the equivalent child
+    keep_mappings : bool, optional
+        If ``True``, also copy lattice and atom mappings, which is only
+        right if the equivalent child is identical to the original one,
+        see :func:`are_identical_structure_infos`
+
+    Returns
+    -------
+    list[list[MappingResult]]
+
+    """
+    copied_mapping_results = []
+    for results in mapping_results:
+        copied_results = [
+            copy_mapping_result(result, keep_mappings) for result in results
+        ]
+        for result in copied_results:
+            result.child_path = child_path
+        copied_mapping_results.append(copied_results)
+
+    return copied_mapping_results
+
+
+def copy_mapping_result(result: MappingResult, keep_mappings: bool) -> MappingResult:
+    """Copy of ``result`` with its costs, and its lattice and atom
+    mappings only if ``keep_mappings``
+
+    Returns
+    -------
+    MappingResult
+
+    """
+    if keep_mappings:
+        return copy.copy(result)
+
+    copied_result = MappingResult.dummy(result.parent_path, result.child_path)
+    copied_result.atomic_cost = result.atomic_cost
+    copied_result.lattice_cost = result.lattice_cost
+    copied_result.total_cost = result.total_cost
+    copied_result.timed_out = result.timed_out
+
+    return copied_result
+
+
+def are_identical_structure_infos(
+    structure_info: tuple[np.ndarray, np.ndarray, list[str]],
+    other_structure_info: tuple[np.ndarray, np.ndarray, list[str]],
+) -> bool:
+    """Returns if two structures, as returned by
+    :func:`casmam.xtal.xtal.get_structure_info_from_casm_structure`,
+    have exactly the same lattice, coordinates and atom types in the same
+    order, so that mappings of one are mappings of the other
+
+    Returns
+    -------
+    bool
+
+    """
+    return (
+        np.array_equal(structure_info[0], other_structure_info[0])
+        and np.array_equal(structure_info[1], other_structure_info[1])
+        and list(structure_info[2]) == list(other_structure_info[2])
+    )
+
+
+def count_completed_children(
+    child_mapping_results,
+    progress: casmamprogress.MappingProgress | None,
+    n_children: int,
+    n_pairs: int,
+):
+    """Pass on the mapping results of every child, counting each as a
+    completed child of ``progress``, if any, between the start and the
+    end of the run
+
+    Parameters
+    ----------
+    child_mapping_results : Iterable
+        Mapping results of each child, in any form
+    progress : casmam.mapping.progress.MappingProgress | None
+        Progress of the run
+    n_children : int
+        Number of children of the run
+    n_pairs : int
+        Number of (child, parent) pairs of the run
+
+    Yields
+    ------
+    Items of ``child_mapping_results``
+
+    """
+    if progress is None:
+        yield from child_mapping_results
+        return
+
+    progress.start(n_children, n_pairs)
+    for item in child_mapping_results:
+        progress.add_children()
+        yield item
+    progress.finish()
+
+
+def iter_child_mapping_results(
+    parent_library: casmamparents.ParentLibrary,
+    child_structures: list[casm.xtal.Structure],
+    child_structure_infos: list[tuple[np.ndarray, np.ndarray, list[str]]],
+    child_paths: list[str],
+    settings: MappingSettings,
+    n_workers: int = 1,
+    prefilter: str = "none",
+    best_only: bool = False,
+):
+    """Prefilter (child, parent) pairs, and map the remaining ones
+    serially or in parallel. See
+    :func:`map_child_structures_onto_parent_structures` for the
+    arguments
+
+    Yields
+    ------
+    tuple[int, list[list[MappingResult]]]
+        Index of a child and its mapping results onto every parent
+
+    """
+    child_descriptors, parent_descriptors = make_screening_descriptors(
+        parent_library,
+        child_structure_infos,
+        include_coordination_number=best_only or prefilter == "heuristic",
+    )
+    pairs_to_map = casmamprefilter.prefilter_pairs(
+        child_descriptors, parent_descriptors, prefilter
+    )
+    parent_orders = None
+    if best_only:
+        parent_orders = order_parents_by_likelihood(
+            parent_library,
+            casmamprefilter.get_prefilter_scores(child_descriptors, parent_descriptors),
+        )
+    if not settings.quiet:
+        print(
+            "Prefilter skipped "
+            + str(np.count_nonzero(~pairs_to_map))
+            + " of "
+            + str(pairs_to_map.size)
+            + " pairs"
+        )
+    # TODO: Sanitize args and kwargs. Think about what to expose to the user
+    if n_workers > 1:
+        child_mapping_results = iter_child_mapping_results_in_parallel(
+            parent_library,
+            child_structure_infos,
+            child_paths,
+            pairs_to_map,
+            settings,
+            n_workers,
+            parent_orders,
+        )
+    else:
+        child_mapping_results = iter_child_mapping_results_serially(
+            parent_library,
+            child_structures,
+            child_paths,
+            pairs_to_map,
+            settings,
+            parent_orders,
+        )
+
+    yield from count_completed_children(
+        child_mapping_results,
+        settings.progress,
+        len(child_paths),
+        int(pairs_to_map.size),
+    )
+
+    if not settings.quiet and settings.cache is not None:
+        print(settings.cache.report())
+
+
+def select_unique_parents(
+    parent_library: casmamparents.ParentLibrary, quiet=True
+) -> tuple[casmamparents.ParentLibrary, list[list[int]]]:
+    """Keep one parent of each group of equivalent parents, see
+    :func:`casmam.mapping.parents.group_equivalent_parents`
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures
+    quiet : bool, optional
+        If ``False``, report how many parents are kept
+
+    Returns
+    -------
+    tuple[casmam.mapping.parents.ParentLibrary, list[list[int]]]
+        Library of the representative of each group, and the groups
+
+    """
+    parent_groups = casmamparents.group_equivalent_parents(parent_library)
+    if not quiet:
+        print(
+            "Mapping onto "
+            + str(len(parent_groups))
+            + " unique of "
+            + str(len(parent_library))
+            + " parent structures"
+        )
+
+    return (
+        parent_library.select([parent_group[0] for parent_group in parent_groups]),
+        parent_groups,
+    )
+
+
+def copy_mapping_results_for_parent_aliases(
+    mapping_results: list[list[MappingResult]],
+    parent_groups: list[list[int]],
+    parent_paths: list[str],
+    parent_content_hashes: list[str] = None,
+    parent_n_sites: list[int] = None,
+    child_n_sites: int = None,
+) -> list[list[MappingResult]]:
+    """Expand the mapping results of one child onto the representatives
+    of groups of equivalent parents into results onto every parent,
+    copying them for the other parents of each group. Other parents of a
+    group may be supercells of the representative, which the child can
+    only be mapped onto if their number of sites divides the child's.
+    Those that do not get a dummy result, the others get the costs of
+    the representative. Its lattice and atom mappings are relative to its
+    own setting, so they are only copied to parents that are identical
+    to it, see :func:`copy_mapping_result`
+
+    Parameters
+    ----------
+    mapping_results : list[list[MappingResult]]
+        Mapping results of one child onto the representative of each
+        group
+    parent_groups : list[list[int]]
+        Groups from :func:`casmam.mapping.parents.group_equivalent_parents`
+    parent_paths : list[str]
+        Path of every parent
+    parent_content_hashes : list[str], optional
+        :attr:`casmam.mapping.parents.ParentLibrary.content_hashes` of
+        every parent, to find identical parents. By default only costs
+        are copied
+    parent_n_sites : list[int], optional
+        Number of sites of every parent. By default the costs are copied
+        to every parent of a group
+    child_n_sites : int, optional
+        Number of sites of the child, required with ``parent_n_sites``
+
+    Returns
+    -------
+    list[list[MappingResult]]
+        Mapping results of the child onto every parent
+
+    """
+    expanded_mapping_results = [None] * len(parent_paths)
+    for results, parent_group in zip(mapping_results, parent_groups):
+        representative, *aliases = parent_group
+        expanded_mapping_results[representative] = results
+        for parent_index in aliases:
+            if (
+                parent_n_sites is not None
+                and child_n_sites % parent_n_sites[parent_index]
+            ):
+                expanded_mapping_results[parent_index] = [
+                    MappingResult.dummy(
+                        parent_paths[parent_index], results[0].child_path
+                    )
+                ]
+                continue
+
+            keep_mappings = (
+                parent_content_hashes is not None
+                and parent_content_hashes[parent_index]
+                == parent_content_hashes[representative]
+            )
+            copied_results = [
+                copy_mapping_result(result, keep_mappings) for result in results
+            ]
+            for result in copied_results:
+                result.parent_path = parent_paths[parent_index]
+            expanded_mapping_results[parent_index] = copied_results
+
+    return expanded_mapping_results
+
+
+def map_child_structures_onto_parent_structures(
+    parent_structures: list[casm.xtal.Prim] | casmamparents.ParentLibrary,
+    child_structures: list[casm.xtal.Structure],
+    parent_paths: list[str] = None,
+    child_paths: list[str] = None,
+    quiet=True,
+    n_workers: int = 1,
+    mapping_options: dict = None,
+    pair_time_budget: float = None,
+    prefilter: str = "none",
+    best_only: bool = False,
+    tol: float = 1e-4,
+    deduplicate: bool = False,
+    cache: casmamcache.MappingCache = None,
+    checkpoint: casmamcheckpoint.MappingCheckpoint = None,
+    deduplicate_parents: bool = False,
+    profile: casmaminstrumentation.MappingProfile = None,
+    progress: casmamprogress.MappingProgress = None,
+    **kwargs,
+) -> list[list[list[MappingResult]]]:
+    """Cycle through child crystal structures and map each of them
+    onto the parent structures. Assumes ``parent_structures`` and
+    ``child_structures`` have the desired atom types. If not, use
+    helper :func:``casmam.mapping.mask_child_structure_atom_types``
+    function. Need ``parent_paths`` and ``child_paths`` to keep track of
+    these files in ``MappingResult``. Parent factor groups are built
+    once, either up front in a ``ParentLibrary`` or here if a list of
+    ``Prim`` is given, and reused for every child.
+
+    Parameters
+    ----------
+    parent_structures : List[casm.xtal.Prim] | casmam.mapping.parents.ParentLibrary
+        List of parent crystal structures as casm ``Prim``, or a
+        ``ParentLibrary`` in which case ``parent_paths`` is ignored
+    child_structures : List[casm.xtal.Structure]
+        List of child crystal structures as casm ``Structure``
+    n_workers : int, optional
+        Number of worker processes to distribute (child, parent) pairs
+        over. By default (1) everything is mapped in this process
+    mapping_options : dict, optional
+        Mapping options. By default uses :func:`default_mapping_options`
+    pair_time_budget : float, optional
+        Wall-clock time in seconds after which mapping a single (child,
+        parent) pair is abandoned and recorded as a dummy
+        ``MappingResult`` with ``timed_out`` set. By default there is no
+        limit
+    prefilter : str, optional
+        Mode of :func:`casmam.mapping.prefilter.prefilter_pairs` used to
+        skip (child, parent) pairs before mapping. "none" (default) maps
+        every pair, "safe" skips pairs whose number of sites does not
+        divide, which the mapper would reject right away, "heuristic"
+        also skips pairs that very likely cannot map. Skipped pairs get a
+        dummy ``MappingResult``
+    best_only : bool, optional
+        If ``True``, only the best parent of each child, and parents
+        within ``tol`` of it, are guaranteed to be found. Parents are
+        tried from the most to the least likely (see
+        :func:`order_parents_by_likelihood`) and after each successful
+        map ``max_cost`` is lowered to the best cost so far plus ``tol``,
+        so other parents are searched far less. Parents that cannot beat
+        that bound get a dummy ``MappingResult``
+    tol : float, optional
+        Tolerance within which costs are considered tied, used in
+        ``best_only`` mode. The same as in :func:`analyze_mapping_data`
+    deduplicate : bool, optional
+        If ``True``, child structures that are the same mapping problem
+        (see :func:`group_equivalent_child_structures`) are mapped once,
+        and the results are copied to every equivalent child with its
+        own ``child_path``. Unless the equivalent child is identical, only
+        the costs are copied, see :func:`copy_mapping_results_for_child`
+    cache : casmam.mapping.cache.MappingCache, optional
+        On-disk cache of mapping results, consulted before mapping each
+        (child, parent) pair. By default nothing is cached
+    checkpoint : casmam.mapping.checkpoint.MappingCheckpoint, optional
+        Checkpoint to which the results of every child are appended as
+        soon as they are complete
+    deduplicate_parents : bool, optional
+        If ``True``, parents that are the same crystal once occupants are
+        masked (see :func:`casmam.mapping.parents.group_equivalent_parents`),
+        e.g. a crystal in other settings or supercells, are mapped onto
+        only once. Its costs are reported under every equivalent
+        parent's ``parent_path`` whose number of sites divides the
+        child's, see :func:`copy_mapping_results_for_parent_aliases`
+    profile : casmam.mapping.instrumentation.MappingProfile, optional
+        Profile to record the wall time of factor groups and of every
+        mapped pair in, including those mapped in worker processes
+    progress : casmam.mapping.progress.MappingProgress, optional
+        Progress to report the run with, counting pairs mapped in worker
+        processes too. By default progress is printed every 10 seconds
+        unless ``quiet``
+    **kwargs : TODO
+
+    Returns
+    -------
+    list[list[MappingResult]]
+
+    """
+    if isinstance(parent_structures, casmamparents.ParentLibrary):
+        parent_library = parent_structures
+    else:
+        parent_library = casmamparents.ParentLibrary(parent_structures, parent_paths)
+
+    if child_paths is None:
+        child_paths = ["not available"] * len(child_structures)
+
+    parent_paths = parent_library.paths
+    parent_content_hashes = parent_library.content_hashes
+    parent_n_sites = parent_library.n_sites
+    parent_groups = [[parent_index] for parent_index in range(len(parent_library))]
+    if deduplicate_parents:
+        parent_library, parent_groups = select_unique_parents(parent_library, quiet)
+
+    child_structure_infos = [
+        casmamxtal.get_structure_info_from_casm_structure(child_structure)
+        for child_structure in child_structures
+    ]
+
+    child_groups = [[child_index] for child_index in range(len(child_structures))]
+    if deduplicate:
+        child_groups = group_equivalent_child_structures(child_structure_infos)
+        if not quiet:
+            print(
+                "Mapping "
+                + str(len(child_groups))
+                + " unique of "
+                + str(len(child_structures))
+                + " child structures"
+            )
+    representatives = [child_group[0] for child_group in child_groups]
+
+    settings = MappingSettings(
+        mapping_options,
+        pair_time_budget,
+        tol,
+        cache,
+        quiet,
+        profile,
+        make_progress(progress, quiet),
+    )
+    child_mapping_results = iter_child_mapping_results(
+        parent_library,
+        [child_structures[child_index] for child_index in representatives],
+        [child_structure_infos[child_index] for child_index in representatives],
+        [child_paths[child_index] for child_index in representatives],
+        settings,
+        n_workers,
+        prefilter,
+        best_only,
+    )
+
+    mapping_results = [None] * len(child_structures)
+    for group_index, mapping_results_for_one_child in child_mapping_results:
+        representative, *equivalent_children = child_groups[group_index]
+        mapping_results_for_one_child = copy_mapping_results_for_parent_aliases(
+            mapping_results_for_one_child,
+            parent_groups,
+            parent_paths,
+            parent_content_hashes,
+            parent_n_sites,
+            len(child_structure_infos[representative][2]),
+        )
+
+        mapping_results[representative] = mapping_results_for_one_child
+        for child_index in equivalent_children:
+            mapping_results[child_index] = copy_mapping_results_for_child(
+                mapping_results_for_one_child,
+                child_paths[child_index],
+                are_identical_structure_infos(
+                    child_structure_infos[child_index],
+                    child_structure_infos[representative],
+                ),
+            )
+
+        if checkpoint is not None:
+            for child_index in child_groups[group_index]:
+                checkpoint.append(
+                    child_paths[child_index], mapping_results[child_index]
+                )
+
+    return mapping_results
+
+
+def map_child_path(
+    parent_library: casmamparents.ParentLibrary,
+    parent_descriptors: dict[str, np.ndarray],
+    child_path: str,
+    settings: MappingSettings,
+    prefilter: str = "none",
+    best_only: bool = False,
+    child_structure_info: tuple[np.ndarray, np.ndarray, list[str]] = None,
+) -> tuple[int, list[list[MappingResult]]]:
+    """Read one child structure, mask its atom types, prefilter its
+    pairs and map it onto every parent. Nothing about other children is
+    needed, so children can be mapped one at a time
+
+    Parameters
+    ----------
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures with their factor groups
+    parent_descriptors : dict[str, np.ndarray]
+        :func:`casmam.mapping.prefilter.make_structure_descriptors` of
+        the parents. Coordination numbers are computed for the child
+        only if they are included
+    child_path : str
+        Path of the child structure
+    settings : MappingSettings
+        Settings of the run
+    prefilter : str, optional
+        Prefilter mode, see :func:`map_child_structures_onto_parent_structures`
+    best_only : bool, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    child_structure_info : tuple[np.ndarray, np.ndarray, list[str]], optional
+        Child structure if it is already read, e.g. by
+        :func:`iter_child_structure_infos`. By default it is read from
+        ``child_path``
+
+    Returns
+    -------
+    tuple[int, list[list[MappingResult]]]
+        Number of sites of the child, see
+        :func:`copy_mapping_results_for_parent_aliases`, and its mapping
+        results onto every parent
+
+    """
+    with casmaminstrumentation.profile_phase(settings.profile, "read_child_structures"):
+        if child_structure_info is None:
+            child_structure_info = read_child_structure_infos([child_path])[0]
+        child_structure = mask_child_structure_atom_types(
+            [casmamxtal.casm_structure_from_structure_info(*child_structure_info)]
+        )[0]
+    child_structure_info = casmamxtal.get_structure_info_from_casm_structure(
+        child_structure
+    )
+    child_descriptors = casmamprefilter.make_structure_descriptors(
+        [child_structure_info[0]],
+        [child_structure_info[1]],
+        "coordination_number" in parent_descriptors,
+    )
+    pairs_to_map = casmamprefilter.prefilter_pairs(
+        child_descriptors, parent_descriptors, prefilter
+    )
+    parent_orders = None
+    if best_only:
+        parent_orders = order_parents_by_likelihood(
+            parent_library,
+            casmamprefilter.get_prefilter_scores(child_descriptors, parent_descriptors),
+        )
+
+    _, mapping_results = next(
+        iter_child_mapping_results_serially(
+            parent_library,
+            [child_structure],
+            [child_path],
+            pairs_to_map,
+            settings,
+            parent_orders,
+        )
+    )
+
+    return len(child_structure_info[2]), mapping_results
+
+
+def map_child_path_in_worker(
+    child_path: str,
+    parent_descriptors: dict[str, np.ndarray],
+    prefilter: str,
+    best_only: bool,
+    child_structure_info: tuple[np.ndarray, np.ndarray, list[str]] = None,
+) -> tuple[tuple[int, list[list[MappingResult]]], dict]:
+    """:func:`map_child_path` in a worker process set up by
+    :func:`initialize_mapping_worker`
+
+    Returns
+    -------
+    tuple[tuple[int, list[list[MappingResult]]], dict]
+        What :func:`map_child_path` returns and
+        :func:`pop_worker_stats`
+
+    """
+    mapping_results = map_child_path(
+        _worker_parent_library,
+        parent_descriptors,
+        child_path,
+        _worker_settings,
+        prefilter,
+        best_only,
+        child_structure_info,
+    )
+
+    return mapping_results, pop_worker_stats()
+
+
+def iter_child_path_mapping_results_in_parallel(
+    parent_library: casmamparents.ParentLibrary,
+    parent_descriptors: dict[str, np.ndarray],
+    child_paths: list[str],
+    settings: MappingSettings,
+    n_workers: int,
+    prefilter: str = "none",
+    best_only: bool = False,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+):
+    """:func:`map_child_path` for every child, distributing whole
+    children over ``n_workers`` processes. Workers read their children,
+    unless there is a ``snapshot``, which the children are then sent
+    from
+
+    Yields
+    ------
+    tuple[int, list[list[MappingResult]]]
+        :func:`map_child_path` of each child, in the order of
+        ``child_paths``
+
+    """
+    child_structure_infos = [None] * len(child_paths)
+    if snapshot is not None:
+        child_structure_infos = iter_child_structure_infos(
+            child_paths, snapshot=snapshot
+        )
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=initialize_mapping_worker,
+        initargs=(parent_library, settings),
+    ) as executor:
+        for mapping_results, worker_stats in casmamscheduling.iter_results_in_order(
+            executor,
+            map_child_path_in_worker,
+            (
+                (child_path, parent_descriptors, prefilter, best_only, info)
+                for child_path, info in zip(child_paths, child_structure_infos)
+            ),
+            4 * n_workers,
+        ):
+            settings.add_worker_stats(worker_stats)
+
+            yield mapping_results
+
+
+def iter_child_path_mapping_results(
+    parent_library: casmamparents.ParentLibrary,
+    child_paths: list[str],
+    settings: MappingSettings,
+    n_workers: int = 1,
+    prefilter: str = "none",
+    best_only: bool = False,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+):
+    """:func:`map_child_path` for every child, serially or distributing
+    whole children over ``n_workers`` processes. Only the children in
+    flight are in memory. Children are taken from ``snapshot`` where it
+    is up to date
+
+    Yields
+    ------
+    tuple[int, list[list[MappingResult]]]
+        :func:`map_child_path` of each child, in the order of
+        ``child_paths``
+
+    """
+    parent_descriptors = casmamprefilter.make_structure_descriptors(
+        [prim.lattice().column_vector_matrix() for prim in parent_library.prims],
+        [prim.coordinate_frac() for prim in parent_library.prims],
+        include_coordination_number=best_only or prefilter == "heuristic",
+    )
+
+    if n_workers > 1:
+        child_mapping_results = iter_child_path_mapping_results_in_parallel(
+            parent_library,
+            parent_descriptors,
+            child_paths,
+            settings,
+            n_workers,
+            prefilter,
+            best_only,
+            snapshot,
+        )
+    else:
+        child_mapping_results = (
+            map_child_path(
+                parent_library,
+                parent_descriptors,
+                child_path,
+                settings,
+                prefilter,
+                best_only,
+                child_structure_info,
+            )
+            for child_path, child_structure_info in zip(
+                child_paths, iter_child_structure_infos(child_paths, snapshot=snapshot)
+            )
+        )
+
+    yield from count_completed_children(
+        child_mapping_results,
+        settings.progress,
+        len(child_paths),
+        len(child_paths) * len(parent_library),
+    )
+
+
+def iter_mappings(
+    child_paths: list[str],
+    parent_structures: str | list[str] | casmamparents.ParentLibrary,
+    quiet=True,
+    n_workers: int = 1,
+    mapping_options: dict = None,
+    pair_time_budget: float = None,
+    prefilter: str = "none",
+    best_only: bool = False,
+    tol: float = 1e-4,
+    cache: casmamcache.MappingCache = None,
+    checkpoint: casmamcheckpoint.MappingCheckpoint = None,
+    deduplicate_parents: bool = False,
+    profile: casmaminstrumentation.MappingProfile = None,
+    progress: casmamprogress.MappingProgress = None,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+):
+    """Streaming counterpart of
+    :func:`map_child_structures_onto_parent_structures`. Each child is
+    read, masked, mapped and yielded before the next one is read, so
+    memory use does not grow with the number of children, and results
+    can be written out as they come (see
+    :class:`casmam.mapping.store.MappingResultStoreWriter` and
+    :class:`MappingResultHDFWriter`). With ``n_workers`` processes, a
+    few children per worker are in flight at a time. Children are not
+    deduplicated, since that needs all of them up front
+
+    Parameters
+    ----------
+    child_paths : list[str]
+        Paths of properties.calc.json/structure.json files of child
+        structures. Can be any iterable
+    parent_structures : str | list[str] | casmam.mapping.parents.ParentLibrary
+        Parent library, or anything :func:`make_parent_library` accepts
+    quiet : bool, optional
+        If ``False``, report progress
+    n_workers : int, optional
+        Number of worker processes. By default maps in this process
+    mapping_options : dict, optional
+        Mapping options. By default uses :func:`default_mapping_options`
+    pair_time_budget : float, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    prefilter : str, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    best_only : bool, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    tol : float, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    cache : casmam.mapping.cache.MappingCache, optional
+        On-disk cache of mapping results
+    checkpoint : casmam.mapping.checkpoint.MappingCheckpoint, optional
+        Children already in the checkpoint are yielded from it without
+        being mapped, the others are appended to it as they are yielded
+    deduplicate_parents : bool, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    profile : casmam.mapping.instrumentation.MappingProfile, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    progress : casmam.mapping.progress.MappingProgress, optional
+        See :func:`map_child_structures_onto_parent_structures`
+    snapshot : casmam.mapping.snapshot.ChildStructureSnapshot, optional
+        See :func:`map_configurations_onto_parent_structures`
+
+    Yields
+    ------
+    tuple[str, list[list[MappingResult]]]
+        Path of each child and its mapping results onto every parent,
+        in the order of ``child_paths``
+
+    """
+    if isinstance(parent_structures, casmamparents.ParentLibrary):
+        parent_library = parent_structures
+    else:
+        parent_library = make_parent_library(parent_structures)
+
+    parent_paths = parent_library.paths
+    parent_content_hashes = parent_library.content_hashes
+    parent_n_sites = parent_library.n_sites
+    parent_groups = [[parent_index] for parent_index in range(len(parent_library))]
+    if deduplicate_parents:
+        parent_library, parent_groups = select_unique_parents(parent_library, quiet)
+
+    child_paths = list(child_paths)
+    # results of children in the checkpoint are read back one at a time
+    completed_child_paths = set()
+    completed_mapping_results = iter([])
+    if checkpoint is not None:
+        completed_child_paths = set(checkpoint.completed)
+        completed_mapping_results = checkpoint.load_results(
+            [
+                child_path
+                for child_path in child_paths
+                if child_path in completed_child_paths
+            ]
+        )
+
+    settings = MappingSettings(
+        mapping_options,
+        pair_time_budget,
+        tol,
+        cache,
+        quiet,
+        profile,
+        make_progress(progress, quiet),
+    )
+    remaining_mapping_results = iter_child_path_mapping_results(
+        parent_library,
+        [
+            child_path
+            for child_path in child_paths
+            if child_path not in completed_child_paths
+        ],
+        settings,
+        n_workers,
+        prefilter,
+        best_only,
+        snapshot,
+    )
+
+    for child_path in child_paths:
+        if child_path in completed_child_paths:
+            yield child_path, next(completed_mapping_results)
+            continue
+
+        child_n_sites, mapping_results_for_one_child = next(remaining_mapping_results)
+        mapping_results_for_one_child = copy_mapping_results_for_parent_aliases(
+            mapping_results_for_one_child,
+            parent_groups,
+            parent_paths,
+            parent_content_hashes,
+            parent_n_sites,
+            child_n_sites,
+        )
+        if checkpoint is not None:
+            checkpoint.append(child_path, mapping_results_for_one_child)
+
+        yield child_path, mapping_results_for_one_child
+
+    # run the remaining mapping results to their end, which reports it
+    next(remaining_mapping_results, None)
+    if not quiet and cache is not None:
+        print(cache.report())
+
+
+def iter_configuration_mappings(
+    child_paths: list[str],
+    parent_paths: str | list[str],
+    quiet=False,
+    n_workers: int = 1,
+    pair_time_budget: float = None,
+    prefilter: str = "none",
+    best_only: bool = False,
+    cache: casmamcache.MappingCache = None,
+    checkpoint_path: str = None,
+    resume: bool = False,
+    shard: tuple[int, int] = None,
+    deduplicate_parents: bool = False,
+    max_maps_per_pair: int = None,
+    costs_only: bool = False,
+    profile: casmaminstrumentation.MappingProfile = None,
+    progress: casmamprogress.MappingProgress = None,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+):
+    """Streaming counterpart of
+    :func:`map_configurations_onto_parent_structures`, see
+    :func:`iter_mappings`. Arguments are the same, except that children
+    cannot be deduplicated
+
+    Yields
+    ------
+    tuple[str, list[list[MappingResult]]]
+        Path of each child and its mapping results onto every parent
+
+    """
+    with casmaminstrumentation.profile_phase(profile, "load_parents"):
+        parent_library = make_parent_library(parent_paths)
+    mapping_options = make_configuration_mapping_options(max_maps_per_pair, costs_only)
+
+    if shard is not None:
+        child_paths = select_child_paths_of_shard(
+            child_paths, parent_library, *shard, snapshot=snapshot
+        )
+
+    checkpoint = None
+    if checkpoint_path is not None:
+        checkpoint = open_mapping_checkpoint(
+            checkpoint_path,
+            parent_library,
+            child_paths,
+            mapping_options,
+            prefilter,
+            best_only,
+            deduplicate_parents,
+            resume,
+            quiet,
+        )
+
+    yield from iter_mappings(
+        child_paths,
+        parent_library,
+        quiet=quiet,
+        n_workers=n_workers,
+        mapping_options=mapping_options,
+        pair_time_budget=pair_time_budget,
+        prefilter=prefilter,
+        best_only=best_only,
+        cache=cache,
+        checkpoint=checkpoint,
+        deduplicate_parents=deduplicate_parents,
+        profile=profile,
+        progress=progress,
+        snapshot=snapshot,
+    )
+
+
+def get_casm_config_name_from_child_path(child_path: str) -> str:
+    """This assumes that the child path is in casm directory
+    style like "*/training_data/SCEL.../*/structure.json"
+    or "*/training_data/SCEL.../*/calctype.*/properties.json"
+    and only return SCEL.../* part
+
+    Returns
+    -------
+    str
+        config name
+
+    """
+    if os.path.basename(child_path) == "structure.json":
+        i = 0
+        dirname = child_path
+        while i <= 2:
+            dirname = os.path.dirname(dirname)
+            i += 1
+
+        config_name = child_path.replace(dirname + "/", "").replace(
+            "/structure.json", ""
+        )
+
+    elif os.path.basename(child_path) == "properties.calc.json":
+        i = 0
+        dirname = child_path
+        while i <= 3:
+            dirname = os.path.dirname(dirname)
+            if i == 0:
+                child_path = child_path.replace(os.path.basename(dirname) + "/", "")
+            i += 1
+
+        config_name = child_path.replace(dirname + "/", "").replace(
+            "/properties.calc.json", ""
+        )
 
     else:
         raise RuntimeError(
@@ -608,6 +3225,581 @@ def organize_mapping_results(
     return mapping_results_table
 
 
+# chunks written by MappingResultHDFWriter are stored under this prefix
+_hdf_chunk_key_prefix = "mapping_results_chunk_"
+# key of the series of parent content hashes, see get_parent_content_hashes
+_hdf_parent_content_hashes_key = "parent_content_hashes"
+# key of the json of the mapping options, see make_configuration_mapping_options
+_hdf_mapping_options_key = "mapping_options"
+
+
+def write_mapping_results_hdf(mapping_results_table: pd.DataFrame, path: str):
+    """Write a table of :func:`organize_mapping_results` to a hdf5 file,
+    with the parent content hashes and mapping options in its ``attrs``
+    if it has them. Read it with :func:`read_mapping_results_hdf`
+
+    Parameters
+    ----------
+    mapping_results_table : pd.DataFrame
+        Output of :func:`organize_mapping_results`
+    path : str
+        Path of the hdf5 file, which is overwritten
+
+    """
+    mapping_results_table.to_hdf(path, key="mapping_results", mode="w")
+    _write_hdf_attrs(
+        path,
+        mapping_results_table.attrs.get("parent_content_hashes"),
+        mapping_results_table.attrs.get("mapping_options"),
+    )
+
+
+def _write_hdf_attrs(
+    path: str, parent_content_hashes: dict | None, mapping_options: dict | None
+):
+    if parent_content_hashes:
+        pd.Series(parent_content_hashes, dtype=object).to_hdf(
+            path, key=_hdf_parent_content_hashes_key
+        )
+    if mapping_options is not None:
+        pd.Series([json.dumps(mapping_options)], dtype=object).to_hdf(
+            path, key=_hdf_mapping_options_key
+        )
+
+
+def _read_hdf_attrs(hdf_store: pd.HDFStore) -> dict:
+    attrs = {}
+    if "/" + _hdf_parent_content_hashes_key in hdf_store:
+        attrs["parent_content_hashes"] = dict(hdf_store[_hdf_parent_content_hashes_key])
+    if "/" + _hdf_mapping_options_key in hdf_store:
+        attrs["mapping_options"] = json.loads(hdf_store[_hdf_mapping_options_key][0])
+
+    return attrs
+
+
+class MappingResultHDFWriter:
+
+    """Write the table of :func:`organize_mapping_results` to a hdf5
+    file while mapping results come in, e.g. from :func:`iter_mappings`,
+    keeping only ``chunk_size`` children in memory. The fixed hdf5
+    format, which is the one that can hold ``MappingResult`` objects,
+    cannot be appended to, so each chunk of rows is stored under its own
+    key. Read the file with :func:`read_mapping_results_hdf`. The file is
+    written under a temporary name and only appears at ``path`` once it
+    is closed
+
+    Attributes
+    ----------
+    path : str
+        Path of the hdf5 file
+    chunk_size : int
+        Number of children per chunk
+    n_chunks : int
+        Number of chunks written so far
+    parent_content_hashes : dict[str, str] | None
+        Written with the table, see :func:`get_parent_content_hashes`
+    mapping_options : dict | None
+        Written with the table, see
+        :func:`make_configuration_mapping_options`
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = 1000,
+        parent_content_hashes: dict[str, str] = None,
+        mapping_options: dict = None,
+    ):
+        """Start writing a hdf5 file
+
+        Parameters
+        ----------
+        path : str
+            Path of the hdf5 file
+        chunk_size : int, optional
+            Number of children per chunk
+        parent_content_hashes : dict[str, str], optional
+            Content hash of every parent, see
+            :func:`get_parent_content_hashes`. By default none are written
+        mapping_options : dict, optional
+            Options the results are mapped with. By default none are
+            written
+
+        """
+        self.path = str(path)
+        self.chunk_size = chunk_size
+        self.n_chunks = 0
+        self.parent_content_hashes = parent_content_hashes
+        self.mapping_options = mapping_options
+        self._temporary_path = self.path + ".tmp"
+        self._chunk = []
+
+        if os.path.exists(self._temporary_path):
+            os.remove(self._temporary_path)
+
+    def append(self, mapping_results_for_one_child: list[list[MappingResult]]):
+        """Add the mapping results of one child onto every parent
+
+        Parameters
+        ----------
+        mapping_results_for_one_child : list[list[MappingResult]]
+            One entry of the output of
+            :func:`map_child_structures_onto_parent_structures`
+
+        """
+        self._chunk.append(mapping_results_for_one_child)
+        if len(self._chunk) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the children appended since the last chunk as a chunk"""
+        if len(self._chunk) == 0:
+            return
+
+        organize_mapping_results(self._chunk).to_hdf(
+            self._temporary_path,
+            key=_hdf_chunk_key_prefix + format(self.n_chunks, "06d"),
+        )
+        self.n_chunks += 1
+        self._chunk = []
+
+    def close(self):
+        """Write the last chunk and move the file to ``path``
+
+        Raises
+        ------
+        RuntimeError
+            If no children were appended, since there is no table to write
+
+        """
+        self.flush()
+        if self.n_chunks == 0:
+            raise RuntimeError("No mapping results to write to " + self.path)
+
+        _write_hdf_attrs(
+            self._temporary_path, self.parent_content_hashes, self.mapping_options
+        )
+        os.replace(self._temporary_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception_type is None:
+            self.close()
+        elif os.path.exists(self._temporary_path):
+            os.remove(self._temporary_path)
+
+
+def read_mapping_results_hdf(path: str) -> pd.DataFrame:
+    """Read a table of mapping results from a hdf5 file, written either
+    in one piece with ``to_hdf`` (see :func:`write_mapping_results_hdf`)
+    or in chunks by :class:`MappingResultHDFWriter`. Parent content
+    hashes and mapping options written with it are put in ``attrs``
+
+    Parameters
+    ----------
+    path : str
+        Path of the hdf5 file
+
+    Returns
+    -------
+    pd.DataFrame
+
+    Raises
+    ------
+    RuntimeError
+        If the file contains no table
+
+    """
+    chunks = list(iter_mapping_results_hdf(path))
+    mapping_results_table = pd.concat(chunks)
+    mapping_results_table.attrs = dict(chunks[0].attrs)
+
+    return mapping_results_table
+
+
+def iter_mapping_results_hdf(path: str):
+    """Read a hdf5 file of :func:`read_mapping_results_hdf` one chunk
+    written by :class:`MappingResultHDFWriter` at a time. A table
+    written in one piece is read as a single chunk
+
+    Parameters
+    ----------
+    path : str
+        Path of the hdf5 file
+
+    Yields
+    ------
+    pd.DataFrame
+        Rows of the table of each chunk, with the parent content hashes
+        and mapping options in ``attrs`` if the file has them
+
+    Raises
+    ------
+    RuntimeError
+        If the file contains no table
+
+    """
+    with pd.HDFStore(path, "r") as hdf_store:
+        keys = [
+            key
+            for key in hdf_store.keys()
+            if key
+            not in [
+                "/" + _hdf_parent_content_hashes_key,
+                "/" + _hdf_mapping_options_key,
+            ]
+        ]
+        chunk_keys = sorted(
+            key for key in keys if key.startswith("/" + _hdf_chunk_key_prefix)
+        )
+        if len(chunk_keys) == 0:
+            if len(keys) == 0:
+                raise RuntimeError("No mapping results in " + str(path))
+            chunk_keys = keys[:1]
+
+        attrs = _read_hdf_attrs(hdf_store)
+        for key in chunk_keys:
+            mapping_results_table = hdf_store[key]
+            mapping_results_table.attrs = copy.deepcopy(attrs)
+            yield mapping_results_table
+
+
+def analyze_mapping_results_hdf(path: str, tol: float = 1e-4) -> pd.DataFrame:
+    """:func:`analyze_mapping_data` of a hdf5 file of
+    :func:`read_mapping_results_hdf`, one chunk at a time (see
+    :func:`iter_mapping_results_hdf`), so that only one chunk of
+    ``MappingResult`` objects is in memory at once. A table written in
+    one piece is read as a whole
+
+    Parameters
+    ----------
+    path : str
+        Path of the hdf5 file
+    tol : float, optional
+        Tolerance within which costs are tied, see
+        :func:`find_best_parents_and_flag_conflicts`
+
+    Returns
+    -------
+    pd.DataFrame
+        Same table as :func:`analyze_mapping_data`
+
+    """
+    return pd.concat(
+        [
+            analyze_mapping_data(mapping_results_table, tol)
+            for mapping_results_table in iter_mapping_results_hdf(path)
+        ]
+    )
+
+
+def merge_mapping_results(
+    mapping_results_tables: list[pd.DataFrame], config_names: list[str] = None
+) -> pd.DataFrame:
+    """Combine the outputs of :func:`organize_mapping_results` of the
+    shards of a sharded run into one ``DataFrame``, as if everything had
+    been mapped in one run
+
+    Parameters
+    ----------
+    mapping_results_tables : list[pd.DataFrame]
+        Output of each shard
+    config_names : list[str], optional
+        Names of the configurations in the order of the rows of the
+        merged ``DataFrame``, e.g. the configurations given to every
+        shard. By default rows are in the order of the shards
+
+    Returns
+    -------
+    pd.DataFrame
+        Mapping results of every configuration
+
+    Raises
+    ------
+    RuntimeError
+        If shards have different parent crystal structures, or the same
+        configuration, or if a configuration in ``config_names`` is not
+        in any shard
+
+    """
+    columns = mapping_results_tables[0].columns
+    for mapping_results_table in mapping_results_tables[1:]:
+        if not mapping_results_table.columns.equals(columns):
+            raise RuntimeError(
+                "Shards were mapped onto different parent crystal structures"
+            )
+
+    merged_mapping_results = pd.concat(mapping_results_tables)
+
+    duplicated = merged_mapping_results.index.duplicated()
+    if duplicated.any():
+        raise RuntimeError(
+            "Configurations are in more than one shard ("
+            + ", ".join(merged_mapping_results.index[duplicated])
+            + ")"
+        )
+
+    if config_names is None:
+        return merged_mapping_results
+
+    missing_config_names = [
+        config_name
+        for config_name in config_names
+        if config_name not in merged_mapping_results.index
+    ]
+    if len(missing_config_names) != 0:
+        raise RuntimeError(
+            "Configurations are missing from every shard ("
+            + ", ".join(missing_config_names)
+            + ")"
+        )
+
+    return merged_mapping_results.loc[config_names]
+
+
+def find_reusable_parents(
+    mapping_results_table: pd.DataFrame,
+    parent_library: casmamparents.ParentLibrary,
+    mapping_options: dict = None,
+) -> list[str | None]:
+    """Match the parents of ``parent_library`` with the parents of an
+    existing table of :func:`organize_mapping_results` by content hash,
+    using the hashes the table was written with (see
+    :func:`get_parent_content_hashes`), so renamed or moved parents are
+    matched too, and parents edited since are not. Tables written
+    without them, e.g. by older versions, have no parents to reuse, and
+    neither do tables mapped with other ``mapping_options``
+
+    Parameters
+    ----------
+    mapping_results_table : pd.DataFrame
+        Output of :func:`organize_mapping_results`
+    parent_library : casmam.mapping.parents.ParentLibrary
+        Parent crystal structures to map onto now
+    mapping_options : dict, optional
+        Options to map with now, compared with those the table was
+        written with (see :func:`make_configuration_mapping_options`).
+        By default they are not compared
+
+    Returns
+    -------
+    list[str | None]
+        Name of the column of the table with the results of each parent
+        of ``parent_library``, ``None`` for parents that are new
+
+    """
+    if (
+        mapping_options is not None
+        and mapping_results_table.attrs.get("mapping_options") != mapping_options
+    ):
+        return [None] * len(parent_library)
+
+    parent_names = set(mapping_results_table.columns.get_level_values(0))
+
+    names_by_content_hash = {}
+    for parent_name, content_hash in mapping_results_table.attrs.get(
+        "parent_content_hashes", {}
+    ).items():
+        if parent_name in parent_names:
+            names_by_content_hash.setdefault(content_hash, parent_name)
+
+    return [
+        names_by_content_hash.get(content_hash)
+        for content_hash in parent_library.content_hashes
+    ]
+
+
+def remap_configurations_onto_parent_structures(
+    mapping_results_table: pd.DataFrame,
+    child_paths: list[str],
+    parent_paths: str | list[str],
+    quiet=False,
+    n_workers: int = 1,
+    pair_time_budget: float = None,
+    prefilter: str = "none",
+    cache: casmamcache.MappingCache = None,
+    max_maps_per_pair: int = None,
+    costs_only: bool = False,
+    profile: casmaminstrumentation.MappingProfile = None,
+    progress: casmamprogress.MappingProgress = None,
+    snapshot: casmamsnapshot.ChildStructureSnapshot = None,
+) -> pd.DataFrame:
+    """Incremental counterpart of
+    :func:`map_configurations_onto_parent_structures`: update an existing
+    table of mapping results for a changed set of children and parents,
+    mapping only the (child, parent) pairs that are not in it. Parents
+    are matched with :func:`find_reusable_parents`, children by their
+    casm configuration name. Children and parents that are no longer
+    given are dropped. Existing results are only reused if the table was
+    mapped with the same mapping options, otherwise every pair is mapped
+    again
+
+    Parameters
+    ----------
+    mapping_results_table : pd.DataFrame
+        Output of :func:`organize_mapping_results`, e.g. of an earlier
+        :func:`map_configurations_onto_parent_structures`
+    child_paths : list[str]
+        Paths of every child
+    parent_paths : str | list[str]
+        Paths of every parent crystal structure, or the name of a bundled
+        library, see :func:`make_parent_library`
+    quiet : bool, optional
+        If ``False``, report what is mapped
+    n_workers, pair_time_budget, prefilter, cache, max_maps_per_pair, costs_only, profile, progress, snapshot
+        See :func:`map_configurations_onto_parent_structures`
+
+    Returns
+    -------
+    pd.DataFrame
+        Mapping results of every child onto every parent, in the order of
+        ``child_paths`` and of the parents
+
+    """
+    parent_library = make_parent_library(parent_paths)
+    parent_names = [os.path.basename(path) for path in parent_library.paths]
+    mapping_options = make_configuration_mapping_options(max_maps_per_pair, costs_only)
+    reusable_parents = find_reusable_parents(
+        mapping_results_table, parent_library, mapping_options
+    )
+    new_parent_indices = [
+        parent_index
+        for parent_index, old_name in enumerate(reusable_parents)
+        if old_name is None
+    ]
+
+    config_names = [
+        get_casm_config_name_from_child_path(child_path) for child_path in child_paths
+    ]
+    is_new_child = ~np.isin(config_names, mapping_results_table.index)
+
+    if not quiet:
+        if mapping_results_table.attrs.get("mapping_options") != mapping_options:
+            print(
+                "Mapping results were mapped with other mapping options, "
+                + "none of them are reused"
+            )
+        print(
+            "Mapping "
+            + str(np.count_nonzero(is_new_child))
+            + " new of "
+            + str(len(child_paths))
+            + " child structures onto every parent, and the others onto "
+            + str(len(new_parent_indices))
+            + " new of "
+            + str(len(parent_library))
+            + " parent structures"
+        )
+
+    map_options = dict(
+        quiet=quiet,
+        n_workers=n_workers,
+        mapping_options=mapping_options,
+        pair_time_budget=pair_time_budget,
+        prefilter=prefilter,
+        cache=cache,
+        profile=profile,
+        progress=progress,
+    )
+
+    def map_children(child_indices, library):
+        child_paths_to_map = [child_paths[child_index] for child_index in child_indices]
+        return organize_mapping_results(
+            map_child_structures_onto_parent_structures(
+                library,
+                mask_child_structure_atom_types(
+                    get_child_structures(child_paths_to_map, snapshot=snapshot)
+                ),
+                child_paths=child_paths_to_map,
+                **map_options,
+            )
+        )
+
+    columns = pd.MultiIndex.from_product(
+        [parent_names, ["atomic_cost", "lattice_cost", "total_cost", "mapping_results"]]
+    )
+    parts = []
+
+    old_child_indices = np.flatnonzero(~is_new_child)
+    if len(old_child_indices) != 0:
+        old_rows = mapping_results_table.loc[
+            [config_names[child_index] for child_index in old_child_indices]
+        ]
+        old_columns = [
+            copy_parent_columns(old_rows, old_name, parent_name, parent_path)
+            for old_name, parent_name, parent_path in zip(
+                reusable_parents, parent_names, parent_library.paths
+            )
+            if old_name is not None
+        ]
+        if len(new_parent_indices) != 0:
+            old_columns.append(
+                map_children(
+                    old_child_indices, parent_library.select(new_parent_indices)
+                )
+            )
+        parts.append(pd.concat(old_columns, axis=1))
+
+    new_child_indices = np.flatnonzero(is_new_child)
+    if len(new_child_indices) != 0:
+        parts.append(map_children(new_child_indices, parent_library))
+
+    mapping_results = pd.concat([part.reindex(columns=columns) for part in parts]).loc[
+        config_names
+    ]
+    mapping_results.attrs["parent_content_hashes"] = get_parent_content_hashes(
+        parent_library
+    )
+    mapping_results.attrs["mapping_options"] = mapping_options
+
+    return mapping_results
+
+
+def copy_parent_columns(
+    mapping_results_table: pd.DataFrame,
+    old_name: str,
+    parent_name: str,
+    parent_path: str,
+) -> pd.DataFrame:
+    """Columns of one parent of a table of :func:`organize_mapping_results`
+    for a parent that was renamed or moved since, e.g. one matched by
+    :func:`find_reusable_parents`. The ``MappingResult`` objects are
+    copied with their ``parent_path`` set to the new one
+
+    Parameters
+    ----------
+    mapping_results_table : pd.DataFrame
+        Output of :func:`organize_mapping_results`
+    old_name : str
+        Name of the parent in the table
+    parent_name : str
+        Name of the parent now
+    parent_path : str
+        Path of the parent now
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns of the parent, named ``parent_name``
+
+    """
+    parent_columns = mapping_results_table[[old_name]].rename(
+        columns={old_name: parent_name}, level=0
+    )
+
+    copied_results = []
+    for result in parent_columns[(parent_name, "mapping_results")]:
+        result = copy.copy(result)
+        result.parent_path = parent_path
+        copied_results.append(result)
+    parent_columns[(parent_name, "mapping_results")] = copied_results
+
+    return parent_columns
+
+
 def find_best_map_and_flag_conflicts(
     mapping_results: list[MappingResult], tol: float = 1e-4
 ) -> tuple[MappingResult, list[MappingResult] | None]:
@@ -649,21 +3841,81 @@ def find_best_map_and_flag_conflicts(
     return best_map, conflicting_maps
 
 
+def find_best_parents_and_flag_conflicts(
+    total_costs: np.ndarray, tol: float = 1e-4
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized :func:`find_best_map_and_flag_conflicts` for many
+    children at once. For each row of ``total_costs``, finds the parent
+    with the least total cost and the other parents within ``tol`` of it
+
+    Parameters
+    ----------
+    total_costs : np.ndarray
+        Number of children by number of parents array of total costs,
+        NaN where there is no map
+    tol : float, optional
+        Relative and absolute tolerance within which costs are tied, as
+        in ``np.isclose``
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Index of the best parent of each child, -1 if no parent maps, and
+        a boolean array of the same shape as ``total_costs`` flagging the
+        conflicting parents of each child
+
+    """
+    total_costs = np.asarray(total_costs, dtype=float)
+    has_map = ~np.all(np.isnan(total_costs), axis=1)
+
+    best_indices = np.full(total_costs.shape[0], -1, dtype=int)
+    best_indices[has_map] = np.nanargmin(total_costs[has_map], axis=1)
+
+    best_total_costs = np.full(total_costs.shape[0], np.nan)
+    best_total_costs[has_map] = total_costs[has_map, best_indices[has_map]]
+    best_total_costs = best_total_costs[:, np.newaxis]
+
+    # same comparison as np.isclose(total_cost, best_total_cost, tol, tol)
+    with np.errstate(invalid="ignore"):
+        conflicts = np.abs(total_costs - best_total_costs) <= tol + tol * np.abs(
+            best_total_costs
+        )
+    conflicts[has_map, best_indices[has_map]] = False
+
+    return best_indices, conflicts
+
+
 def analyze_mapping_data(
     mapping_data: pd.DataFrame, tol: float = 1e-4, **kwargs
 ) -> pd.DataFrame:
-    """TODO: Docstring for analyze_mapping_data.
+    """Find the best parent of every configuration in a table made by
+    :func:`organize_mapping_results`, and the parents whose total cost
+    is within ``tol`` of it. Works on the total costs of all
+    configurations at once, and only looks up the ``MappingResult``
+    objects of the best and conflicting parents
 
     Parameters
     ----------
-    mapping_data : TODO
+    mapping_data : pd.DataFrame
+        Table made by :func:`organize_mapping_results`
+    tol : float, optional
+        Tolerance within which costs are tied, see
+        :func:`find_best_parents_and_flag_conflicts`
 
     Returns
     -------
-    TODO
+    pd.DataFrame
+        Best parent map name, best parent mapping object and list of
+        conflicting maps (``None`` if there are none) of every
+        configuration. Configurations that map onto no parent have
+        ``None`` as best parent
 
-    """
+    Raises
+    ------
+    RuntimeError
+        If ``mapping_data`` does not contain ``MappingResult`` objects
 
+    """
     keys_with_mapping_results = [
         key for key in mapping_data if "mapping_results" in key
     ]
@@ -671,32 +3923,38 @@ def analyze_mapping_data(
     if len(keys_with_mapping_results) == 0:
         raise RuntimeError("Provided DataFrame does not contain MappingResult objects")
 
-    mapping_results_of_all_configs = mapping_data.loc[:, keys_with_mapping_results]
-
-    config_names = []
-    table_entries = []
-    for config_name, config_data in mapping_results_of_all_configs.iterrows():
-        config_mapping_results = [
-            config_mapping_result
-            for _, config_mapping_result in config_data.iteritems()
-        ]
-        best_config_map, conflicting_maps = find_best_map_and_flag_conflicts(
-            config_mapping_results, tol
+    mapping_results = mapping_data.loc[:, keys_with_mapping_results].to_numpy()
+    total_cost_keys = [(key[0], "total_cost") for key in keys_with_mapping_results]
+    if all(key in mapping_data for key in total_cost_keys):
+        total_costs = mapping_data.loc[:, total_cost_keys].to_numpy(dtype=float)
+    else:
+        total_costs = np.vectorize(lambda result: result.total_cost, otypes=[float])(
+            mapping_results
         )
 
-        table_entries.append(
-            [best_config_map.parent_path, best_config_map, conflicting_maps]
-        )
-        config_names.append(config_name)
+    best_indices, conflicts = find_best_parents_and_flag_conflicts(total_costs, tol)
 
-    best_map_table = pd.DataFrame(
-        table_entries,
-        index=config_names,
-        columns=[
-            "Best parent map name",
-            "Best parent mapping object",
-            "Conflicting maps",
+    best_maps = np.full(len(best_indices), None, dtype=object)
+    has_map = best_indices >= 0
+    best_maps[has_map] = mapping_results[np.nonzero(has_map)[0], best_indices[has_map]]
+    best_map_names = pd.Series(
+        [
+            best_map.parent_path if best_map is not None else None
+            for best_map in best_maps
         ],
+        index=mapping_data.index,
+        dtype=object,
     )
 
-    return best_map_table
+    conflicting_maps = np.full(len(best_indices), None, dtype=object)
+    for row in np.nonzero(conflicts.any(axis=1))[0]:
+        conflicting_maps[row] = list(mapping_results[row, conflicts[row]])
+
+    return pd.DataFrame(
+        {
+            "Best parent map name": best_map_names,
+            "Best parent mapping object": best_maps,
+            "Conflicting maps": conflicting_maps,
+        },
+        index=mapping_data.index,
+    )
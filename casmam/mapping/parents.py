@@ -0,0 +1,425 @@
+import os
+import json
+import zipfile
+import tempfile
+import casm.xtal
+import numpy as np
+import casmam.xtal.xtal as casmamxtal
+
+# bump whenever the arrays stored in an index change
+index_format_version = 1
+
+
+def get_file_signatures(paths: list[str]) -> list[list]:
+    """Name, size and modification time of each file, which change
+    whenever a file is edited, added or removed. Used to invalidate an
+    index of a library of parent crystal structures
+
+    Parameters
+    ----------
+    paths : list[str]
+        Paths of files
+
+    Returns
+    -------
+    list[list]
+        File name, size in bytes and modification time in nanoseconds of
+        each file
+
+    """
+    signatures = []
+    for path in paths:
+        stat = os.stat(path)
+        signatures.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+
+    return signatures
+
+
+class ParentLibrary:
+
+    """Parent crystal structures together with everything about them
+    that does not depend on the child structure being mapped. Built once
+    per run so that symmetry work scales with the number of parents
+    rather than with parents times children.
+
+    Attributes
+    ----------
+    prims : list[casm.xtal.Prim]
+        casm ``Prim`` of each parent crystal structure
+    paths : list[str]
+        Path of each parent crystal structure
+    factor_groups : list[list[casm.xtal.SymOp]]
+        Prim factor group of each parent crystal structure
+    n_sites : np.ndarray
+        Number of sites in each parent crystal structure
+    volumes_per_site : np.ndarray
+        Volume per site of each parent crystal structure
+    content_hashes : list[str]
+        :func:`casmam.xtal.xtal.make_structure_content_hash` of each
+        parent crystal structure
+
+    """
+
+    def __init__(
+        self,
+        prims: list[casm.xtal.Prim],
+        paths: list[str] = None,
+        factor_groups: list[list[casm.xtal.SymOp]] = None,
+    ):
+        """Constructs factor groups, site counts and volumes per site
+        of the given parent crystal structures
+
+        Parameters
+        ----------
+        prims : list[casm.xtal.Prim]
+            casm ``Prim`` of each parent crystal structure
+        paths : list[str], optional
+            Path of each parent crystal structure. If not provided,
+            every path is "not available"
+        factor_groups : list[list[casm.xtal.SymOp]], optional
+            Prim factor group of each parent crystal structure, if already
+            known. By default they are constructed
+
+        Raises
+        ------
+        RuntimeError
+            If number of ``paths`` or ``factor_groups`` is not the same as
+            number of ``prims``
+
+        """
+        if paths is None:
+            paths = ["not available"] * len(prims)
+
+        if len(paths) != len(prims):
+            raise RuntimeError(
+                "Given number of parent paths ("
+                + str(len(paths))
+                + ") is not the same as number of parent structures ("
+                + str(len(prims))
+                + ")"
+            )
+
+        if factor_groups is None:
+            factor_groups = [casm.xtal.make_prim_factor_group(prim) for prim in prims]
+
+        if len(factor_groups) != len(prims):
+            raise RuntimeError(
+                "Given number of factor groups ("
+                + str(len(factor_groups))
+                + ") is not the same as number of parent structures ("
+                + str(len(prims))
+                + ")"
+            )
+
+        self.prims = list(prims)
+        self.paths = list(paths)
+        self.factor_groups = list(factor_groups)
+        self.n_sites = np.array([len(prim.occ_dof()) for prim in prims], dtype=int)
+        self.volumes_per_site = np.array(
+            [
+                abs(np.linalg.det(prim.lattice().column_vector_matrix()))
+                for prim in prims
+            ],
+            dtype=float,
+        ) / np.maximum(self.n_sites, 1)
+        self.content_hashes = [
+            casmamxtal.make_structure_content_hash(
+                prim.lattice().column_vector_matrix(),
+                prim.coordinate_frac(),
+                prim.occ_dof(),
+            )
+            for prim in prims
+        ]
+
+    def __len__(self):
+        return len(self.prims)
+
+    def select(self, parent_indices: list[int]):
+        """A ``ParentLibrary`` of some of the parents, sharing their
+        already constructed factor groups
+
+        Parameters
+        ----------
+        parent_indices : list[int]
+            Indices of the parents to keep, in the order to keep them
+
+        Returns
+        -------
+        ParentLibrary
+
+        """
+        return ParentLibrary(
+            [self.prims[parent_index] for parent_index in parent_indices],
+            [self.paths[parent_index] for parent_index in parent_indices],
+            [self.factor_groups[parent_index] for parent_index in parent_indices],
+        )
+
+    def get_arrays(self) -> dict[str, np.ndarray]:
+        """Plain arrays from which the library, including its factor
+        groups, can be rebuilt with :meth:`from_arrays`. Arrays of all
+        parents are concatenated, so that there are only a few of them
+
+        Returns
+        -------
+        dict[str, np.ndarray]
+
+        """
+        symop_arrays = [
+            casmamxtal.get_symop_arrays(factor_group)
+            for factor_group in self.factor_groups
+        ]
+
+        return {
+            "lattices": np.array(
+                [prim.lattice().column_vector_matrix() for prim in self.prims],
+                dtype=float,
+            ).reshape(-1, 3, 3),
+            "n_sites": self.n_sites,
+            "frac_coords": np.concatenate(
+                [np.array(prim.coordinate_frac()) for prim in self.prims]
+                + [np.zeros((3, 0))],
+                axis=1,
+            ),
+            "occ_dofs": np.array(json.dumps([prim.occ_dof() for prim in self.prims])),
+            "n_symops": np.array(
+                [len(factor_group) for factor_group in self.factor_groups], dtype=int
+            ),
+            "symop_matrices": np.concatenate(
+                [arrays[0] for arrays in symop_arrays] + [np.zeros((0, 3, 3))]
+            ),
+            "symop_translations": np.concatenate(
+                [arrays[1] for arrays in symop_arrays] + [np.zeros((0, 3))]
+            ),
+            "symop_time_reversals": np.concatenate(
+                [arrays[2] for arrays in symop_arrays] + [np.zeros(0, dtype=bool)]
+            ),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray], paths: list[str] = None):
+        """Rebuild a ``ParentLibrary`` from :meth:`get_arrays` without
+        constructing factor groups
+
+        Parameters
+        ----------
+        arrays : dict[str, np.ndarray]
+            Arrays returned by :meth:`get_arrays`
+        paths : list[str], optional
+            Path of each parent crystal structure
+
+        Returns
+        -------
+        ParentLibrary
+
+        """
+        site_offsets = np.cumsum(arrays["n_sites"])[:-1]
+        symop_offsets = np.cumsum(arrays["n_symops"])[:-1]
+
+        prims = [
+            casm.xtal.Prim(casm.xtal.Lattice(lattice), frac_coords, occ_dof)
+            for lattice, frac_coords, occ_dof in zip(
+                arrays["lattices"],
+                np.split(arrays["frac_coords"], site_offsets, axis=1),
+                json.loads(str(arrays["occ_dofs"])),
+            )
+        ]
+        factor_groups = [
+            casmamxtal.symops_from_symop_arrays(*symop_arrays)
+            for symop_arrays in zip(
+                np.split(arrays["symop_matrices"], symop_offsets),
+                np.split(arrays["symop_translations"], symop_offsets),
+                np.split(arrays["symop_time_reversals"], symop_offsets),
+            )
+        ]
+
+        return cls(prims, paths, factor_groups)
+
+    def __getstate__(self):
+        """casm ``Prim`` and factor groups cannot be pickled, so only the
+        arrays needed to rebuild them are. This lets a ``ParentLibrary``
+        be sent to worker processes once, when they start up.
+
+        Returns
+        -------
+        dict
+
+        """
+        return {"arrays": self.get_arrays(), "paths": self.paths}
+
+    def __setstate__(self, state: dict):
+        """Rebuild prims and factor groups from :meth:`__getstate__`
+
+        Parameters
+        ----------
+        state : dict
+            Arrays returned by :meth:`__getstate__`
+
+        """
+        library = self.from_arrays(state["arrays"], state["paths"])
+        self.__dict__.update(library.__dict__)
+
+    def save_index(self, index_path: str, signatures: list[list]):
+        """Write the library to a binary index file, which
+        :meth:`load_index` reads back in a single read
+
+        Parameters
+        ----------
+        index_path : str
+            Path of the index file
+        signatures : list[list]
+            :func:`get_file_signatures` of the files the library was read
+            from, stored to detect when the index is out of date
+
+        """
+        index_dir = os.path.dirname(os.path.abspath(index_path))
+        os.makedirs(index_dir, exist_ok=True)
+
+        # write to a temporary file first so readers never see half an index
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=index_dir, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as f:
+            np.savez(
+                f,
+                format_version=np.array(index_format_version),
+                signatures=np.array(json.dumps(signatures)),
+                **self.get_arrays(),
+            )
+        os.replace(temporary_path, index_path)
+
+    @classmethod
+    def load_index(cls, index_path: str, paths: list[str], signatures: list[list]):
+        """Read a library written by :meth:`save_index`
+
+        Parameters
+        ----------
+        index_path : str
+            Path of the index file
+        paths : list[str]
+            Path of each parent crystal structure
+        signatures : list[list]
+            :func:`get_file_signatures` of ``paths``
+
+        Returns
+        -------
+        ParentLibrary | None
+            ``None`` if there is no index, or it is out of date
+
+        """
+        try:
+            with np.load(index_path) as index:
+                arrays = {key: index[key] for key in index.files}
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return None
+
+        if (
+            int(arrays.pop("format_version")) != index_format_version
+            or json.loads(str(arrays.pop("signatures"))) != signatures
+        ):
+            return None
+
+        return cls.from_arrays(arrays, paths)
+
+    @classmethod
+    def from_poscars(cls, paths: list[str], index_path: str = None):
+        """Construct a ``ParentLibrary`` by reading parent crystal
+        structures from POSCAR files
+
+        Parameters
+        ----------
+        paths : list[str]
+            Paths to POSCAR files of parent crystal structures
+        index_path : str, optional
+            Path of a binary index of the library (see
+            :meth:`save_index`). If it is up to date it is read instead
+            of the POSCAR files, otherwise it is rebuilt
+
+        Returns
+        -------
+        ParentLibrary
+
+        """
+        paths = [str(path) for path in paths]
+        if index_path is None:
+            return cls([casm.xtal.Prim.from_poscar(path) for path in paths], paths)
+
+        signatures = get_file_signatures(paths)
+        library = cls.load_index(index_path, paths, signatures)
+        if library is not None:
+            return library
+
+        library = cls([casm.xtal.Prim.from_poscar(path) for path in paths], paths)
+        try:
+            library.save_index(index_path, signatures)
+        except OSError:
+            # e.g. a read only installation, the library still works
+            pass
+
+        return library
+
+
+def group_equivalent_parents(
+    parent_library: ParentLibrary, tol: float = 1e-3
+) -> list[list[int]]:
+    """Group parents that are the same crystal once every site is given
+    the same occupant, e.g. the same crystal in a different setting or
+    supercell (see :func:`casmam.xtal.xtal.are_equivalent_structures`
+    applied to their primitive cells). The first parent of each group,
+    its representative, is the one with the fewest sites. Its number of
+    sites divides that of every parent of the group, so every child that
+    can be mapped onto another parent of the group can be mapped onto
+    the representative
+
+    Parameters
+    ----------
+    parent_library : ParentLibrary
+        Parent crystal structures
+    tol : float, optional
+        Tolerance of :func:`casmam.xtal.xtal.make_primitive_structure_info`
+        and :func:`casmam.xtal.xtal.are_equivalent_structures`
+
+    Returns
+    -------
+    list[list[int]]
+        Indices of the parents in each group, representative first and
+        the rest in library order. Groups are in library order of their
+        representatives
+
+    """
+    primitive_structure_infos = [
+        casmamxtal.make_primitive_structure_info(
+            prim.lattice().column_vector_matrix(),
+            prim.coordinate_frac(),
+            ["A"] * n_sites,
+            tol,
+        )
+        for prim, n_sites in zip(parent_library.prims, parent_library.n_sites)
+    ]
+    primitive_volumes = np.array(
+        [abs(np.linalg.det(info[0])) for info in primitive_structure_infos]
+    )
+
+    parent_groups = []
+    for parent_index in np.lexsort(
+        (np.arange(len(parent_library)), parent_library.n_sites)
+    ):
+        info = primitive_structure_infos[parent_index]
+        for parent_group in parent_groups:
+            representative_info = primitive_structure_infos[parent_group[0]]
+            if (
+                parent_library.n_sites[parent_index]
+                % parent_library.n_sites[parent_group[0]]
+                == 0
+                and representative_info[1].shape[1] == info[1].shape[1]
+                and abs(
+                    primitive_volumes[parent_group[0]] - primitive_volumes[parent_index]
+                )
+                < tol * primitive_volumes[parent_index]
+                and casmamxtal.are_equivalent_structures(representative_info, info, tol)
+            ):
+                parent_group.append(int(parent_index))
+                break
+        else:
+            parent_groups.append([int(parent_index)])
+
+    return sorted(
+        [[parent_group[0]] + sorted(parent_group[1:]) for parent_group in parent_groups]
+    )
@@ -0,0 +1,283 @@
+import numpy as np
+
+# nearest neighbor distance of the densest packing (fcc) in units of the
+# cube root of the volume per site. No structure has a larger one.
+_max_nearest_neighbor_distance = 2 ** (1 / 6)
+
+
+def get_mean_coordination_number(
+    lattice: np.ndarray, frac_coords: np.ndarray, shell_tolerance: float = 0.2
+) -> float:
+    """Average over sites of the number of neighbors within
+    ``1 + shell_tolerance`` times the distance to that site's nearest
+    neighbor, i.e. the size of the first coordination shell. It does
+    not depend on the volume, and only weakly on small distortions. See
+    :func:`get_mean_coordination_numbers` for many structures at once
+
+    Parameters
+    ----------
+    lattice : np.ndarray
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix
+    frac_coords : np.ndarray
+        Fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+    shell_tolerance : float, optional
+        Relative width of the first coordination shell
+
+    Returns
+    -------
+    float
+        Mean first shell coordination number
+
+    """
+    return float(
+        get_mean_coordination_numbers([lattice], [frac_coords], shell_tolerance)[0]
+    )
+
+
+def get_mean_coordination_numbers(
+    lattices: list[np.ndarray],
+    frac_coords: list[np.ndarray],
+    shell_tolerance: float = 0.2,
+    max_distances: int = 2**22,
+) -> np.ndarray:
+    """:func:`get_mean_coordination_number` of every structure. Structures
+    with the same number of sites and periodic images are computed
+    together, a batch of structures and sites at a time
+
+    Parameters
+    ----------
+    lattices : list[np.ndarray]
+        Lattice vectors of each structure as columns of a
+        :math:`3 \\times 3` matrix
+    frac_coords : list[np.ndarray]
+        Fractional coordinates of each structure as a
+        :math:`3 \\times \\mathbf{N}` matrix
+    shell_tolerance : float, optional
+        Relative width of the first coordination shell
+    max_distances : int, optional
+        Largest number of distances computed at once
+
+    Returns
+    -------
+    np.ndarray
+        Mean first shell coordination number of every structure
+
+    """
+    coordination_numbers = np.empty(len(frac_coords), dtype=float)
+    if len(frac_coords) == 0:
+        return coordination_numbers
+
+    lattices = np.array(lattices, dtype=float).reshape(-1, 3, 3)
+    n_sites = np.array([np.shape(coords)[1] for coords in frac_coords], dtype=int)
+
+    # every neighbor in the first shell of every site lies within cutoff
+    cutoffs = (
+        (1 + shell_tolerance)
+        * _max_nearest_neighbor_distance
+        * (np.abs(np.linalg.det(lattices)) / n_sites) ** (1 / 3)
+    )
+    # number of periodic images needed along each lattice vector is
+    # the cutoff divided by the spacing between lattice planes
+    n_images = np.ceil(
+        cutoffs[:, np.newaxis] * np.linalg.norm(np.linalg.inv(lattices), axis=2)
+    ).astype(int)
+
+    groups = {}
+    for structure_index, key in enumerate(zip(n_sites, map(tuple, n_images))):
+        groups.setdefault(key, []).append(structure_index)
+
+    for (group_n_sites, group_n_images), structure_indices in groups.items():
+        coordination_numbers[structure_indices] = _get_mean_coordination_numbers(
+            lattices[structure_indices],
+            np.array(
+                [frac_coords[index] for index in structure_indices], dtype=float
+            ).reshape(-1, 3, group_n_sites),
+            group_n_images,
+            shell_tolerance,
+            max_distances,
+        )
+
+    return coordination_numbers
+
+
+def _get_mean_coordination_numbers(
+    lattices: np.ndarray,
+    frac_coords: np.ndarray,
+    n_images: tuple[int, int, int],
+    shell_tolerance: float,
+    max_distances: int,
+) -> np.ndarray:
+    """:func:`get_mean_coordination_numbers` of structures with the same
+    number of sites and of periodic images along each lattice vector,
+    given as ``S x 3 x 3`` and ``S x 3 x N`` arrays"""
+    image_offsets = np.array(
+        np.meshgrid(*[np.arange(-n, n + 1) for n in n_images], indexing="ij")
+    ).reshape(3, -1)
+    # S x 3 x number of images
+    image_translations = lattices @ image_offsets
+
+    n_structures, _, n_sites = frac_coords.shape
+    cart_coords = lattices @ (frac_coords % 1.0)
+    neighbor_coords = (
+        cart_coords[:, :, :, np.newaxis] + image_translations[:, :, np.newaxis, :]
+    ).reshape(n_structures, 3, -1)
+    n_neighbors = neighbor_coords.shape[2]
+
+    sites_per_chunk = int(np.clip(max_distances // n_neighbors, 1, n_sites))
+    structures_per_batch = max(1, max_distances // (sites_per_chunk * n_neighbors))
+
+    coordination_numbers = np.empty((n_structures, n_sites), dtype=int)
+    for structure_start in range(0, n_structures, structures_per_batch):
+        structures = slice(structure_start, structure_start + structures_per_batch)
+        for site_start in range(0, n_sites, sites_per_chunk):
+            sites = slice(site_start, site_start + sites_per_chunk)
+            distances = np.linalg.norm(
+                neighbor_coords[structures, :, np.newaxis, :]
+                - cart_coords[structures, :, sites, np.newaxis],
+                axis=1,
+            )
+            # exclude each site itself
+            distances[distances < 1e-6] = np.inf
+            nearest = distances.min(axis=2, keepdims=True)
+            coordination_numbers[structures, sites] = np.count_nonzero(
+                distances <= (1 + shell_tolerance) * nearest, axis=2
+            )
+
+    return coordination_numbers.mean(axis=1)
+
+
+def make_structure_descriptors(
+    lattices: list[np.ndarray],
+    frac_coords: list[np.ndarray],
+    include_coordination_number: bool = True,
+) -> dict[str, np.ndarray]:
+    """Screening descriptors of a set of structures, one entry per
+    structure in each array
+
+    Parameters
+    ----------
+    lattices : list[np.ndarray]
+        Lattice vectors of each structure as columns of a
+        :math:`3 \\times 3` matrix
+    frac_coords : list[np.ndarray]
+        Fractional coordinates of each structure as a
+        :math:`3 \\times \\mathbf{N}` matrix
+    include_coordination_number : bool, optional
+        If ``False``, skip the coordination numbers, which are the only
+        descriptor that is not essentially free to compute
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        "n_sites" and "coordination_number" of every structure
+
+    """
+    descriptors = {
+        "n_sites": np.array([coords.shape[1] for coords in frac_coords], dtype=int)
+    }
+    if not include_coordination_number:
+        return descriptors
+
+    descriptors["coordination_number"] = get_mean_coordination_numbers(
+        lattices, frac_coords
+    )
+
+    return descriptors
+
+
+def get_prefilter_scores(
+    child_descriptors: dict[str, np.ndarray],
+    parent_descriptors: dict[str, np.ndarray],
+) -> np.ndarray:
+    """Dissimilarity of every child to every parent according to
+    the screening descriptors, which is the difference of their first
+    shell coordination numbers. Lower scores are more likely to map
+
+    Parameters
+    ----------
+    child_descriptors : dict[str, np.ndarray]
+        Descriptors of child structures from
+        :func:`make_structure_descriptors`
+    parent_descriptors : dict[str, np.ndarray]
+        Descriptors of parent structures from
+        :func:`make_structure_descriptors`
+
+    Returns
+    -------
+    np.ndarray
+        Number of children by number of parents array of scores
+
+    """
+    return np.abs(
+        child_descriptors["coordination_number"][:, np.newaxis]
+        - parent_descriptors["coordination_number"][np.newaxis, :]
+    )
+
+
+def prefilter_pairs(
+    child_descriptors: dict[str, np.ndarray],
+    parent_descriptors: dict[str, np.ndarray],
+    mode: str = "none",
+    max_coordination_difference: float = 2.0,
+) -> np.ndarray:
+    """Decide which (child, parent) pairs are worth mapping
+
+    In "safe" mode only pairs that provably cannot map are skipped,
+    which are those where the number of child sites is not divisible by
+    the number of parent sites. The mapper rejects those pairs right away
+    as well (see :func:`casmam.mapping.mapping.max_vol`), so this only
+    saves their bookkeeping. Mapping costs are volume normalized and, by
+    default, only count symmetry breaking strain and displacements, so
+    no geometric descriptor, not even the volume per site, gives a
+    rigorous lower bound on them. Hence every pair is mapped by default.
+
+    In "heuristic" mode, pairs are also skipped when the first shell
+    coordination numbers differ by more than
+    ``max_coordination_difference``. Such pairs very rarely map under
+    the default ``max_cost``, but it is not guaranteed. Volumes are not
+    compared, since the library parents have arbitrary lattice
+    parameters.
+
+    Parameters
+    ----------
+    child_descriptors : dict[str, np.ndarray]
+        Descriptors of child structures from
+        :func:`make_structure_descriptors`
+    parent_descriptors : dict[str, np.ndarray]
+        Descriptors of parent structures from
+        :func:`make_structure_descriptors`
+    mode : str, optional
+        "none" to map every pair, "safe" or "heuristic"
+    max_coordination_difference : float, optional
+        Largest difference of coordination numbers mapped in
+        "heuristic" mode
+
+    Returns
+    -------
+    np.ndarray
+        Number of children by number of parents boolean array, ``True``
+        for pairs that should be mapped
+
+    Raises
+    ------
+    RuntimeError
+        If ``mode`` is invalid
+
+    """
+    child_n_sites = child_descriptors["n_sites"][:, np.newaxis]
+    parent_n_sites = parent_descriptors["n_sites"][np.newaxis, :]
+
+    if mode == "none":
+        return np.ones((child_n_sites.shape[0], parent_n_sites.shape[1]), dtype=bool)
+
+    if mode not in ["safe", "heuristic"]:
+        raise RuntimeError("Invalid prefilter mode (" + mode + ")")
+
+    pairs_to_map = child_n_sites % parent_n_sites == 0
+    if mode == "safe":
+        return pairs_to_map
+
+    return pairs_to_map & (
+        get_prefilter_scores(child_descriptors, parent_descriptors)
+        <= max_coordination_difference
+    )
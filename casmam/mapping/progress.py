@@ -0,0 +1,195 @@
+import os
+import time
+import json
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration in seconds as h:mm:ss, "?" if it is unknown"""
+    if seconds is None:
+        return "?"
+
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return str(hours) + ":" + format(minutes, "02d") + ":" + format(seconds, "02d")
+
+
+class MappingProgress:
+
+    """Progress of a mapping run: children completed, pairs mapped and
+    skipped, throughput and an estimate of the remaining time. Reported
+    at most every ``interval`` seconds, as a line on stdout and/or as a
+    json event appended to ``events_path``. Copies in worker processes
+    only count, their counts are collected with :meth:`pop_counts` and
+    :meth:`add_counts` and reported by the process that made the
+    progress
+
+    Attributes
+    ----------
+    n_children : int
+        Number of children to map in the run
+    n_pairs : int
+        Number of (child, parent) pairs in the run
+    n_children_done : int
+        Number of children whose pairs are all done
+    n_pairs_mapped : int
+        Number of pairs mapped, or found in the cache
+    n_pairs_skipped : int
+        Number of pairs skipped without mapping, e.g. by the prefilter
+    interval : float
+        Shortest time in seconds between two reports
+    events_path : str | None
+        File that a json line is appended to with every report
+    quiet : bool
+        If ``True``, nothing is printed
+
+    """
+
+    def __init__(
+        self,
+        interval: float = 10.0,
+        events_path: str = None,
+        quiet=False,
+    ):
+        self.interval = interval
+        self.events_path = events_path
+        self.quiet = quiet
+        self.n_children = 0
+        self.n_pairs = 0
+        self.n_children_done = 0
+        self.n_pairs_mapped = 0
+        self.n_pairs_skipped = 0
+        self.start_time = time.perf_counter()
+        self.last_report_time = self.start_time
+        # only the process that made the progress reports
+        self.pid = os.getpid()
+
+    def start(self, n_children: int, n_pairs: int):
+        """Start counting a run of ``n_children`` children and
+        ``n_pairs`` (child, parent) pairs"""
+        self.n_children = n_children
+        self.n_pairs = n_pairs
+        self.n_children_done = 0
+        self.n_pairs_mapped = 0
+        self.n_pairs_skipped = 0
+        self.start_time = time.perf_counter()
+        self.last_report_time = self.start_time
+        self.write_event("start")
+
+    def add_pairs(self, n_mapped: int = 1, n_skipped: int = 0):
+        """Count mapped and skipped pairs"""
+        self.n_pairs_mapped += n_mapped
+        self.n_pairs_skipped += n_skipped
+        self.report()
+
+    def add_children(self, n_children: int = 1):
+        """Count children whose pairs are all done"""
+        self.n_children_done += n_children
+        self.report()
+
+    def pop_counts(self) -> tuple[int, int]:
+        """Return the pairs mapped and skipped since the last call, e.g.
+        to send the counts of a worker process to the main process
+
+        Returns
+        -------
+        tuple[int, int]
+            Number of mapped and of skipped pairs
+
+        """
+        counts = (self.n_pairs_mapped, self.n_pairs_skipped)
+        self.n_pairs_mapped = 0
+        self.n_pairs_skipped = 0
+
+        return counts
+
+    def add_counts(self, counts: tuple[int, int]):
+        """Add counts from :meth:`pop_counts` of another copy"""
+        self.add_pairs(*counts)
+
+    def get_state(self) -> dict:
+        """Counts, elapsed time in seconds, pairs mapped per second and
+        estimated remaining time in seconds (``None`` before the first
+        pair is mapped). Skipped pairs cost next to nothing, so they do
+        not count towards the throughput
+
+        Returns
+        -------
+        dict
+
+        """
+        elapsed = time.perf_counter() - self.start_time
+        pairs_per_second = self.n_pairs_mapped / elapsed if elapsed > 0 else 0.0
+        n_pairs_left = self.n_pairs - self.n_pairs_mapped - self.n_pairs_skipped
+        eta = None
+        if pairs_per_second > 0:
+            eta = max(n_pairs_left, 0) / pairs_per_second
+
+        return {
+            "n_children_done": self.n_children_done,
+            "n_children": self.n_children,
+            "n_pairs_mapped": self.n_pairs_mapped,
+            "n_pairs_skipped": self.n_pairs_skipped,
+            "n_pairs": self.n_pairs,
+            "elapsed": elapsed,
+            "pairs_per_second": pairs_per_second,
+            "eta": eta,
+        }
+
+    def format_state(self, state: dict) -> str:
+        """One line summary of :meth:`get_state`"""
+        return (
+            "Mapped "
+            + str(state["n_children_done"])
+            + "/"
+            + str(state["n_children"])
+            + " children, "
+            + str(state["n_pairs_mapped"] + state["n_pairs_skipped"])
+            + "/"
+            + str(state["n_pairs"])
+            + " pairs ("
+            + str(state["n_pairs_skipped"])
+            + " skipped), "
+            + format(state["pairs_per_second"], ".1f")
+            + " pairs/s, elapsed "
+            + format_duration(state["elapsed"])
+            + ", ETA "
+            + format_duration(state["eta"])
+        )
+
+    def write_event(self, event: str, state: dict = None):
+        """Append a json line with ``event``, the wall-clock time and
+        :meth:`get_state` to ``events_path``, if there is one"""
+        if self.events_path is None or os.getpid() != self.pid:
+            return
+
+        if state is None:
+            state = self.get_state()
+        with open(self.events_path, "a") as f:
+            f.write(json.dumps(dict(event=event, time=time.time(), **state)) + "\n")
+
+    def report(self, force=False):
+        """Report the progress if at least ``interval`` seconds passed
+        since the last report, or if ``force``"""
+        if os.getpid() != self.pid:
+            return
+
+        now = time.perf_counter()
+        if not force and now - self.last_report_time < self.interval:
+            return
+
+        self.last_report_time = now
+        state = self.get_state()
+        self.write_event("progress", state)
+        if not self.quiet:
+            print(self.format_state(state), flush=True)
+
+    def finish(self):
+        """Report the final progress of the run"""
+        if os.getpid() != self.pid:
+            return
+
+        state = self.get_state()
+        self.write_event("finish", state)
+        if not self.quiet:
+            print(self.format_state(state), flush=True)
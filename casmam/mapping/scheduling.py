@@ -0,0 +1,415 @@
+import collections
+import heapq
+import functools
+import concurrent.futures
+import multiprocessing
+import os
+import weakref
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def count_supercells(volume: int) -> int:
+    """Number of distinct supercells (Hermite normal form matrices) of a
+    three dimensional lattice with the given ``volume``. This is the
+    number of lattice mappings the mapper has to try for a given
+    ``max_vol``, up to symmetry
+
+    Parameters
+    ----------
+    volume : int
+        Supercell volume in units of the primitive cell volume
+
+    Returns
+    -------
+    int
+        Number of supercells of ``volume``
+
+    """
+    count = 0
+    for a in range(1, volume + 1):
+        if volume % a != 0:
+            continue
+        for c in range(1, volume // a + 1):
+            if (volume // a) % c != 0:
+                continue
+            f = volume // a // c
+            count += c * f * f
+
+    return count
+
+
+def estimate_pair_costs(
+    child_n_sites: np.ndarray, parent_n_sites: np.ndarray
+) -> np.ndarray:
+    """Estimate the relative cost of mapping every child onto every
+    parent. The mapper enumerates every supercell of the parent of
+    volume ``max_vol`` and solves an assignment problem over the child
+    sites for each one, so the estimate is the number of supercells
+    times the cube of the number of child sites. Pairs that cannot be
+    mapped because the site counts are not divisible cost nothing
+
+    Parameters
+    ----------
+    child_n_sites : np.ndarray
+        Number of sites in each child structure
+    parent_n_sites : np.ndarray
+        Number of sites in each parent structure
+
+    Returns
+    -------
+    np.ndarray
+        ``len(child_n_sites)`` by ``len(parent_n_sites)`` array of
+        estimated costs
+
+    """
+    child_n_sites = np.asarray(child_n_sites, dtype=int)[:, np.newaxis]
+    parent_n_sites = np.asarray(parent_n_sites, dtype=int)[np.newaxis, :]
+
+    is_divisible = child_n_sites % parent_n_sites == 0
+    max_volumes = np.where(is_divisible, child_n_sites // parent_n_sites, 0)
+
+    unique_max_volumes, inverse = np.unique(max_volumes, return_inverse=True)
+    n_supercells = np.array(
+        [
+            count_supercells(int(volume)) if volume > 0 else 0
+            for volume in unique_max_volumes
+        ],
+        dtype=float,
+    )[inverse.reshape(max_volumes.shape)]
+
+    return n_supercells * child_n_sites.astype(float) ** 3
+
+
+def longest_first_order(costs: np.ndarray) -> np.ndarray:
+    """Indices of the flattened ``costs`` array from the most to the
+    least expensive. Ties keep their original order
+
+    Parameters
+    ----------
+    costs : np.ndarray
+        Estimated costs
+
+    Returns
+    -------
+    np.ndarray
+        Flat indices into ``costs``
+
+    """
+    return np.argsort(-np.ravel(costs), kind="stable")
+
+
+def longest_first_order_by_child(pair_costs: np.ndarray) -> np.ndarray:
+    """Flat indices of (child, parent) pairs with the pairs of each
+    child next to each other, so that children finish one after another
+    rather than all near the end. Children go from the most to the least
+    expensive in total, and so do the pairs of each child. Ties keep
+    their original order
+
+    Parameters
+    ----------
+    pair_costs : np.ndarray
+        Number of children by number of parents array of estimated costs
+
+    Returns
+    -------
+    np.ndarray
+        Flat indices into ``pair_costs``
+
+    """
+    pair_costs = np.asarray(pair_costs)
+    child_order = longest_first_order(pair_costs.sum(axis=1))
+    parent_orders = np.argsort(-pair_costs, axis=1, kind="stable")
+
+    return (
+        child_order[:, np.newaxis] * pair_costs.shape[1] + parent_orders[child_order]
+    ).ravel()
+
+
+def batch_pairs_by_child(
+    pair_costs: np.ndarray, max_batch_size: int
+) -> list[tuple[int, np.ndarray]]:
+    """Split the (child, parent) pairs with a nonzero cost into batches
+    of pairs of a single child, of at most ``max_batch_size`` pairs each,
+    in the order of :func:`longest_first_order_by_child`. A batch only
+    needs its child, and the child's factor group, once
+
+    Parameters
+    ----------
+    pair_costs : np.ndarray
+        Number of children by number of parents array of estimated costs
+    max_batch_size : int
+        Largest number of pairs in a batch
+
+    Returns
+    -------
+    list[tuple[int, np.ndarray]]
+        Child index and parent indices of each batch
+
+    """
+    pair_costs = np.asarray(pair_costs)
+    n_parents = pair_costs.shape[1]
+    pair_indices = longest_first_order_by_child(pair_costs)
+    pair_indices = pair_indices[pair_costs.flat[pair_indices] > 0]
+
+    child_indices = pair_indices // n_parents
+    child_starts = np.flatnonzero(np.diff(child_indices, prepend=-1))
+    child_stops = np.append(child_starts[1:], len(pair_indices))
+
+    batches = []
+    for start, stop in zip(child_starts, child_stops):
+        for batch_start in range(start, stop, max_batch_size):
+            batches.append(
+                (
+                    int(child_indices[start]),
+                    pair_indices[batch_start : min(batch_start + max_batch_size, stop)]
+                    % n_parents,
+                )
+            )
+
+    return batches
+
+
+def partition_into_shards(costs: np.ndarray, n_shards: int) -> np.ndarray:
+    """Deterministically split items into ``n_shards`` shards with
+    nearly equal total cost. Items are assigned from the most to the
+    least expensive, each to the shard with the lowest total so far
+    (ties go to the lowest shard index), which keeps the most loaded
+    shard within 4/3 of the best possible
+
+    Parameters
+    ----------
+    costs : np.ndarray
+        Estimated cost of each item
+    n_shards : int
+        Number of shards
+
+    Returns
+    -------
+    np.ndarray
+        Shard index of each item
+
+    """
+    costs = np.ravel(costs)
+    shard_indices = np.empty(len(costs), dtype=int)
+
+    loads = [(0.0, shard_index) for shard_index in range(n_shards)]
+    for item_index in longest_first_order(costs):
+        load, shard_index = heapq.heappop(loads)
+        shard_indices[item_index] = shard_index
+        heapq.heappush(loads, (load + float(costs[item_index]), shard_index))
+
+    return shard_indices
+
+
+def _answer_calls(connection):
+    """Loop of a :class:`TimeBudgetWorker` process: call every function
+    received on ``connection`` and send back whether it succeeded and its
+    return value or exception, until the connection is closed"""
+    while True:
+        try:
+            function, args, kwargs = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            answer = (True, function(*args, **kwargs))
+        except Exception as exception:
+            answer = (False, exception)
+        connection.send(answer)
+
+
+def _stop_worker_process(process, connection, owner_pid: int):
+    # copies of a worker in forked processes do not own its process
+    if os.getpid() != owner_pid:
+        return
+
+    connection.close()
+    process.kill()
+    process.join()
+
+
+class TimeBudgetWorker:
+
+    """One worker process that calls functions, abandoning calls that
+    run for longer than their time budget. The mapper is compiled code
+    that cannot be interrupted from Python, so a separate process is the
+    only way to stop it. The process is started on the first call and
+    kept for the following ones, and only killed and started again when
+    a call runs out of time. It is started with the forkserver (or spawn)
+    method, never forked, so it is safe to use while other threads are
+    running. Functions, their arguments and return values must be
+    picklable. Copies of a worker, e.g. pickled into the settings of
+    pool workers, start their own process
+
+    """
+
+    def __init__(self):
+        self._process = None
+        self._connection = None
+        self._finalizer = None
+        self._owner_pid = None
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state: dict):
+        self.__init__()
+
+    def _start(self):
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+        else:
+            context = multiprocessing.get_context("spawn")
+
+        connection, worker_connection = context.Pipe()
+        process = context.Process(
+            target=_answer_calls, args=(worker_connection,), daemon=True
+        )
+        process.start()
+        worker_connection.close()
+
+        self._process = process
+        self._connection = connection
+        self._owner_pid = os.getpid()
+        self._finalizer = weakref.finalize(
+            self, _stop_worker_process, process, connection, self._owner_pid
+        )
+
+    def stop(self):
+        """Kill the worker process, if it is running. The next call
+        starts a new one"""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._process = None
+        self._connection = None
+        self._finalizer = None
+
+    def call(self, function, time_budget: float, *args, **kwargs):
+        """Call ``function`` in the worker process
+
+        Parameters
+        ----------
+        function : callable
+            Function to call
+        time_budget : float
+            Wall-clock time in seconds after which the call is abandoned
+
+        Returns
+        -------
+        Any
+            Return value of ``function``
+
+        Raises
+        ------
+        TimeoutError
+            If ``function`` did not return within ``time_budget``
+        RuntimeError
+            If the worker process died without returning a result
+
+        """
+        if self._process is not None and self._owner_pid != os.getpid():
+            # a copy made by fork, the process belongs to the original
+            self._finalizer.detach()
+            self.__init__()
+        if self._process is None:
+            self._start()
+
+        try:
+            self._connection.send((function, args, kwargs))
+            finished = self._connection.poll(time_budget)
+            if finished:
+                succeeded, value = self._connection.recv()
+        except (EOFError, BrokenPipeError):
+            self._process.join()
+            exitcode = self._process.exitcode
+            self.stop()
+            raise RuntimeError(
+                "Worker process died with exit code " + str(exitcode)
+            ) from None
+
+        if not finished:
+            self.stop()
+            raise TimeoutError(
+                "Call did not finish within " + str(time_budget) + " seconds"
+            )
+
+        if not succeeded:
+            raise value
+
+        return value
+
+
+def iter_results_as_completed(executor, function, calls, max_pending: int):
+    """Submit ``function(*args)`` to ``executor`` for every ``args`` in
+    ``calls``, keeping at most ``max_pending`` calls in flight, and yield
+    their results as they complete. ``calls`` is consumed lazily, so it
+    can be a generator over far more calls than fit in memory at once
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        Executor to submit to
+    function : callable
+        Function to call
+    calls : Iterable[tuple]
+        Arguments of each call
+    max_pending : int
+        Maximum number of calls in flight
+
+    Yields
+    ------
+    Any
+        Return value of each call, in the order they complete
+
+    """
+    calls = iter(calls)
+    pending = set()
+    while True:
+        for args in calls:
+            pending.add(executor.submit(function, *args))
+            if len(pending) >= max_pending:
+                break
+
+        if len(pending) == 0:
+            return
+
+        done, pending = concurrent.futures.wait(
+            pending, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for future in done:
+            yield future.result()
+
+
+def iter_results_in_order(executor, function, calls, max_pending: int):
+    """Like :func:`iter_results_as_completed`, but yield results in the
+    order of ``calls``. A call that completes early waits for the ones
+    before it, and no more than ``max_pending`` calls past the oldest one
+    that has not been yielded are submitted, so results held back are
+    bounded as well
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        Executor to submit to
+    function : callable
+        Function to call
+    calls : Iterable[tuple]
+        Arguments of each call
+    max_pending : int
+        Maximum number of calls in flight or waiting to be yielded
+
+    Yields
+    ------
+    Any
+        Return value of each call, in the order of ``calls``
+
+    """
+    pending = collections.deque()
+    for args in calls:
+        pending.append(executor.submit(function, *args))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+
+    while len(pending) != 0:
+        yield pending.popleft().result()
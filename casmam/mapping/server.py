@@ -0,0 +1,383 @@
+import os
+import json
+import pickle
+import socket
+import struct
+import threading
+import socketserver
+import multiprocessing
+import concurrent.futures
+import pandas as pd
+import casmam.mapping.cache as casmamcache
+import casmam.mapping.mapping as casmammapping
+import casmam.mapping.prefilter as casmamprefilter
+
+# every message is prefixed with its length in bytes
+_message_header = struct.Struct("!Q")
+
+
+def send_message(sock: socket.socket, message: bytes):
+    """Send ``message`` prefixed with its length"""
+    sock.sendall(_message_header.pack(len(message)) + message)
+
+
+def _receive_exactly(sock: socket.socket, n_bytes: int) -> bytes:
+    chunks = []
+    while n_bytes > 0:
+        chunk = sock.recv(min(n_bytes, 2**20))
+        if not chunk:
+            raise RuntimeError("Connection closed in the middle of a message")
+        chunks.append(chunk)
+        n_bytes -= len(chunk)
+
+    return b"".join(chunks)
+
+
+def receive_message(sock: socket.socket) -> bytes:
+    """Receive a message sent with :func:`send_message`"""
+    (n_bytes,) = _message_header.unpack(_receive_exactly(sock, _message_header.size))
+
+    return _receive_exactly(sock, n_bytes)
+
+
+class MappingRequestHandler(socketserver.BaseRequestHandler):
+
+    """Answers one request of a client connection. Requests are json,
+    answers are pickled, so that the server never unpickles anything a
+    client sends"""
+
+    def handle(self):
+        try:
+            request = receive_message(self.request)
+        except RuntimeError:
+            # closed without a request, e.g. by remove_stale_socket
+            return
+
+        try:
+            response = {
+                "result": self.server.answer(json.loads(request)),
+                "error": None,
+            }
+        except Exception as error:
+            response = {"result": None, "error": repr(error)}
+
+        send_message(self.request, pickle.dumps(response))
+
+
+class MappingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    """Long-running mapping server listening on a Unix socket. The
+    parent library is loaded once, and sent once to each of a pool of
+    worker processes that keep it, with its factor groups, for every
+    request (see :func:`casmam.mapping.mapping.initialize_mapping_worker`).
+    Requests of several clients are answered concurrently, their
+    children sharing the pool. Workers are started before the server
+    accepts requests, from a fork server where there is one, since
+    forking the server while its request threads run is unsafe. Use
+    :class:`MappingClient` to send requests
+
+    Parameters
+    ----------
+    socket_path : str
+        Path of the Unix socket to listen on. A stale socket left by a
+        server that is no longer running is replaced
+    parent_paths : str | list[str], optional
+        Paths of parent crystal structures, or the name of a bundled
+        library, see :func:`casmam.mapping.mapping.make_parent_library`
+    n_workers : int, optional
+        Number of worker processes
+    mapping_options : dict, optional
+        Mapping options, see
+        :func:`casmam.mapping.mapping.default_mapping_options`
+    pair_time_budget : float, optional
+        Wall-clock time in seconds after which mapping a single pair is
+        abandoned
+    cache : casmam.mapping.cache.MappingCache, optional
+        Cache of mapping results shared by all requests
+
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        parent_paths: str | list[str] = "common",
+        n_workers: int = 1,
+        mapping_options: dict = None,
+        pair_time_budget: float = None,
+        cache: casmamcache.MappingCache = None,
+    ):
+        remove_stale_socket(socket_path)
+
+        self.parent_library = casmammapping.make_parent_library(parent_paths)
+        # with coordination numbers, so that every prefilter mode works
+        self.parent_descriptors = casmamprefilter.make_structure_descriptors(
+            [
+                prim.lattice().column_vector_matrix()
+                for prim in self.parent_library.prims
+            ],
+            [prim.coordinate_frac() for prim in self.parent_library.prims],
+            include_coordination_number=True,
+        )
+        self.settings = casmammapping.MappingSettings(
+            mapping_options, pair_time_budget, cache=cache
+        )
+        self.stats_lock = threading.Lock()
+
+        mp_context = None
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("forkserver")
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(n_workers, 1),
+            mp_context=mp_context,
+            initializer=casmammapping.initialize_mapping_worker,
+            initargs=(self.parent_library, self.settings),
+        )
+        # start the workers now, while this is the only thread
+        try:
+            for future in [
+                self.executor.submit(os.getpid) for _ in range(max(n_workers, 1))
+            ]:
+                future.result()
+        except BaseException:
+            self.executor.shutdown(cancel_futures=True)
+            raise
+
+        # only the user can connect
+        umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, MappingRequestHandler)
+        finally:
+            os.umask(umask)
+
+    def map_child_paths(
+        self, child_paths: list[str], prefilter: str = "none", best_only=False
+    ) -> list[list[list[casmammapping.MappingResult]]]:
+        """Map every child onto every parent with
+        :func:`casmam.mapping.mapping.map_child_path` in the worker
+        processes
+
+        Returns
+        -------
+        list[list[list[MappingResult]]]
+            Mapping results of each child onto every parent
+
+        """
+        futures = [
+            self.executor.submit(
+                casmammapping.map_child_path_in_worker,
+                child_path,
+                self.parent_descriptors,
+                prefilter,
+                best_only,
+            )
+            for child_path in child_paths
+        ]
+
+        mapping_results = []
+        for future in futures:
+            (_, mapping_results_for_one_child), worker_stats = future.result()
+            with self.stats_lock:
+                self.settings.add_worker_stats(worker_stats)
+            mapping_results.append(mapping_results_for_one_child)
+
+        return mapping_results
+
+    def answer(self, request: dict):
+        """Answer a request of a :class:`MappingClient`
+
+        Raises
+        ------
+        RuntimeError
+            If the request is invalid
+
+        """
+        if not isinstance(request, dict) or "command" not in request:
+            raise RuntimeError("Invalid request " + repr(request))
+
+        command = request["command"]
+        if command == "map":
+            validate_map_request(request)
+            return self.map_child_paths(
+                request["child_paths"], request["prefilter"], request["best_only"]
+            )
+
+        if command == "ping":
+            return {"parent_paths": self.parent_library.paths, "pid": os.getpid()}
+
+        if command == "shutdown":
+            # shutdown waits for serve_forever, which waits for this request
+            threading.Thread(target=self.shutdown).start()
+            return None
+
+        raise RuntimeError("Unknown request " + repr(command))
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def validate_map_request(request: dict):
+    """Check that a "map" request of :meth:`MappingClient.map_child_paths`
+    has at least one child path, a known prefilter mode and a boolean
+    best_only
+
+    Raises
+    ------
+    RuntimeError
+        If it does not
+
+    """
+    child_paths = request.get("child_paths")
+    if (
+        not isinstance(child_paths, list)
+        or len(child_paths) == 0
+        or not all(isinstance(child_path, str) for child_path in child_paths)
+    ):
+        raise RuntimeError("A map request needs a non-empty list of child paths")
+
+    if request.get("prefilter") not in ["safe", "heuristic", "none"]:
+        raise RuntimeError(
+            "Invalid prefilter mode in map request ("
+            + repr(request.get("prefilter"))
+            + ")"
+        )
+
+    if not isinstance(request.get("best_only"), bool):
+        raise RuntimeError("best_only of a map request must be true or false")
+
+
+def remove_stale_socket(socket_path: str):
+    """Remove a socket at ``socket_path`` that no server listens on
+
+    Raises
+    ------
+    RuntimeError
+        If a server is listening on ``socket_path``
+
+    """
+    if not os.path.exists(socket_path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+            return
+
+    raise RuntimeError("A server is already listening on " + socket_path)
+
+
+class MappingClient:
+
+    """Client of a :class:`MappingServer`. Every request opens its own
+    connection, so a client can be shared between threads
+
+    Parameters
+    ----------
+    socket_path : str
+        Path of the Unix socket the server listens on
+    timeout : float, optional
+        Time in seconds after which a request is abandoned. By default
+        requests wait for as long as the mapping takes
+
+    """
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, request: dict):
+        """Send a request and return the answer of the server
+
+        Raises
+        ------
+        RuntimeError
+            If the server could not answer the request
+
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            send_message(sock, json.dumps(request).encode())
+            response = pickle.loads(receive_message(sock))
+
+        if response["error"] is not None:
+            raise RuntimeError(
+                "Mapping server at "
+                + self.socket_path
+                + " failed: "
+                + response["error"]
+            )
+
+        return response["result"]
+
+    def ping(self) -> dict:
+        """Parent paths and process id of the server"""
+        return self.request({"command": "ping"})
+
+    def shutdown(self):
+        """Stop the server once the requests in progress are answered"""
+        self.request({"command": "shutdown"})
+
+    def map_child_paths(
+        self, child_paths: list[str], prefilter: str = "none", best_only=False
+    ) -> list[list[list[casmammapping.MappingResult]]]:
+        """Map every child onto every parent of the server. Paths are
+        made absolute, since the server may run in another directory
+
+        Parameters
+        ----------
+        child_paths : list[str]
+            Paths of the child structures
+        prefilter : str, optional
+            Prefilter mode, see
+            :func:`casmam.mapping.mapping.map_child_structures_onto_parent_structures`
+        best_only : bool, optional
+            See :func:`casmam.mapping.mapping.map_child_structures_onto_parent_structures`
+
+        Returns
+        -------
+        list[list[list[MappingResult]]]
+            Mapping results of each child onto every parent
+
+        """
+        return self.request(
+            {
+                "command": "map",
+                "child_paths": [os.path.abspath(path) for path in child_paths],
+                "prefilter": prefilter,
+                "best_only": best_only,
+            }
+        )
+
+    def map_configurations_onto_parent_structures(
+        self, child_paths: list[str], prefilter: str = "none", best_only=False
+    ) -> pd.DataFrame:
+        """Counterpart of
+        :func:`casmam.mapping.mapping.map_configurations_onto_parent_structures`
+        mapping on the server. Parents, mapping options and workers are
+        those the server was started with
+
+        Parameters
+        ----------
+        child_paths : list[str]
+            Paths of the child structures
+        prefilter : str, optional
+            Prefilter mode
+        best_only : bool, optional
+            See :func:`casmam.mapping.mapping.map_child_structures_onto_parent_structures`
+
+        Returns
+        -------
+        pd.DataFrame
+            See :func:`casmam.mapping.mapping.organize_mapping_results`
+
+        """
+        return casmammapping.organize_mapping_results(
+            self.map_child_paths(child_paths, prefilter, best_only)
+        )
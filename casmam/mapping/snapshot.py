@@ -0,0 +1,310 @@
+import os
+import json
+import struct
+import tempfile
+import numpy as np
+import casmam.mapping.parents as casmamparents
+
+# bump whenever the layout of snapshot files changes
+snapshot_format_version = 1
+
+_snapshot_magic = b"CASMAMSNAP"
+_header_length = struct.Struct("<Q")
+# arrays start at multiples of this many bytes, so that their views are aligned
+_alignment = 64
+
+
+def _align(n_bytes: int) -> int:
+    return -(-n_bytes // _alignment) * _alignment
+
+
+def get_file_signature(path: str) -> list | None:
+    """:func:`casmam.mapping.parents.get_file_signatures` of one file,
+    ``None`` if it does not exist"""
+    try:
+        return casmamparents.get_file_signatures([path])[0]
+    except FileNotFoundError:
+        return None
+
+
+class ChildStructureSnapshot:
+
+    """Lattices, coordinates and atom types of many child structures,
+    e.g. every configuration of a casm project, in a single binary file
+    that is memory mapped rather than read (see :meth:`save` and
+    :meth:`load`). Each child remembers the size and modification time
+    of the file it was read from, so that children whose file changed
+    since are not taken from the snapshot
+
+    Attributes
+    ----------
+    child_paths : list[str]
+        Path of the file each child was read from
+    signatures : list[list]
+        :func:`casmam.mapping.parents.get_file_signatures` of each file
+        when it was read
+    lattices : np.ndarray
+        Number of children by 3 by 3 array of lattice vectors as columns
+    frac_coords : np.ndarray
+        Number of sites of all children by 3 array of fractional
+        coordinates
+    site_offsets : np.ndarray
+        Index of the first site of each child in ``frac_coords``, and the
+        total number of sites
+    atom_type_indices : np.ndarray
+        Index in ``atom_types`` of the atom type at each site
+    atom_types : list[str]
+        Atom types of all children
+
+    """
+
+    def __init__(
+        self,
+        child_paths: list[str],
+        signatures: list[list],
+        lattices: np.ndarray,
+        frac_coords: np.ndarray,
+        site_offsets: np.ndarray,
+        atom_type_indices: np.ndarray,
+        atom_types: list[str],
+    ):
+        self.child_paths = list(child_paths)
+        self.signatures = list(signatures)
+        self.lattices = lattices
+        self.frac_coords = frac_coords
+        self.site_offsets = site_offsets
+        self.atom_type_indices = atom_type_indices
+        self.atom_types = list(atom_types)
+        self._child_indices = {
+            child_path: child_index
+            for child_index, child_path in enumerate(child_paths)
+        }
+
+    @classmethod
+    def from_structure_infos(
+        cls,
+        child_paths: list[str],
+        child_structure_infos: list[tuple[np.ndarray, np.ndarray, list[str]]],
+        signatures: list[list],
+    ):
+        """Construct a snapshot from child structures as returned by
+        :func:`casmam.mapping.mapping.read_child_structure_infos`
+
+        Parameters
+        ----------
+        child_paths : list[str]
+            Path of each child
+        child_structure_infos : list[tuple[np.ndarray, np.ndarray, list[str]]]
+            Lattice, fractional coordinates and atom types of each child
+        signatures : list[list]
+            :func:`casmam.mapping.parents.get_file_signatures` of
+            ``child_paths``, taken before the files were read
+
+        Returns
+        -------
+        ChildStructureSnapshot
+
+        """
+        site_offsets = np.concatenate(
+            [[0], np.cumsum([len(info[2]) for info in child_structure_infos])]
+        ).astype(np.int64)
+        atom_types = sorted(
+            set(atom_type for info in child_structure_infos for atom_type in info[2])
+        )
+        atom_type_index = {
+            atom_type: index for index, atom_type in enumerate(atom_types)
+        }
+
+        return cls(
+            child_paths,
+            signatures,
+            np.array([info[0] for info in child_structure_infos], dtype=float).reshape(
+                -1, 3, 3
+            ),
+            np.concatenate(
+                [np.zeros((0, 3))]
+                + [np.transpose(info[1]) for info in child_structure_infos]
+            ).astype(float),
+            site_offsets,
+            np.array(
+                [
+                    atom_type_index[atom_type]
+                    for info in child_structure_infos
+                    for atom_type in info[2]
+                ],
+                dtype=np.int32,
+            ),
+            atom_types,
+        )
+
+    def __len__(self):
+        return len(self.child_paths)
+
+    def get_structure_info(
+        self, child_index: int
+    ) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        """Lattice vectors as columns of a :math:`3 \\times 3` matrix,
+        fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+        and atom types at each site of one child, as returned by
+        :func:`casmam.xtal.xtal.get_structure_info_from_casm_structure`"""
+        start, stop = self.site_offsets[child_index : child_index + 2]
+
+        return (
+            np.array(self.lattices[child_index]),
+            np.array(self.frac_coords[start:stop].T),
+            [self.atom_types[index] for index in self.atom_type_indices[start:stop]],
+        )
+
+    def find(self, child_paths: list[str]) -> np.ndarray:
+        """Index of each child in the snapshot, -1 for children that are
+        not in it or whose file changed since it was taken
+
+        Parameters
+        ----------
+        child_paths : list[str]
+            Paths of the children
+
+        Returns
+        -------
+        np.ndarray
+
+        """
+        child_indices = np.array(
+            [self._child_indices.get(child_path, -1) for child_path in child_paths],
+            dtype=int,
+        )
+        for position, child_index in enumerate(child_indices):
+            if child_index != -1 and (
+                get_file_signature(child_paths[position])
+                != self.signatures[child_index]
+            ):
+                child_indices[position] = -1
+
+        return child_indices
+
+    def get_structure_infos(
+        self, child_paths: list[str]
+    ) -> list[tuple[np.ndarray, np.ndarray, list[str]] | None]:
+        """:meth:`get_structure_info` of each child, ``None`` for the
+        ones that :meth:`find` does not find"""
+        return [
+            self.get_structure_info(child_index) if child_index != -1 else None
+            for child_index in self.find(child_paths)
+        ]
+
+    def get_n_sites(self, child_paths: list[str]) -> np.ndarray:
+        """Number of sites of each child, -1 for the ones that
+        :meth:`find` does not find"""
+        child_indices = self.find(child_paths)
+        is_found = child_indices != -1
+        n_sites = np.full(len(child_indices), -1, dtype=int)
+        n_sites[is_found] = np.diff(self.site_offsets)[child_indices[is_found]]
+
+        return n_sites
+
+    def save(self, path: str):
+        """Write the snapshot to a single binary file: a json header
+        with the child paths, signatures and atom types and the layout
+        of the arrays, followed by the raw arrays, each aligned so that
+        :meth:`load` can memory map them
+
+        Parameters
+        ----------
+        path : str
+            Path of the snapshot file
+
+        """
+        arrays = {
+            "lattices": np.ascontiguousarray(self.lattices, dtype="<f8"),
+            "frac_coords": np.ascontiguousarray(self.frac_coords, dtype="<f8"),
+            "site_offsets": np.ascontiguousarray(self.site_offsets, dtype="<i8"),
+            "atom_type_indices": np.ascontiguousarray(
+                self.atom_type_indices, dtype="<i4"
+            ),
+        }
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = [array.dtype.str, list(array.shape), offset]
+            offset = _align(offset + array.nbytes)
+
+        header = json.dumps(
+            {
+                "format_version": snapshot_format_version,
+                "child_paths": self.child_paths,
+                "signatures": self.signatures,
+                "atom_types": self.atom_types,
+                "arrays": layout,
+            }
+        ).encode()
+        data_start = _align(len(_snapshot_magic) + _header_length.size + len(header))
+
+        snapshot_dir = os.path.dirname(os.path.abspath(path))
+        # write to a temporary file first so readers never see half a snapshot
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=snapshot_dir, suffix=".tmp"
+        )
+        with os.fdopen(file_descriptor, "wb") as f:
+            f.write(_snapshot_magic + _header_length.pack(len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name][2])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Memory map a snapshot written by :meth:`save`
+
+        Parameters
+        ----------
+        path : str
+            Path of the snapshot file
+
+        Returns
+        -------
+        ChildStructureSnapshot
+
+        Raises
+        ------
+        RuntimeError
+            If the file is not a snapshot or has an unknown format version
+
+        """
+        with open(path, "rb") as f:
+            magic = f.read(len(_snapshot_magic))
+            if magic != _snapshot_magic:
+                raise RuntimeError(str(path) + " is not a child structure snapshot")
+            (n_header_bytes,) = _header_length.unpack(f.read(_header_length.size))
+            header = json.loads(f.read(n_header_bytes))
+
+        if header["format_version"] != snapshot_format_version:
+            raise RuntimeError(
+                "Child structure snapshot "
+                + str(path)
+                + " has an unknown format version"
+            )
+
+        data_start = _align(len(_snapshot_magic) + _header_length.size + n_header_bytes)
+        data = None
+        if os.path.getsize(path) > data_start:
+            data = np.memmap(path, dtype=np.uint8, mode="r", offset=data_start)
+
+        arrays = {}
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            dtype = np.dtype(dtype)
+            n_bytes = int(np.prod(shape)) * dtype.itemsize
+            if n_bytes == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+                continue
+            arrays[name] = data[offset : offset + n_bytes].view(dtype).reshape(shape)
+
+        return cls(
+            header["child_paths"],
+            header["signatures"],
+            arrays["lattices"],
+            arrays["frac_coords"],
+            arrays["site_offsets"],
+            arrays["atom_type_indices"],
+            header["atom_types"],
+        )
@@ -0,0 +1,838 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import casmam.mapping.mapping as casmammapping
+
+# bump whenever arrays are added, removed or change meaning
+store_format_version = 1
+
+_cost_names = ["atomic_cost", "lattice_cost", "total_cost"]
+_lattice_mapping_names = [
+    "deformation_gradient",
+    "transformation_matrix_to_super",
+    "reorientation",
+    "isometry",
+    "left_stretch",
+]
+_array_names = (
+    ["child_paths", "parent_paths"]
+    + _cost_names
+    + ["timed_out"]
+    + _lattice_mapping_names
+    + [
+        "translation",
+        "displacement",
+        "displacement_offsets",
+        "permutation",
+        "permutation_offsets",
+    ]
+)
+
+# arrays that MappingResultStoreWriter appends to, child by child
+_appended_array_names = [
+    name for name in _array_names if name not in ["child_paths", "parent_paths"]
+]
+
+
+def _write_format(
+    directory: str, parent_content_hashes: dict[str, str], mapping_options: dict
+):
+    """Write the format.json of a store"""
+    with open(os.path.join(directory, "format.json"), "w") as f:
+        json.dump(
+            {
+                "store_format_version": store_format_version,
+                "parent_content_hashes": parent_content_hashes,
+                "mapping_options": mapping_options,
+            },
+            f,
+        )
+
+
+def _gather_ragged(
+    values: np.ndarray, offsets: np.ndarray, rows: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Select ``rows`` of a ragged array stored as ``values`` along the
+    last axis, with row ``i`` in ``values[..., offsets[i]:offsets[i + 1]]``
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Values and offsets of the selected rows
+
+    """
+    offsets = np.asarray(offsets)
+    rows = np.asarray(rows, dtype=int)
+    lengths = offsets[rows + 1] - offsets[rows]
+    new_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+    indices = np.repeat(offsets[rows] - new_offsets[:-1], lengths) + np.arange(
+        new_offsets[-1]
+    )
+
+    return np.asarray(values)[..., indices], new_offsets
+
+
+class MappingResultStore:
+
+    """Mapping results of every child onto every parent in plain numeric
+    arrays rather than ``MappingResult`` objects. Only the first (best)
+    mapping result of each (child, parent) pair is kept, the same one
+    :func:`casmam.mapping.mapping.organize_mapping_results` puts in its
+    table. Costs are ``number of children x number of parents`` arrays,
+    lattice mapping matrices have two more axes of size 3, and the
+    displacements and permutations, whose length depends on the pair,
+    are concatenated over all pairs and indexed by offset arrays. Pairs
+    without a map have NaN costs and lattice mapping matrices and no
+    displacements, and pairs mapped with "costs_only" (see
+    :func:`casmam.mapping.mapping.default_mapping_options`) only have
+    costs. Saved as a directory of .npy files, which can be
+    memory mapped so that only the arrays that are used are read
+
+    Attributes
+    ----------
+    child_paths : np.ndarray
+        Path of each child structure
+    parent_paths : np.ndarray
+        Path of each parent structure
+    atomic_cost : np.ndarray
+        Atomic cost of each pair
+    lattice_cost : np.ndarray
+        Lattice cost of each pair
+    total_cost : np.ndarray
+        Total cost of each pair
+    timed_out : np.ndarray
+        Whether mapping the pair was abandoned, see ``MappingResult``
+    deformation_gradient : np.ndarray
+        Deformation gradient of each pair
+    transformation_matrix_to_super : np.ndarray
+        Transformation matrix to the parent supercell of each pair
+    reorientation : np.ndarray
+        Reorientation matrix of each pair
+    isometry : np.ndarray
+        Isometry of each pair
+    left_stretch : np.ndarray
+        Left stretch tensor of each pair
+    translation : np.ndarray
+        Translation of the atom mapping of each pair
+    displacement : np.ndarray
+        Displacements of all pairs as columns of a :math:`3 \\times
+        \\mathbf{N}` matrix
+    displacement_offsets : np.ndarray
+        Displacements of pair ``(i, j)`` are columns
+        ``displacement_offsets[k]`` to ``displacement_offsets[k + 1]``
+        with ``k = i * number of parents + j``
+    permutation : np.ndarray
+        Permutations of all pairs, concatenated
+    permutation_offsets : np.ndarray
+        Offsets of the permutation of each pair, like
+        ``displacement_offsets``
+    parent_content_hashes : dict[str, str]
+        Content hash of each parent by name, see
+        :func:`casmam.mapping.mapping.get_parent_content_hashes`. Empty
+        if they are not known
+    mapping_options : dict | None
+        Options the results were mapped with, see
+        :func:`casmam.mapping.mapping.make_configuration_mapping_options`.
+        ``None`` if they are not known
+
+    """
+
+    def __init__(
+        self,
+        arrays: dict[str, np.ndarray],
+        parent_content_hashes: dict[str, str] = None,
+        mapping_options: dict = None,
+    ):
+        """Construct a store from its arrays, see :meth:`from_mapping_results`
+        and :meth:`load` for the usual ways to get one
+
+        Parameters
+        ----------
+        arrays : dict[str, np.ndarray]
+            Every array listed in the attributes
+        parent_content_hashes : dict[str, str], optional
+            Content hash of each parent by name. By default unknown
+        mapping_options : dict, optional
+            Options the results were mapped with. By default unknown
+
+        """
+        for name in _array_names:
+            setattr(self, name, arrays[name])
+        self.parent_content_hashes = dict(parent_content_hashes or {})
+        self.mapping_options = mapping_options
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Number of children and number of parents"""
+        return self.total_cost.shape
+
+    @classmethod
+    def from_mapping_results(
+        cls, mapping_results: list[list[list[casmammapping.MappingResult]]]
+    ):
+        """Construct a store from the output of
+        :func:`casmam.mapping.mapping.map_child_structures_onto_parent_structures`
+
+        Parameters
+        ----------
+        mapping_results : list[list[list[MappingResult]]]
+            Mapping results of every child onto every parent
+
+        Returns
+        -------
+        MappingResultStore
+
+        """
+        results = [
+            [results_of_one_parent[0] for results_of_one_parent in results_of_one_child]
+            for results_of_one_child in mapping_results
+        ]
+        n_children = len(results)
+        n_parents = len(results[0]) if n_children != 0 else 0
+        flat_results = [result for row in results for result in row]
+
+        arrays = {
+            "child_paths": np.array([row[0].child_path for row in results], dtype=str),
+            "parent_paths": np.array(
+                [result.parent_path for result in results[0]] if n_children else [],
+                dtype=str,
+            ),
+            "timed_out": np.array(
+                [result.timed_out for result in flat_results], dtype=bool
+            ).reshape(n_children, n_parents),
+        }
+        for name in _cost_names:
+            arrays[name] = np.array(
+                [getattr(result, name) for result in flat_results], dtype=float
+            ).reshape(n_children, n_parents)
+
+        is_valid = [result.has_mappings() for result in flat_results]
+        for name, shape in [(name, (3, 3)) for name in _lattice_mapping_names] + [
+            ("translation", (3,))
+        ]:
+            array = np.full((len(flat_results),) + shape, np.nan)
+            for index, result in enumerate(flat_results):
+                if is_valid[index]:
+                    array[index] = getattr(result, name)
+            arrays[name] = array.reshape((n_children, n_parents) + shape)
+
+        displacements = [
+            np.asarray(result.displacement, dtype=float).reshape(3, -1)
+            if valid
+            else np.zeros((3, 0))
+            for result, valid in zip(flat_results, is_valid)
+        ]
+        arrays["displacement"] = np.concatenate(
+            displacements + [np.zeros((3, 0))], axis=1
+        )
+        arrays["displacement_offsets"] = np.concatenate(
+            [[0], np.cumsum([displacement.shape[1] for displacement in displacements])]
+        ).astype(int)
+
+        permutations = [
+            np.asarray(result.permutation, dtype=np.int32).ravel()
+            if valid
+            else np.zeros(0, dtype=np.int32)
+            for result, valid in zip(flat_results, is_valid)
+        ]
+        arrays["permutation"] = np.concatenate(
+            permutations + [np.zeros(0, dtype=np.int32)]
+        )
+        arrays["permutation_offsets"] = np.concatenate(
+            [[0], np.cumsum([len(permutation) for permutation in permutations])]
+        ).astype(int)
+
+        return cls(arrays)
+
+    @classmethod
+    def from_dataframe(cls, mapping_data: pd.DataFrame):
+        """Construct a store from a table made by
+        :func:`casmam.mapping.mapping.organize_mapping_results`, e.g. an
+        hdf5 file written by an older version
+
+        Parameters
+        ----------
+        mapping_data : pd.DataFrame
+            Table with "mapping_results" columns
+
+        Returns
+        -------
+        MappingResultStore
+
+        Raises
+        ------
+        RuntimeError
+            If the table does not contain ``MappingResult`` objects
+
+        """
+        keys_with_mapping_results = [
+            key for key in mapping_data if "mapping_results" in key
+        ]
+        if len(keys_with_mapping_results) == 0:
+            raise RuntimeError(
+                "Provided DataFrame does not contain MappingResult objects"
+            )
+
+        store = cls.from_mapping_results(
+            [
+                [[result] for result in row]
+                for row in mapping_data.loc[:, keys_with_mapping_results].to_numpy()
+            ]
+        )
+        store.parent_content_hashes = dict(
+            mapping_data.attrs.get("parent_content_hashes", {})
+        )
+        store.mapping_options = mapping_data.attrs.get("mapping_options")
+
+        return store
+
+    def save(self, directory: str):
+        """Write every array to ``directory`` as a .npy file. An existing
+        store in ``directory`` is replaced only once the new one is
+        complete
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the store
+
+        """
+        directory = os.path.abspath(directory)
+        temporary_directory = directory + ".tmp"
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+        os.makedirs(temporary_directory)
+
+        for name in _array_names:
+            np.save(
+                os.path.join(temporary_directory, name + ".npy"),
+                np.asarray(getattr(self, name)),
+                allow_pickle=False,
+            )
+        _write_format(
+            temporary_directory, self.parent_content_hashes, self.mapping_options
+        )
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(temporary_directory, directory)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r"):
+        """Read a store written by :meth:`save`
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the store
+        mmap_mode : str, optional
+            Passed to ``np.load``. By default arrays are memory mapped and
+            only read from disk when used. ``None`` reads everything
+
+        Returns
+        -------
+        MappingResultStore
+
+        Raises
+        ------
+        RuntimeError
+            If ``directory`` is not a store of a known format version
+
+        """
+        try:
+            with open(os.path.join(directory, "format.json"), "r") as f:
+                store_format = json.load(f)
+            version = store_format["store_format_version"]
+        except (OSError, ValueError, KeyError):
+            raise RuntimeError(
+                "Not a mapping result store (" + str(directory) + ")"
+            ) from None
+
+        if version != store_format_version:
+            raise RuntimeError(
+                "Mapping result store "
+                + str(directory)
+                + " has format version "
+                + str(version)
+                + ", expected "
+                + str(store_format_version)
+            )
+
+        return cls(
+            {
+                name: np.load(
+                    os.path.join(directory, name + ".npy"),
+                    mmap_mode=mmap_mode,
+                    allow_pickle=False,
+                )
+                for name in _array_names
+            },
+            store_format.get("parent_content_hashes"),
+            store_format.get("mapping_options"),
+        )
+
+    def get_mapping_result(
+        self, child_index: int, parent_index: int
+    ) -> casmammapping.MappingResult:
+        """Construct the ``MappingResult`` of one pair
+
+        Parameters
+        ----------
+        child_index : int
+            Index of the child
+        parent_index : int
+            Index of the parent
+
+        Returns
+        -------
+        MappingResult
+
+        """
+        result = casmammapping.MappingResult.dummy(
+            str(self.parent_paths[parent_index]), str(self.child_paths[child_index])
+        )
+        result.timed_out = bool(self.timed_out[child_index, parent_index])
+        for name in _cost_names:
+            setattr(result, name, float(getattr(self, name)[child_index, parent_index]))
+
+        if (
+            result.is_dummy()
+            or np.isnan(
+                self.transformation_matrix_to_super[child_index, parent_index]
+            ).any()
+        ):
+            # no map, or only its costs were kept
+            return result
+
+        for name in _lattice_mapping_names + ["translation"]:
+            setattr(
+                result, name, np.array(getattr(self, name)[child_index, parent_index])
+            )
+        result.transformation_matrix_to_super = (
+            result.transformation_matrix_to_super.round().astype(int)
+        )
+
+        pair_index = child_index * self.shape[1] + parent_index
+        result.displacement = np.array(
+            self.displacement[
+                :,
+                self.displacement_offsets[pair_index] : self.displacement_offsets[
+                    pair_index + 1
+                ],
+            ]
+        )
+        result.permutation = np.array(
+            self.permutation[
+                self.permutation_offsets[pair_index] : self.permutation_offsets[
+                    pair_index + 1
+                ]
+            ],
+            dtype=np.int32,
+        )
+
+        return result
+
+    def get_child_names(self) -> list[str]:
+        """casm configuration name of each child, see
+        :func:`casmam.mapping.mapping.get_casm_config_name_from_child_path`"""
+        return [
+            casmammapping.get_casm_config_name_from_child_path(str(child_path))
+            for child_path in self.child_paths
+        ]
+
+    def get_parent_names(self) -> list[str]:
+        """File name of each parent"""
+        return [os.path.basename(str(parent_path)) for parent_path in self.parent_paths]
+
+    def select(self, child_indices: list[int]):
+        """A store with only some of the children
+
+        Parameters
+        ----------
+        child_indices : list[int]
+            Indices of the children to keep, in the order to keep them
+
+        Returns
+        -------
+        MappingResultStore
+
+        """
+        child_indices = np.asarray(child_indices, dtype=int)
+        n_parents = self.shape[1]
+        pair_indices = (
+            child_indices[:, np.newaxis] * n_parents + np.arange(n_parents)
+        ).ravel()
+
+        arrays = {
+            name: np.asarray(getattr(self, name))[child_indices]
+            for name in ["child_paths", "timed_out"]
+            + _cost_names
+            + _lattice_mapping_names
+            + ["translation"]
+        }
+        arrays["parent_paths"] = np.asarray(self.parent_paths)
+        arrays["displacement"], arrays["displacement_offsets"] = _gather_ragged(
+            self.displacement, self.displacement_offsets, pair_indices
+        )
+        arrays["permutation"], arrays["permutation_offsets"] = _gather_ragged(
+            self.permutation, self.permutation_offsets, pair_indices
+        )
+
+        return MappingResultStore(
+            arrays, self.parent_content_hashes, self.mapping_options
+        )
+
+    @classmethod
+    def concatenate(cls, stores: list):
+        """Combine stores of different children onto the same parents,
+        e.g. the shards of a sharded run
+
+        Parameters
+        ----------
+        stores : list[MappingResultStore]
+            Stores to combine, in order
+
+        Returns
+        -------
+        MappingResultStore
+
+        Raises
+        ------
+        RuntimeError
+            If the stores have different parents or mapping options
+
+        """
+        parent_names = stores[0].get_parent_names()
+        for store in stores[1:]:
+            if (
+                store.get_parent_names() != parent_names
+                or store.parent_content_hashes != stores[0].parent_content_hashes
+            ):
+                raise RuntimeError(
+                    "Shards were mapped onto different parent crystal structures"
+                )
+            if store.mapping_options != stores[0].mapping_options:
+                raise RuntimeError("Shards were mapped with different mapping options")
+
+        arrays = {
+            name: np.concatenate([np.asarray(getattr(store, name)) for store in stores])
+            for name in ["child_paths", "timed_out"]
+            + _cost_names
+            + _lattice_mapping_names
+            + ["translation"]
+        }
+        arrays["parent_paths"] = np.asarray(stores[0].parent_paths)
+        arrays["displacement"] = np.concatenate(
+            [np.asarray(store.displacement) for store in stores], axis=1
+        )
+        arrays["permutation"] = np.concatenate(
+            [np.asarray(store.permutation) for store in stores]
+        )
+        for name in ["displacement_offsets", "permutation_offsets"]:
+            offsets = [np.zeros(1, dtype=int)]
+            for store in stores:
+                store_offsets = np.asarray(getattr(store, name))
+                offsets.append(store_offsets[1:] + offsets[-1][-1])
+            arrays[name] = np.concatenate(offsets)
+
+        return cls(arrays, stores[0].parent_content_hashes, stores[0].mapping_options)
+
+    def to_dataframe(self, include_mapping_results: bool = False) -> pd.DataFrame:
+        """Table of costs in the layout of
+        :func:`casmam.mapping.mapping.organize_mapping_results`
+
+        Parameters
+        ----------
+        include_mapping_results : bool, optional
+            If ``True``, also include a "mapping_results" column with a
+            ``MappingResult`` for each parent, as
+            :func:`casmam.mapping.mapping.organize_mapping_results` does
+
+        Returns
+        -------
+        pd.DataFrame
+
+        """
+        n_children, n_parents = self.shape
+        columns = list(_cost_names)
+        values = [np.asarray(getattr(self, name)) for name in _cost_names]
+        if include_mapping_results:
+            columns.append("mapping_results")
+            mapping_results = np.empty((n_children, n_parents), dtype=object)
+            for child_index in range(n_children):
+                for parent_index in range(n_parents):
+                    mapping_results[
+                        child_index, parent_index
+                    ] = self.get_mapping_result(child_index, parent_index)
+            values.append(mapping_results)
+
+        mapping_results_table = pd.DataFrame(
+            {
+                column_index: value[:, parent_index]
+                for column_index, (parent_index, value) in enumerate(
+                    (parent_index, value)
+                    for parent_index in range(n_parents)
+                    for value in values
+                )
+            },
+            index=self.get_child_names(),
+        )
+        mapping_results_table.columns = pd.MultiIndex.from_product(
+            [self.get_parent_names(), columns]
+        )
+        if len(self.parent_content_hashes) != 0:
+            mapping_results_table.attrs["parent_content_hashes"] = dict(
+                self.parent_content_hashes
+            )
+        if self.mapping_options is not None:
+            mapping_results_table.attrs["mapping_options"] = dict(self.mapping_options)
+
+        return mapping_results_table
+
+
+class MappingResultStoreWriter:
+
+    """Write a :class:`MappingResultStore` while mapping results come in,
+    e.g. from :func:`casmam.mapping.mapping.iter_mappings`, one child at
+    a time. Arrays are appended to raw files, which only get their .npy
+    headers once the number of children is known, so memory use does not
+    grow with the number of children other than for their paths. The
+    store only appears in ``directory`` once it is closed
+
+    Attributes
+    ----------
+    directory : str
+        Directory of the store
+    n_children : int
+        Number of children written so far
+    parent_content_hashes : dict[str, str]
+        See :class:`MappingResultStore`
+    mapping_options : dict | None
+        See :class:`MappingResultStore`
+
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        parent_content_hashes: dict[str, str] = None,
+        mapping_options: dict = None,
+    ):
+        """Start writing a store
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the store
+        parent_content_hashes : dict[str, str], optional
+            Content hash of each parent by name. By default unknown
+        mapping_options : dict, optional
+            Options the results are mapped with. By default unknown
+
+        """
+        self.directory = os.path.abspath(directory)
+        self.n_children = 0
+        self.parent_content_hashes = dict(parent_content_hashes or {})
+        self.mapping_options = mapping_options
+        self._temporary_directory = self.directory + ".tmp"
+        self._child_paths = []
+        self._parent_paths = None
+        self._files = {}
+        self._dtypes = {}
+        self._offsets = {}
+
+        shutil.rmtree(self._temporary_directory, ignore_errors=True)
+        os.makedirs(self._temporary_directory)
+
+    def _open(self, row: MappingResultStore):
+        """Open a raw file for every array, with the dtype of ``row``"""
+        for name in _appended_array_names:
+            self._files[name] = open(
+                os.path.join(self._temporary_directory, name + ".bin"), "wb"
+            )
+            self._dtypes[name] = np.asarray(getattr(row, name)).dtype
+
+        for name in ["displacement_offsets", "permutation_offsets"]:
+            self._offsets[name] = 0
+            self._files[name].write(np.zeros(1, dtype=self._dtypes[name]).tobytes())
+
+    def append(self, mapping_results_for_one_child: list[list]):
+        """Add the mapping results of one child onto every parent
+
+        Parameters
+        ----------
+        mapping_results_for_one_child : list[list[MappingResult]]
+            One entry of the output of
+            :func:`casmam.mapping.mapping.map_child_structures_onto_parent_structures`
+
+        Raises
+        ------
+        RuntimeError
+            If the child was mapped onto other parents than the children
+            before it
+
+        """
+        row = MappingResultStore.from_mapping_results([mapping_results_for_one_child])
+        if self._parent_paths is None:
+            self._parent_paths = row.parent_paths
+            self._open(row)
+        elif not np.array_equal(row.parent_paths, self._parent_paths):
+            raise RuntimeError(
+                "Child "
+                + str(row.child_paths[0])
+                + " was mapped onto different parent crystal structures"
+            )
+
+        for name in _appended_array_names:
+            array = np.asarray(getattr(row, name), dtype=self._dtypes[name])
+            if name == "displacement":
+                # columns are appended, so they are stored in fortran order
+                array = array.T
+            elif name in self._offsets:
+                offset = self._offsets[name]
+                self._offsets[name] += int(array[-1])
+                array = array[1:] + offset
+
+            self._files[name].write(np.ascontiguousarray(array).tobytes())
+
+        self._child_paths.append(str(row.child_paths[0]))
+        self.n_children += 1
+
+    def _get_shape(self, name: str) -> tuple[int, ...]:
+        """Shape of the array ``name`` once every child is written"""
+        n_parents = len(self._parent_paths)
+        if name == "displacement":
+            return (3, self._offsets["displacement_offsets"])
+        if name == "permutation":
+            return (self._offsets["permutation_offsets"],)
+        if name in self._offsets:
+            return (self.n_children * n_parents + 1,)
+        if name in _lattice_mapping_names:
+            return (self.n_children, n_parents, 3, 3)
+        if name == "translation":
+            return (self.n_children, n_parents, 3)
+
+        return (self.n_children, n_parents)
+
+    def close(self):
+        """Give every array its .npy header, and move the store to
+        ``directory``, replacing an existing store"""
+        if self._parent_paths is None:
+            shutil.rmtree(self._temporary_directory, ignore_errors=True)
+            store = MappingResultStore.from_mapping_results([])
+            store.parent_content_hashes = self.parent_content_hashes
+            store.mapping_options = self.mapping_options
+            store.save(self.directory)
+            return
+
+        for name, raw_file in self._files.items():
+            raw_file.close()
+            raw_path = os.path.join(self._temporary_directory, name + ".bin")
+            with open(
+                os.path.join(self._temporary_directory, name + ".npy"), "wb"
+            ) as f:
+                np.lib.format.write_array_header_1_0(
+                    f,
+                    {
+                        "descr": np.lib.format.dtype_to_descr(self._dtypes[name]),
+                        "fortran_order": name == "displacement",
+                        "shape": self._get_shape(name),
+                    },
+                )
+                with open(raw_path, "rb") as raw:
+                    shutil.copyfileobj(raw, f)
+            os.remove(raw_path)
+
+        for name, paths in [
+            ("child_paths", self._child_paths),
+            ("parent_paths", self._parent_paths),
+        ]:
+            np.save(
+                os.path.join(self._temporary_directory, name + ".npy"),
+                np.array(paths, dtype=str),
+                allow_pickle=False,
+            )
+        _write_format(
+            self._temporary_directory, self.parent_content_hashes, self.mapping_options
+        )
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self._temporary_directory, self.directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception_type is None:
+            self.close()
+            return
+
+        for raw_file in self._files.values():
+            raw_file.close()
+        shutil.rmtree(self._temporary_directory, ignore_errors=True)
+
+
+def analyze_mapping_result_store(
+    store: MappingResultStore, tol: float = 1e-4, chunk_size: int = 10000
+) -> pd.DataFrame:
+    """:func:`casmam.mapping.mapping.analyze_mapping_data` for a store.
+    Only the total costs are read, ``chunk_size`` children at a time, so
+    with a memory mapped store (see :meth:`MappingResultStore.load`)
+    memory use does not grow with the size of the store. The other
+    arrays are only read for the best and conflicting parents
+
+    Parameters
+    ----------
+    store : MappingResultStore
+        Mapping results
+    tol : float, optional
+        Tolerance within which costs are tied, see
+        :func:`casmam.mapping.mapping.find_best_parents_and_flag_conflicts`
+    chunk_size : int, optional
+        Number of children analyzed at once
+
+    Returns
+    -------
+    pd.DataFrame
+        Same table as :func:`casmam.mapping.mapping.analyze_mapping_data`
+
+    """
+    config_names = []
+    table_entries = []
+    for start in range(0, store.shape[0], chunk_size):
+        child_indices = range(start, min(start + chunk_size, store.shape[0]))
+        best_indices, conflicts = casmammapping.find_best_parents_and_flag_conflicts(
+            np.asarray(store.total_cost[child_indices.start : child_indices.stop]), tol
+        )
+
+        for child_index, best_index, conflicts_of_one_child in zip(
+            child_indices, best_indices, conflicts
+        ):
+            config_names.append(
+                casmammapping.get_casm_config_name_from_child_path(
+                    str(store.child_paths[child_index])
+                )
+            )
+            if best_index < 0:
+                table_entries.append([None, None, None])
+                continue
+
+            best_map = store.get_mapping_result(child_index, best_index)
+            conflicting_maps = [
+                store.get_mapping_result(child_index, parent_index)
+                for parent_index in np.nonzero(conflicts_of_one_child)[0]
+            ]
+            table_entries.append(
+                [best_map.parent_path, best_map, conflicting_maps or None]
+            )
+
+    return pd.DataFrame(
+        table_entries,
+        index=config_names,
+        columns=[
+            "Best parent map name",
+            "Best parent mapping object",
+            "Conflicting maps",
+        ],
+        dtype=object,
+    )
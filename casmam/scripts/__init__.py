@@ -1,3 +1,7 @@
-from . import casm_alloy_manager
+import casmam._lazy as _lazy
 
 __all__ = ["casm_alloy_manager"]
+
+
+__getattr__ = _lazy.make_getattr(__name__, __all__)
+__dir__ = _lazy.make_dir(__name__, __all__)
@@ -1,10 +1,399 @@
-import json
+from __future__ import annotations
+
+import os
+import sys
+import typing
 import casmam
 import warnings
 import argparse
-import pandas as pd
 
-warnings.filterwarnings("ignore", category=pd.io.pytables.PerformanceWarning)
+# casmam submodules and pandas are imported only by the subcommands that
+# use them, so that e.g. --help starts fast
+if typing.TYPE_CHECKING:
+    import pandas as pd
+
+
+def ignore_pytables_performance_warnings():
+    """Silence the warnings of pandas about pickling object columns to
+    hdf5 files"""
+    import pandas as pd
+
+    warnings.filterwarnings("ignore", category=pd.io.pytables.PerformanceWarning)
+
+
+def parse_shard(string: str) -> tuple[int, int]:
+    """Parse a shard given as "i/N" on the command line"""
+    try:
+        shard_index, n_shards = [int(part) for part in string.split("/")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Shard should be given as i/N, e.g. 0/4"
+        ) from None
+
+    if not 0 <= shard_index < n_shards:
+        raise argparse.ArgumentTypeError(
+            "Shard index should be from 0 to N - 1, got " + string
+        )
+
+    return shard_index, n_shards
+
+
+def write_mapping_results(mapping_results: pd.DataFrame, outfile: str):
+    """Write mapping results to a html file if ``outfile`` is *.html, to
+    a hdf5 file if it is *.hdf or to a columnar store
+    (:class:`casmam.mapping.store.MappingResultStore`) if it is *.mapping"""
+    if ".html" in outfile:
+        mapping_results.to_html(outfile)
+
+    if ".hdf" in outfile:
+        casmam.mapping.mapping.write_mapping_results_hdf(mapping_results, outfile)
+
+    if outfile.rstrip("/").endswith(".mapping"):
+        casmam.mapping.store.MappingResultStore.from_dataframe(mapping_results).save(
+            outfile
+        )
+
+
+def read_mapping_results(infile: str) -> pd.DataFrame:
+    """Read mapping results from a hdf5 file or a columnar store
+    written by :func:`write_mapping_results`"""
+    if os.path.isdir(infile):
+        return casmam.mapping.store.MappingResultStore.load(infile).to_dataframe(
+            include_mapping_results=True
+        )
+
+    return casmam.mapping.mapping.read_mapping_results_hdf(infile)
+
+
+def open_mapping_results_writer(
+    outfile: str,
+    parent_content_hashes: dict[str, str] = None,
+    mapping_options: dict = None,
+):
+    """Writer to which mapping results can be appended child by child,
+    for the outputs of :func:`write_mapping_results` that can be written
+    incrementally: hdf5 files and columnar stores. ``parent_content_hashes``
+    and ``mapping_options`` are written with the results, see
+    :func:`casmam.mapping.mapping.get_parent_content_hashes` and
+    :func:`casmam.mapping.mapping.make_configuration_mapping_options`
+
+    Returns
+    -------
+    casmam.mapping.store.MappingResultStoreWriter | casmam.mapping.mapping.MappingResultHDFWriter | None
+        ``None`` for html files, which need the whole table at once
+
+    """
+    if outfile.rstrip("/").endswith(".mapping"):
+        return casmam.mapping.store.MappingResultStoreWriter(
+            outfile, parent_content_hashes, mapping_options
+        )
+
+    if ".hdf" in outfile and ".html" not in outfile:
+        return casmam.mapping.mapping.MappingResultHDFWriter(
+            outfile,
+            parent_content_hashes=parent_content_hashes,
+            mapping_options=mapping_options,
+        )
+
+    return None
+
+
+def make_cache(args: argparse.Namespace):
+    """Mapping cache given by the --cache and --cache-size arguments,
+    ``None`` if there is none
+
+    Returns
+    -------
+    casmam.mapping.cache.MappingCache | None
+
+    """
+    if args.cache is None:
+        return None
+
+    return casmam.mapping.cache.MappingCache(
+        None if args.cache == "default" else args.cache,
+        int(args.cache_size * 2**20),
+    )
+
+
+def read_child_paths(args: argparse.Namespace) -> list[str]:
+    """Paths of the properties.calc.json/structure.json files of the
+    configurations given by --configurations, --select, --configtype and
+    --calctype. The configurations are streamed, only their paths are
+    kept"""
+    config_names = casmam.mapping.mapping.iter_ccasm_query_config_names(
+        args.configurations, args.select
+    )
+
+    relaxed = args.configtype == "relaxed"
+    # get child properties paths
+    return casmam.mapping.mapping.get_properties_json_paths(
+        config_names, args.calctype, relaxed
+    )
+
+
+def load_snapshot(args: argparse.Namespace):
+    """The child structure snapshot given by --snapshot, if any"""
+    if args.snapshot is None:
+        return None
+
+    return casmam.mapping.snapshot.ChildStructureSnapshot.load(args.snapshot)
+
+
+def make_snapshot(args: argparse.Namespace):
+    """Write a snapshot of the configurations of the snapshot command.
+    Configurations that are up to date in an existing snapshot at the
+    output are not read again"""
+    child_paths = read_child_paths(args)
+
+    previous = None
+    n_reused = 0
+    if os.path.exists(args.outfile):
+        previous = casmam.mapping.snapshot.ChildStructureSnapshot.load(args.outfile)
+        n_reused = int((previous.find(child_paths) != -1).sum())
+
+    snapshot = casmam.mapping.mapping.make_child_structure_snapshot(
+        child_paths, previous, args.threads
+    )
+    snapshot.save(args.outfile)
+
+    print(
+        "Wrote "
+        + str(len(snapshot))
+        + " configurations ("
+        + str(len(snapshot.frac_coords))
+        + " sites) to "
+        + args.outfile
+        + ", "
+        + str(len(snapshot) - n_reused)
+        + " of them read from their files"
+    )
+
+
+def run_map(args: argparse.Namespace):
+    """Map the configurations of the map command, on a mapping server if
+    --server is given"""
+    # construct child structures to be used in mapping
+    child_paths = read_child_paths(args)
+
+    if args.incremental is not None:
+        remap_configurations(args, child_paths)
+        return
+
+    if args.server is not None:
+        client = casmam.mapping.server.MappingClient(args.server)
+        mapping_results = client.map_configurations_onto_parent_structures(
+            child_paths, args.prefilter, args.best_only
+        )
+        write_mapping_results(mapping_results, args.outfile)
+        return
+
+    checkpoint_path = args.checkpoint
+    if checkpoint_path is None:
+        checkpoint_path = args.outfile + ".checkpoint"
+
+    map_configurations(args, child_paths, checkpoint_path)
+
+    os.remove(checkpoint_path)
+
+
+def remap_configurations(args: argparse.Namespace, child_paths: list[str]):
+    """Update the mapping results given by --incremental for the
+    configurations and parents of the map command, see
+    :func:`casmam.mapping.mapping.remap_configurations_onto_parent_structures`"""
+    if os.path.abspath(args.incremental.rstrip("/")) == os.path.abspath(
+        args.outfile.rstrip("/")
+    ):
+        raise RuntimeError(
+            "Incremental mapping results "
+            + args.incremental
+            + " cannot be overwritten, write them to another file"
+        )
+
+    unsupported_options = [
+        option
+        for option, value in [
+            ("--best-only", args.best_only),
+            ("--deduplicate", args.deduplicate),
+            ("--deduplicate-parents", args.deduplicate_parents),
+            ("--shard", args.shard is not None),
+            ("--resume", args.resume),
+            ("--server", args.server is not None),
+        ]
+        if value
+    ]
+    if len(unsupported_options) != 0:
+        raise RuntimeError(
+            "--incremental cannot be combined with " + ", ".join(unsupported_options)
+        )
+
+    profile = make_profile(args)
+    mapping_results = (
+        casmam.mapping.mapping.remap_configurations_onto_parent_structures(
+            read_mapping_results(args.incremental),
+            child_paths,
+            args.parents,
+            n_workers=args.jobs,
+            pair_time_budget=args.pair_time_budget,
+            prefilter=args.prefilter,
+            cache=make_cache(args),
+            max_maps_per_pair=args.keep_maps if args.keep_maps > 0 else None,
+            costs_only=args.costs_only,
+            profile=profile,
+            progress=casmam.mapping.progress.MappingProgress(
+                args.progress_interval, args.progress_file
+            ),
+            snapshot=load_snapshot(args),
+        )
+    )
+    write_mapping_results(mapping_results, args.outfile)
+    write_profile(args, profile)
+
+
+def make_profile(args: argparse.Namespace):
+    """Mapping profile to record if --profile is given, ``None`` if not
+
+    Returns
+    -------
+    casmam.mapping.instrumentation.MappingProfile | None
+
+    """
+    if args.profile is None:
+        return None
+
+    return casmam.mapping.instrumentation.MappingProfile()
+
+
+def write_profile(args: argparse.Namespace, profile):
+    """Write the profile of :func:`make_profile` to the file given by
+    --profile and print its summary"""
+    if profile is None:
+        return
+
+    profile.write(
+        args.outfile.rstrip("/") + ".profile.csv"
+        if args.profile == "default"
+        else args.profile
+    )
+    print(profile.summary())
+
+
+def serve(args: argparse.Namespace):
+    """Run a :class:`casmam.mapping.server.MappingServer` until it is
+    shut down by a client or interrupted"""
+    server = casmam.mapping.server.MappingServer(
+        args.socket,
+        args.parents,
+        args.jobs,
+        dict(
+            casmam.mapping.mapping.default_mapping_options(),
+            max_maps_per_pair=args.keep_maps if args.keep_maps > 0 else None,
+            costs_only=args.costs_only,
+        ),
+        args.pair_time_budget,
+        make_cache(args),
+    )
+    print(
+        "Serving "
+        + str(len(server.parent_library))
+        + " parent structures on "
+        + args.socket,
+        flush=True,
+    )
+
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def map_configurations(
+    args: argparse.Namespace, child_paths: list[str], checkpoint_path: str
+):
+    """Map configurations and write the results to ``args.outfile``.
+    Results are streamed to the output child by child (see
+    :func:`casmam.mapping.mapping.iter_mappings`) unless the output is a
+    html file or children are deduplicated, which both need every child
+    at once"""
+    cache = make_cache(args)
+    profile = make_profile(args)
+    with casmam.mapping.instrumentation.profile_phase(profile, "load_parents"):
+        parent_library = casmam.mapping.mapping.make_parent_library(args.parents)
+
+    options = dict(
+        n_workers=args.jobs,
+        pair_time_budget=args.pair_time_budget,
+        prefilter=args.prefilter,
+        best_only=args.best_only,
+        cache=cache,
+        checkpoint_path=checkpoint_path,
+        resume=args.resume,
+        shard=args.shard,
+        deduplicate_parents=args.deduplicate_parents,
+        max_maps_per_pair=args.keep_maps if args.keep_maps > 0 else None,
+        costs_only=args.costs_only,
+        profile=profile,
+        progress=casmam.mapping.progress.MappingProgress(
+            args.progress_interval, args.progress_file
+        ),
+        snapshot=load_snapshot(args),
+    )
+
+    writer = None
+    if not args.deduplicate:
+        writer = open_mapping_results_writer(
+            args.outfile,
+            casmam.mapping.mapping.get_parent_content_hashes(parent_library),
+            casmam.mapping.mapping.make_configuration_mapping_options(
+                options["max_maps_per_pair"], options["costs_only"]
+            ),
+        )
+
+    if writer is None:
+        mapping_results = (
+            casmam.mapping.mapping.map_configurations_onto_parent_structures(
+                child_paths, parent_library, deduplicate=args.deduplicate, **options
+            )
+        )
+        write_mapping_results(mapping_results, args.outfile)
+    else:
+        child_mapping_results = casmam.mapping.mapping.iter_configuration_mappings(
+            child_paths, parent_library, **options
+        )
+        with writer:
+            for _, mapping_results_for_one_child in child_mapping_results:
+                writer.append(mapping_results_for_one_child)
+
+    write_profile(args, profile)
+
+
+def run_benchmark(args: argparse.Namespace):
+    """Run :func:`casmam.mapping.benchmark.run_benchmarks`, write its
+    results and compare them to a baseline"""
+    results = casmam.mapping.benchmark.run_benchmarks(
+        args.scales,
+        args.parents,
+        args.repeats,
+        args.max_mapped,
+        args.seed,
+        quiet=False,
+        startup_only=args.startup_only,
+    )
+    if args.outfile is not None:
+        casmam.mapping.benchmark.write_benchmark_results(results, args.outfile)
+
+    if args.baseline is None:
+        return
+
+    comparison = casmam.mapping.benchmark.compare_benchmark_results(
+        casmam.mapping.benchmark.read_benchmark_results(args.baseline),
+        results,
+        args.tolerance,
+    )
+    print(comparison.to_string())
+    if comparison["regression"].any():
+        sys.exit(1)
 
 
 def main():
@@ -26,6 +415,13 @@ def main():
         help="List of configurations in ccasm query json format",
     )
 
+    mapper.add_argument(
+        "--select",
+        type=str,
+        default=None,
+        help="Only use configurations for which this column of the ccasm query is true, e.g. selected or is_calculated",
+    )
+
     # outfile name. If outfile name is *.html, results will be written out to html file
     # If outfile name is *.hdf, results will be written to hdf file
     mapper.add_argument(
@@ -33,7 +429,7 @@ def main():
         "-o",
         type=str,
         required=True,
-        help="Output file name (a pandas dataframe dumped as a hdf5/html) file",
+        help="Output file name (a pandas dataframe dumped as a hdf5/html) file, or a columnar store directory if it ends with .mapping",
     )
 
     mapper.add_argument(
@@ -64,9 +460,265 @@ def main():
         choices=["all", "common"],
         help="What parent structures to use",
     )
+
+    mapper.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes to distribute (configuration, parent) pairs over",
+    )
+
+    mapper.add_argument(
+        "--pair-time-budget",
+        type=float,
+        default=None,
+        help="Seconds after which mapping a single (configuration, parent) pair is abandoned and recorded as timed out",
+    )
+
+    mapper.add_argument(
+        "--prefilter",
+        nargs="?",
+        type=str,
+        default="none",
+        choices=["safe", "heuristic", "none"],
+        help="Skip (configuration, parent) pairs whose numbers of sites do not divide (safe), or that also very likely cannot map (heuristic). By default every pair is mapped",
+    )
+
+    mapper.add_argument(
+        "--best-only",
+        action="store_true",
+        help="Only guarantee finding the best parent of each configuration (and parents tied with it), which is much faster",
+    )
+
+    mapper.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="Map configurations that are equivalent after masking atom types only once. Duplicates that are not identical only get the costs, without lattice and atom mappings",
+    )
+
+    mapper.add_argument(
+        "--deduplicate-parents",
+        action="store_true",
+        help="Map onto parent structures that are the same crystal in a different setting or supercell only once, reporting the costs under every name whose number of sites divides the child's",
+    )
+
+    mapper.add_argument(
+        "--keep-maps",
+        type=int,
+        default=1,
+        help="Number of lowest cost maps kept for each (configuration, parent) pair. Only the best one is used in the output, 0 keeps every valid map",
+    )
+
+    mapper.add_argument(
+        "--costs-only",
+        action="store_true",
+        help="Only keep the costs of each map, not its lattice and atom mappings",
+    )
+
+    mapper.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10.0,
+        help="Shortest time in seconds between two progress reports",
+    )
+
+    mapper.add_argument(
+        "--progress-file",
+        type=str,
+        default=None,
+        help="Also append every progress report as a json line to this file, e.g. to monitor batch jobs",
+    )
+
+    mapper.add_argument(
+        "--profile",
+        nargs="?",
+        type=str,
+        default=None,
+        const="default",
+        help="Record the wall time of each mapping phase and (configuration, parent) pair and print a summary. The pairs are written as csv to the given file, or to OUTFILE.profile.csv if none is given; a .json file also gets the phases and memory high-water mark",
+    )
+
+    mapper.add_argument(
+        "--cache",
+        nargs="?",
+        type=str,
+        default=None,
+        const="default",
+        help="Reuse mapping results of (configuration, parent) pairs from an on-disk cache. Uses $CASMAM_CACHE_DIR or ~/.cache/casmam/mappings if no directory is given",
+    )
+
+    mapper.add_argument(
+        "--cache-size",
+        type=float,
+        default=1024,
+        help="Size of the mapping cache in MiB above which least recently used results are evicted",
+    )
+
+    mapper.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="File to which results are written as soon as each configuration is mapped. Defaults to the output file name with .checkpoint appended, and is removed once the output file is written",
+    )
+
+    mapper.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the checkpoint file, only mapping configurations that are not in it yet",
+    )
+
+    mapper.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Only map shard i of N (i from 0 to N - 1) of the configurations, split so that every shard costs about the same. Combine the outputs with the merge command",
+    )
+
+    mapper.add_argument(
+        "--incremental",
+        type=str,
+        default=None,
+        help="Earlier mapping results (hdf5 file or .mapping columnar store) to update: only (configuration, parent) pairs that are not in it are mapped, matching parents by content. Configurations and parents no longer given are dropped",
+    )
+
+    mapper.add_argument(
+        "--server",
+        type=str,
+        default=None,
+        help="Unix socket of a running serve command to map on. Parents, jobs and mapping options are then those of the server, only --prefilter and --best-only apply",
+    )
+
+    mapper.add_argument(
+        "--snapshot",
+        type=str,
+        default=None,
+        help="Child structure snapshot written by the snapshot command to read configurations from. Configurations missing from it or changed since it was written are read from their files",
+    )
     # TODO: Add input settings to mapping arguments
     # TODO: Add input settings to orgainizing mapping results
 
+    # snapshot command
+    snapshotter = subparser.add_parser(
+        "snapshot",
+        help="Packs the structures of configurations of a casm project into a single binary file that map --snapshot reads instead of the individual files",
+    )
+
+    snapshotter.add_argument(
+        "--configurations",
+        "-c",
+        type=str,
+        required=True,
+        help="List of configurations in ccasm query json format",
+    )
+
+    snapshotter.add_argument(
+        "--select",
+        type=str,
+        default=None,
+        help="Only use configurations for which this column of the ccasm query is true, e.g. selected or is_calculated",
+    )
+
+    snapshotter.add_argument(
+        "--outfile",
+        "-o",
+        type=str,
+        required=True,
+        help="Snapshot file name. An existing snapshot is updated, only configurations that changed since are read",
+    )
+
+    snapshotter.add_argument(
+        "--configtype",
+        nargs="?",
+        type=str,
+        default="relaxed",
+        choices=["relaxed", "unrelaxed"],
+        help="What to read. If relaxed will read properties.calc.json, if unrelaxed will read structure.json",
+    )
+
+    snapshotter.add_argument(
+        "--calctype",
+        nargs="?",
+        type=str,
+        default="default",
+        help="calctype from where to read the properties",
+    )
+
+    snapshotter.add_argument(
+        "--threads",
+        type=int,
+        default=8,
+        help="Number of files read at once",
+    )
+
+    # serve command
+    server = subparser.add_parser(
+        "serve",
+        help="Keeps parent crystal structures loaded and maps configurations sent by map --server over a Unix socket",
+    )
+
+    server.add_argument(
+        "--socket",
+        "-s",
+        type=str,
+        required=True,
+        help="Path of the Unix socket to listen on",
+    )
+
+    server.add_argument(
+        "--parents",
+        "-p",
+        nargs="?",
+        type=str,
+        default="common",
+        choices=["all", "common"],
+        help="What parent structures to use",
+    )
+
+    server.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes that configurations of every request are distributed over",
+    )
+
+    server.add_argument(
+        "--pair-time-budget",
+        type=float,
+        default=None,
+        help="Seconds after which mapping a single (configuration, parent) pair is abandoned and recorded as timed out",
+    )
+
+    server.add_argument(
+        "--keep-maps",
+        type=int,
+        default=1,
+        help="Number of lowest cost maps kept for each (configuration, parent) pair, 0 keeps every valid map",
+    )
+
+    server.add_argument(
+        "--costs-only",
+        action="store_true",
+        help="Only keep the costs of each map, not its lattice and atom mappings",
+    )
+
+    server.add_argument(
+        "--cache",
+        nargs="?",
+        type=str,
+        default=None,
+        const="default",
+        help="Reuse mapping results of (configuration, parent) pairs from an on-disk cache shared by all requests. Uses $CASMAM_CACHE_DIR or ~/.cache/casmam/mappings if no directory is given",
+    )
+
+    server.add_argument(
+        "--cache-size",
+        type=float,
+        default=1024,
+        help="Size of the mapping cache in MiB above which least recently used results are evicted",
+    )
+
     # analyze command
     analyze = subparser.add_parser(
         "analyze",
@@ -75,7 +727,11 @@ def main():
 
     # TODO: what to do if it's html
     analyze.add_argument(
-        "--infile", "-i", type=str, required=True, help="Mapping results as hdf5 file"
+        "--infile",
+        "-i",
+        type=str,
+        required=True,
+        help="Mapping results as hdf5 file or .mapping columnar store",
     )
 
     # TODO: need a html argument?
@@ -83,43 +739,151 @@ def main():
         "--outfile", "-o", type=str, required=True, help="Output file name"
     )
 
+    analyze.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10000,
+        help="Number of configurations analyzed at once when reading a .mapping columnar store, which is read piece by piece rather than as a whole. hdf5 files written while mapping are analyzed one stored chunk (1000 configurations) at a time regardless, and hdf5 files written in one piece, e.g. by the merge command, as a whole",
+    )
+
+    # merge command
+    merge = subparser.add_parser(
+        "merge",
+        help="Merges the mapping results of the shards of a sharded map run",
+    )
+
+    merge.add_argument(
+        "--infiles",
+        "-i",
+        nargs="+",
+        type=str,
+        required=True,
+        help="Mapping results of every shard as hdf5 files or .mapping columnar stores",
+    )
+
+    merge.add_argument(
+        "--outfile", "-o", type=str, required=True, help="Output file name"
+    )
+
+    merge.add_argument(
+        "--configurations",
+        "-c",
+        type=str,
+        default=None,
+        help="List of configurations in ccasm query json format given to the shards. If given, rows are in this order and every configuration must be in some shard",
+    )
+
+    # benchmark command
+    benchmark = subparser.add_parser(
+        "benchmark",
+        help="Times the stages of a mapping run on synthetic configurations made from the bundled parent crystal structures",
+    )
+
+    benchmark.add_argument(
+        "--scales",
+        nargs="+",
+        type=int,
+        default=[10, 100],
+        help="Numbers of configurations to time the stages that depend on them at",
+    )
+
+    benchmark.add_argument(
+        "--parents",
+        "-p",
+        nargs="?",
+        type=str,
+        default="common",
+        choices=["all", "common"],
+        help="What parent structures to use",
+    )
+
+    benchmark.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of times each stage other than mapping is timed",
+    )
+
+    benchmark.add_argument(
+        "--max-mapped",
+        type=int,
+        default=10,
+        help="Largest number of configurations actually mapped, their results are reused at larger scales",
+    )
+
+    benchmark.add_argument(
+        "--seed", type=int, default=0, help="Seed of the synthetic configurations"
+    )
+
+    benchmark.add_argument(
+        "--outfile",
+        "-o",
+        type=str,
+        default=None,
+        help="Json file to write the results to",
+    )
+
+    benchmark.add_argument(
+        "--startup-only",
+        action="store_true",
+        help="Only time the startup of the command line interface and of imports",
+    )
+
+    benchmark.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Json file of earlier results to compare to. Exits with status 1 if a stage got slower by more than the tolerance",
+    )
+
+    benchmark.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative slowdown compared to the baseline above which a stage counts as a regression",
+    )
+
     args = parser.parse_args()
+    ignore_pytables_performance_warnings()
 
-    # read configurations
     if args.command == "map":
+        run_map(args)
 
-        with open(args.configurations, "r") as f:
-            configs = json.load(f)
+    if args.command == "snapshot":
+        make_snapshot(args)
 
-        config_names = [config["name"] for config in configs]
+    if args.command == "serve":
+        serve(args)
 
-        if args.configtype == "relaxed":
-            relaxed = True
-        if args.configtype == "unrelaxed":
-            relaxed = False
-        # construct child structures to be used in mapping
-        # get child properties paths
-        child_paths = casmam.mapping.mapping.get_properties_json_paths(
-            config_names, args.calctype, relaxed
-        )
-        mapping_results = (
-            casmam.mapping.mapping.map_configurations_onto_parent_structures(
-                child_paths, args.parents
+    if args.command == "benchmark":
+        run_benchmark(args)
+
+    if args.command == "merge":
+        config_names = None
+        if args.configurations is not None:
+            config_names = list(
+                casmam.mapping.mapping.iter_ccasm_query_config_names(
+                    args.configurations
+                )
             )
-        )
 
-        if ".html" in args.outfile:
-            mapping_results.to_html(args.outfile)
+        mapping_results = casmam.mapping.mapping.merge_mapping_results(
+            [read_mapping_results(infile) for infile in args.infiles], config_names
+        )
 
-        if ".hdf" in args.outfile:
-            mapping_results.to_hdf(args.outfile, key="mapping_results")
+        write_mapping_results(mapping_results, args.outfile)
 
     if args.command == "analyze":
-        mapping_results = pd.read_hdf(args.infile)
-        best_maps = casmam.mapping.mapping.analyze_mapping_data(mapping_results)
+        if os.path.isdir(args.infile):
+            best_maps = casmam.mapping.store.analyze_mapping_result_store(
+                casmam.mapping.store.MappingResultStore.load(args.infile),
+                chunk_size=args.chunk_size,
+            )
+        else:
+            best_maps = casmam.mapping.mapping.analyze_mapping_results_hdf(args.infile)
 
         best_maps.to_hdf(args.outfile, key="best_maps")
 
 
-if __name__ == "main":
+if __name__ == "__main__":
     main()
@@ -1,3 +1,7 @@
-from . import xtal
+import casmam._lazy as _lazy
 
 __all__ = ["xtal"]
+
+
+__getattr__ = _lazy.make_getattr(__name__, __all__)
+__dir__ = _lazy.make_dir(__name__, __all__)
@@ -1,3 +1,6 @@
+import json
+import hashlib
+import itertools
 import casm.xtal
 import numpy as np
 
@@ -35,6 +38,84 @@ def get_structure_info_from_properties_json(
     return casm_lattice, frac_coords, atom_types
 
 
+# the keys of properties.calc.json/structure.json that structures are read from
+structure_keys = ["lattice_vectors", "atom_coords", "coordinate_mode", "atom_type"]
+
+
+def get_structure_infos_from_properties_jsons(
+    properties_jsons: list[dict],
+) -> list[tuple[np.ndarray, np.ndarray, list[str]]]:
+    """Batched :func:`get_structure_info_from_properties_json`, returning
+    the plain arrays of :func:`get_structure_info_from_casm_structure`.
+    Cartesian coordinates of all structures are converted to fractional
+    ones at once
+
+    Parameters
+    ----------
+    properties_jsons : list[dict]
+        properties.calc.json/structure.json dictionaries, of which only
+        :data:`structure_keys` are used
+
+    Returns
+    -------
+    list[tuple[np.ndarray, np.ndarray, list[str]]]
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix,
+        fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+        and atom types at each site, of each structure
+
+    """
+    if len(properties_jsons) == 0:
+        return []
+
+    lattice_column_vector_matrices = np.transpose(
+        np.array(
+            [
+                properties_json["lattice_vectors"]
+                for properties_json in properties_jsons
+            ],
+            dtype=float,
+        ),
+        (0, 2, 1),
+    )
+    n_sites = np.array(
+        [len(properties_json["atom_type"]) for properties_json in properties_jsons]
+    )
+    coords = np.array(
+        [
+            coord
+            for properties_json in properties_jsons
+            for coord in properties_json["atom_coords"]
+        ],
+        dtype=float,
+    ).reshape(-1, 3)
+
+    # solve lattice @ frac = cart for the sites of cartesian structures
+    is_cartesian = np.repeat(
+        [
+            properties_json["coordinate_mode"] == "Cartesian"
+            for properties_json in properties_jsons
+        ],
+        n_sites,
+    )
+    structure_of_site = np.repeat(np.arange(len(properties_jsons)), n_sites)
+    coords[is_cartesian] = np.einsum(
+        "sij,sj->si",
+        np.linalg.inv(lattice_column_vector_matrices)[structure_of_site[is_cartesian]],
+        coords[is_cartesian],
+    )
+
+    frac_coords = np.split(coords, np.cumsum(n_sites)[:-1])
+
+    return [
+        (lattice_column_vector_matrix, structure_frac_coords.T.copy(), list(atom_types))
+        for lattice_column_vector_matrix, structure_frac_coords, atom_types in zip(
+            lattice_column_vector_matrices,
+            frac_coords,
+            (properties_json["atom_type"] for properties_json in properties_jsons),
+        )
+    ]
+
+
 def casm_structure_from_properties_json(properties_json: dict) -> casm.xtal.Structure:
     """Construct a casm ``Structure`` from properties.calc.json/structure.json dictionary
 
@@ -82,6 +163,114 @@ def casm_prim_from_properties_json(properties_json: dict) -> casm.xtal.Prim:
     return casm.xtal.Prim(casm_lattice, frac_coords, atom_dofs)
 
 
+def get_structure_info_from_casm_structure(
+    casm_structure: casm.xtal.Structure,
+) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Return the plain arrays describing a casm ``Structure``. Unlike the
+    ``Structure`` itself these can be pickled, e.g. to send them to
+    another process
+
+    Parameters
+    ----------
+    casm_structure : casm.xtal.Structure
+        casm ``Structure`` to decompose
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, list[str]]
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix, fractional
+        coordinates as a :math:`3 \\times \\mathbf{N}` matrix, atom types at
+        each site
+
+    """
+    return (
+        np.array(casm_structure.lattice().column_vector_matrix()),
+        np.array(casm_structure.atom_coordinate_frac()),
+        list(casm_structure.atom_type()),
+    )
+
+
+def casm_structure_from_structure_info(
+    lattice_column_vector_matrix: np.ndarray,
+    frac_coords: np.ndarray,
+    atom_types: list[str],
+) -> casm.xtal.Structure:
+    """Construct a casm ``Structure`` from the arrays returned by
+    :func:`get_structure_info_from_casm_structure`
+
+    Parameters
+    ----------
+    lattice_column_vector_matrix : np.ndarray
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix
+    frac_coords : np.ndarray
+        Fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+    atom_types : list[str]
+        Atom types at each site
+
+    Returns
+    -------
+    casm.xtal.Structure
+
+    """
+    return casm.xtal.Structure(
+        casm.xtal.Lattice(lattice_column_vector_matrix), frac_coords, atom_types
+    )
+
+
+def get_symop_arrays(
+    symops: list[casm.xtal.SymOp],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the plain arrays describing a list of casm ``SymOp``, e.g.
+    a factor group, so that it can be stored or sent to another process
+
+    Parameters
+    ----------
+    symops : list[casm.xtal.SymOp]
+        casm ``SymOp`` objects to decompose
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        Cartesian matrices as a :math:`\\mathbf{N} \\times 3 \\times 3`
+        array, Cartesian translations as a :math:`\\mathbf{N} \\times 3`
+        array and time reversal flags of every operation
+
+    """
+    return (
+        np.array([symop.matrix() for symop in symops], dtype=float).reshape(-1, 3, 3),
+        np.array([symop.translation() for symop in symops], dtype=float).reshape(-1, 3),
+        np.array([symop.time_reversal() for symop in symops], dtype=bool),
+    )
+
+
+def symops_from_symop_arrays(
+    matrices: np.ndarray, translations: np.ndarray, time_reversals: np.ndarray
+) -> list[casm.xtal.SymOp]:
+    """Construct casm ``SymOp`` objects from the arrays returned by
+    :func:`get_symop_arrays`
+
+    Parameters
+    ----------
+    matrices : np.ndarray
+        Cartesian matrices as a :math:`\\mathbf{N} \\times 3 \\times 3` array
+    translations : np.ndarray
+        Cartesian translations as a :math:`\\mathbf{N} \\times 3` array
+    time_reversals : np.ndarray
+        Time reversal flag of every operation
+
+    Returns
+    -------
+    list[casm.xtal.SymOp]
+
+    """
+    return [
+        casm.xtal.SymOp(matrix, translation, bool(time_reversal))
+        for matrix, translation, time_reversal in zip(
+            matrices, translations, time_reversals
+        )
+    ]
+
+
 def casm_structure_from_poscar(arg1):
     """TODO: Docstring for casm_structure_from_poscar.
     Need this function is casm.xtal.Structure
@@ -169,3 +358,415 @@ def change_dofs_in_casm_prim(
         )
 
     return casm.xtal.Prim(casm_prim.lattice(), casm_prim.coordinate_frac(), atom_dofs)
+
+
+def make_structure_content_hash(
+    lattice_column_vector_matrix: np.ndarray,
+    frac_coords: np.ndarray,
+    atom_types: list[str] | list[list[str]],
+) -> str:
+    """Hash of exactly the given lattice, coordinates and atom types, in
+    the given order. Unlike :func:`make_structure_fingerprint` nothing is
+    canonicalized, so structures with the same hash have the same
+    mapping results down to the order of sites. Also works for the
+    occupants of a ``Prim``
+
+    Parameters
+    ----------
+    lattice_column_vector_matrix : np.ndarray
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix
+    frac_coords : np.ndarray
+        Fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+    atom_types : list[str] | list[list[str]]
+        Atom types, or allowed occupants, at each site
+
+    Returns
+    -------
+    str
+        Hexadecimal hash
+
+    """
+    content_hash = hashlib.sha256()
+    content_hash.update(
+        np.ascontiguousarray(lattice_column_vector_matrix, dtype=float).tobytes()
+    )
+    content_hash.update(np.ascontiguousarray(frac_coords, dtype=float).tobytes())
+    content_hash.update(json.dumps(atom_types).encode())
+
+    return content_hash.hexdigest()
+
+
+def make_reduced_lattice(
+    lattice_column_vector_matrix: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a lattice by repeatedly subtracting integer multiples of
+    lattice vectors from each other until every vector is as short as
+    possible with respect to the others. Vectors are sorted by length
+    and the basis is kept right handed
+
+    Parameters
+    ----------
+    lattice_column_vector_matrix : np.ndarray
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Reduced lattice vectors as columns of a :math:`3 \\times 3` matrix,
+        and the unimodular integer matrix :math:`T` such that
+        ``reduced = lattice_column_vector_matrix @ T``
+
+    """
+    lattice = np.array(lattice_column_vector_matrix, dtype=float)
+    transformation = np.eye(3, dtype=int)
+
+    changed = True
+    while changed:
+        changed = False
+        for i, j in itertools.permutations(range(3), 2):
+            multiple = int(
+                np.round(
+                    np.dot(lattice[:, i], lattice[:, j])
+                    / np.dot(lattice[:, j], lattice[:, j])
+                )
+            )
+            if multiple != 0:
+                lattice[:, i] -= multiple * lattice[:, j]
+                transformation[:, i] -= multiple * transformation[:, j]
+                changed = True
+
+    order = np.argsort(np.linalg.norm(lattice, axis=0), kind="stable")
+    lattice = lattice[:, order]
+    transformation = transformation[:, order]
+    if np.linalg.det(transformation) < 0:
+        lattice[:, 2] *= -1
+        transformation[:, 2] *= -1
+
+    return lattice, transformation
+
+
+def get_pure_translations(
+    lattice_column_vector_matrix: np.ndarray,
+    frac_coords: np.ndarray,
+    atom_types: list[str],
+    tol: float = 1e-3,
+) -> np.ndarray:
+    """Fractional translations, other than lattice translations, that map
+    a structure onto itself. A structure has some if and only if its
+    lattice is not primitive
+
+    Parameters
+    ----------
+    lattice_column_vector_matrix : np.ndarray
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix
+    frac_coords : np.ndarray
+        Fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+    atom_types : list[str]
+        Atom types at each site
+    tol : float, optional
+        Largest distance between a translated site and the site it lands
+        on, relative to the cube root of the volume per site
+
+    Returns
+    -------
+    np.ndarray
+        Pure translations, including zero, as columns of a
+        :math:`3 \\times \\mathbf{M}` matrix
+
+    """
+    lattice = np.asarray(lattice_column_vector_matrix, dtype=float)
+    frac_coords = np.asarray(frac_coords, dtype=float)
+    atom_types = np.asarray(atom_types)
+    n_sites = len(atom_types)
+    max_distance = tol * (abs(np.linalg.det(lattice)) / n_sites) ** (1 / 3)
+    is_same_type = atom_types[:, np.newaxis] == atom_types[np.newaxis, :]
+
+    def is_pure_translation(translation, sites):
+        differences = (
+            frac_coords[:, sites, np.newaxis]
+            + translation[:, np.newaxis, np.newaxis]
+            - frac_coords[:, np.newaxis, :]
+        )
+        differences -= np.round(differences)
+        distances = np.linalg.norm(np.tensordot(lattice, differences, axes=1), axis=0)
+        return np.all(np.any((distances < max_distance) & is_same_type[sites], axis=1))
+
+    # a pure translation takes the first site onto a site of the same
+    # type. Most candidates already fail for a few sites spread over the
+    # structure
+    first_sites = np.unique(np.linspace(0, n_sites - 1, 8).astype(int))
+    translations = []
+    for site in np.nonzero(atom_types == atom_types[0])[0]:
+        translation = frac_coords[:, site] - frac_coords[:, 0]
+        if is_pure_translation(translation, first_sites) and is_pure_translation(
+            translation, slice(None)
+        ):
+            translations.append(translation - np.round(translation))
+
+    return np.array(translations).T
+
+
+def make_primitive_structure_info(
+    lattice_column_vector_matrix: np.ndarray,
+    frac_coords: np.ndarray,
+    atom_types: list[str],
+    tol: float = 1e-3,
+) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Find a primitive cell of a structure, i.e. the smallest cell that
+    repeats to the given structure
+
+    Parameters
+    ----------
+    lattice_column_vector_matrix : np.ndarray
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix
+    frac_coords : np.ndarray
+        Fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+    atom_types : list[str]
+        Atom types at each site
+    tol : float, optional
+        Tolerance of :func:`get_pure_translations`
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, list[str]]
+        Lattice, fractional coordinates and atom types of the primitive
+        cell, or of the given structure if it is primitive already
+
+    """
+    lattice = np.asarray(lattice_column_vector_matrix, dtype=float)
+    frac_coords = np.asarray(frac_coords, dtype=float)
+    translations = get_pure_translations(lattice, frac_coords, atom_types, tol)
+    n_cells = translations.shape[1]
+    if n_cells == 1:
+        return lattice, frac_coords, list(atom_types)
+
+    # in three dimensions the shortest, second shortest non parallel and
+    # third shortest non coplanar translations generate every translation
+    primitive_volume = abs(np.linalg.det(lattice)) / n_cells
+    min_length = tol * primitive_volume ** (1 / 3)
+    shifts = np.array(list(itertools.product([-1, 0, 1], repeat=3))).T
+    vectors = lattice @ (
+        translations[:, :, np.newaxis] + shifts[:, np.newaxis, :]
+    ).reshape(3, -1)
+    vectors = vectors[:, np.argsort(np.linalg.norm(vectors, axis=0), kind="stable")]
+
+    basis = []
+    for vector in vectors.T:
+        candidate_basis = np.array(basis + [vector]).T
+        singular_values = np.linalg.svd(candidate_basis, compute_uv=False)
+        if singular_values[-1] > min_length:
+            basis.append(vector)
+        if len(basis) == 3:
+            break
+
+    primitive_lattice = np.array(basis).T
+    volume = np.linalg.det(primitive_lattice) if len(basis) == 3 else 0.0
+    if abs(abs(volume) - primitive_volume) > tol * primitive_volume:
+        return lattice, frac_coords, list(atom_types)
+
+    primitive_lattice[:, 2] *= np.sign(volume)
+
+    primitive_frac_coords = np.linalg.solve(primitive_lattice, lattice @ frac_coords)
+    primitive_frac_coords %= 1.0
+
+    # keep one of the sites that the pure translations make equivalent
+    kept_sites = []
+    for site in range(len(atom_types)):
+        differences = (
+            primitive_frac_coords[:, kept_sites] - primitive_frac_coords[:, [site]]
+        )
+        differences -= np.round(differences)
+        distances = np.linalg.norm(primitive_lattice @ differences, axis=0)
+        if not np.any(distances < tol * primitive_volume ** (1 / 3)):
+            kept_sites.append(site)
+
+    return (
+        primitive_lattice,
+        primitive_frac_coords[:, kept_sites],
+        [atom_types[site] for site in kept_sites],
+    )
+
+
+def get_reduced_basis_changes(
+    reduced_lattice_column_vector_matrix: np.ndarray, tol: float = 1e-5
+) -> list[np.ndarray]:
+    """Every change of basis from a reduced lattice (see
+    :func:`make_reduced_lattice`) to a right handed basis that is just
+    as reduced. Those bases are made of combinations of the reduced
+    vectors with coefficients -1, 0 or 1 that are as long as them
+
+    Parameters
+    ----------
+    reduced_lattice_column_vector_matrix : np.ndarray
+        Reduced lattice vectors as columns of a :math:`3 \\times 3` matrix
+    tol : float, optional
+        Relative tolerance on the lengths of lattice vectors
+
+    Returns
+    -------
+    list[np.ndarray]
+        Unimodular integer matrices :math:`C` such that
+        ``reduced_lattice_column_vector_matrix @ C`` is reduced
+
+    """
+    lattice = np.asarray(reduced_lattice_column_vector_matrix, dtype=float)
+    reduced_lengths = np.linalg.norm(lattice, axis=0)
+    combinations = np.array(list(itertools.product([-1, 0, 1], repeat=3))).T
+    combination_lengths = np.linalg.norm(lattice @ combinations, axis=0)
+    combinations_of_length = [
+        combinations[:, np.abs(combination_lengths - length) < tol * length].T
+        for length in reduced_lengths
+    ]
+
+    basis_changes = []
+    for columns in itertools.product(*combinations_of_length):
+        basis_change = np.array(columns).T
+        if round(np.linalg.det(basis_change)) == 1:
+            basis_changes.append(basis_change)
+
+    return basis_changes
+
+
+def are_equivalent_structures(
+    structure_info: tuple[np.ndarray, np.ndarray, list[str]],
+    other_structure_info: tuple[np.ndarray, np.ndarray, list[str]],
+    tol: float = 1e-3,
+) -> bool:
+    """Check if two structures are the same up to a rigid rotation, the
+    choice of lattice vectors, a rigid translation and the order of
+    sites. Unlike comparing :func:`make_structure_fingerprint`, this is
+    not sensitive to coordinates that lie close to a rounding boundary,
+    but structures are not made primitive first
+
+    Parameters
+    ----------
+    structure_info : tuple[np.ndarray, np.ndarray, list[str]]
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix,
+        fractional coordinates as a :math:`3 \\times \\mathbf{N}`
+        matrix and atom types at each site
+    other_structure_info : tuple[np.ndarray, np.ndarray, list[str]]
+        The same for the other structure
+    tol : float, optional
+        Tolerance on distances and lattice vector lengths, relative to
+        the cube root of the volume per site
+
+    Returns
+    -------
+    bool
+
+    """
+    lattice, transformation = make_reduced_lattice(structure_info[0])
+    frac_coords = np.linalg.solve(transformation, np.asarray(structure_info[1]))
+    atom_types = np.asarray(structure_info[2])
+    other_lattice, other_transformation = make_reduced_lattice(other_structure_info[0])
+    other_frac_coords = np.linalg.solve(
+        other_transformation, np.asarray(other_structure_info[1])
+    )
+    other_atom_types = np.asarray(other_structure_info[2])
+
+    if sorted(atom_types) != sorted(other_atom_types):
+        return False
+
+    length_scale = (abs(np.linalg.det(lattice)) / len(atom_types)) ** (1 / 3)
+    metric = lattice.T @ lattice
+    is_same_type = atom_types[:, np.newaxis] == other_atom_types[np.newaxis, :]
+
+    for basis_change in get_reduced_basis_changes(other_lattice, tol):
+        other_metric = basis_change.T @ other_lattice.T @ other_lattice @ basis_change
+        if np.max(np.abs(other_metric - metric)) > tol * length_scale**2:
+            continue
+
+        # the lattices are the same up to a rotation, compare sites in
+        # the frame of the first structure
+        candidate_coords = np.linalg.solve(basis_change, other_frac_coords)
+        for origin in np.nonzero(other_atom_types == atom_types[0])[0]:
+            differences = (
+                frac_coords[:, :, np.newaxis]
+                - frac_coords[:, [0], np.newaxis]
+                + candidate_coords[:, np.newaxis, [origin]]
+                - candidate_coords[:, np.newaxis, :]
+            )
+            differences -= np.round(differences)
+            distances = np.linalg.norm(
+                np.tensordot(lattice, differences, axes=1), axis=0
+            )
+            if np.all(np.any((distances < tol * length_scale) & is_same_type, axis=1)):
+                return True
+
+    return False
+
+
+def make_structure_fingerprint(
+    lattice_column_vector_matrix: np.ndarray,
+    frac_coords: np.ndarray,
+    atom_types: list[str],
+    tol: float = 1e-5,
+) -> str:
+    """Hash of a structure that is the same for structures that only
+    differ by a rigid rotation, the choice of lattice vectors among
+    equivalent reduced ones, a rigid translation or the order of sites.
+    Equivalent structures may still get different fingerprints, e.g. if
+    a coordinate lies on a rounding boundary, but structures with the
+    same fingerprint are identical up to ``tol``
+
+    Parameters
+    ----------
+    lattice_column_vector_matrix : np.ndarray
+        Lattice vectors as columns of a :math:`3 \\times 3` matrix
+    frac_coords : np.ndarray
+        Fractional coordinates as a :math:`3 \\times \\mathbf{N}` matrix
+    atom_types : list[str]
+        Atom types at each site
+    tol : float, optional
+        Resolution of fractional coordinates, and relative resolution of
+        the lattice
+
+    Returns
+    -------
+    str
+        Hexadecimal fingerprint
+
+    """
+    lattice, transformation = make_reduced_lattice(lattice_column_vector_matrix)
+    frac_coords = np.linalg.solve(transformation, np.asarray(frac_coords))
+    type_names = sorted(set(atom_types))
+    type_indices = np.array([type_names.index(name) for name in atom_types])
+
+    length_scale = (abs(np.linalg.det(lattice)) / len(atom_types)) ** (1 / 3)
+    frac_resolution = int(round(1 / tol))
+
+    # only the reduced bases that give the smallest metric tensor are
+    # candidates
+    candidates = []
+    for basis_change in get_reduced_basis_changes(lattice, tol):
+        metric = basis_change.T @ lattice.T @ lattice @ basis_change
+        metric_key = tuple(
+            np.round(metric.ravel() / length_scale**2 / tol).astype(int)
+        )
+        candidates.append((metric_key, basis_change))
+
+    metric_key = min(candidate[0] for candidate in candidates)
+
+    coords_key = None
+    for candidate_metric_key, basis_change in candidates:
+        if candidate_metric_key != metric_key:
+            continue
+
+        candidate_coords = np.linalg.solve(basis_change, frac_coords)
+        # translate every site to the origin in turn
+        for origin in range(candidate_coords.shape[1]):
+            shifted = candidate_coords - candidate_coords[:, [origin]]
+            quantized = np.round(shifted * frac_resolution).astype(int)
+            quantized %= frac_resolution
+            rows = np.vstack([type_indices, quantized])
+            rows = rows[:, np.lexsort(rows[::-1])]
+            key = rows.T.tobytes()
+            if coords_key is None or key < coords_key:
+                coords_key = key
+
+    volume_key = int(np.round(np.log(length_scale) / tol))
+    fingerprint = hashlib.sha256()
+    fingerprint.update(repr((type_names, volume_key, metric_key)).encode())
+    fingerprint.update(coords_key)
+
+    return fingerprint.hexdigest()
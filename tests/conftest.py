@@ -0,0 +1,60 @@
+import os
+import pytest
+import numpy as np
+
+input_files_dir = os.path.join(os.path.dirname(__file__), "input_files")
+
+
+@pytest.fixture
+def parent_poscar_path():
+    return os.path.join(input_files_dir, "Li9Al4_primitive.vasp")
+
+
+@pytest.fixture
+def child_structure_path():
+    return os.path.join(input_files_dir, "structure.json")
+
+
+@pytest.fixture
+def parent_library(parent_poscar_path):
+    pytest.importorskip("casm.xtal")
+    import casmam.mapping.parents as casmamparents
+
+    return casmamparents.ParentLibrary.from_poscars([parent_poscar_path])
+
+
+@pytest.fixture
+def random_mapping_results():
+    """Mapping results of 7 children onto 4 parents, with ties in total
+    cost, pairs without a map and a child without any"""
+    pytest.importorskip("casm.xtal")
+    import casmam.mapping.mapping as casmammapping
+
+    rng = np.random.default_rng(0)
+    mapping_results = []
+    for child_index in range(7):
+        child_path = (
+            "training_data/SCEL2_1_2_1_0_0_0/" + str(child_index) + "/structure.json"
+        )
+        n_sites = 2 * (child_index % 2 + 1)
+        mapping_results_for_one_child = []
+        for parent_index in range(4):
+            result = casmammapping.MappingResult.dummy(
+                "parents/parent_" + str(parent_index) + ".vasp", child_path
+            )
+            if child_index != 0 and rng.random() > 0.25:
+                result.total_cost = float(rng.integers(1, 4)) / 10
+                result.atomic_cost = result.total_cost / 4
+                result.lattice_cost = 3 * result.total_cost / 4
+                result.deformation_gradient = rng.normal(size=(3, 3))
+                result.transformation_matrix_to_super = rng.integers(-2, 3, (3, 3))
+                result.reorientation = rng.normal(size=(3, 3))
+                result.isometry = rng.normal(size=(3, 3))
+                result.left_stretch = rng.normal(size=(3, 3))
+                result.translation = rng.normal(size=3)
+                result.displacement = rng.normal(size=(3, n_sites))
+                result.permutation = rng.permutation(n_sites).astype(np.int32)
+            mapping_results_for_one_child.append([result])
+        mapping_results.append(mapping_results_for_one_child)
+
+    return mapping_results
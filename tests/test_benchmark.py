@@ -0,0 +1,98 @@
+import os
+import copy
+import importlib.util
+import pytest
+import casmam.mapping.benchmark as casmambenchmark
+
+input_files_dir = os.path.join(os.path.dirname(__file__), "input_files")
+
+
+def test_startup_benchmark_round_trip(tmp_path, monkeypatch):
+    # the startup stages run in fresh interpreters, which need to find casmam
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.setenv(
+        "PYTHONPATH", os.pathsep.join([repo_dir, os.environ.get("PYTHONPATH", "")])
+    )
+    if importlib.util.find_spec("casm") is None:
+        monkeypatch.delitem(casmambenchmark.startup_commands, "import_mapping")
+
+    results = casmambenchmark.run_benchmarks(n_repeats=1, startup_only=True)
+
+    assert [record["name"] for record in results["records"]] == list(
+        casmambenchmark.startup_commands
+    )
+    assert all(len(record["seconds"]) == 1 for record in results["records"])
+
+    path = str(tmp_path / "benchmark.json")
+    casmambenchmark.write_benchmark_results(results, path)
+    read_results = casmambenchmark.read_benchmark_results(path)
+    assert read_results == results
+
+    comparison = casmambenchmark.compare_benchmark_results(read_results, results)
+    assert list(comparison["ratio"]) == [1.0] * len(results["records"])
+    assert not comparison["regression"].any()
+
+    slower_results = copy.deepcopy(results)
+    for record in slower_results["records"]:
+        record["seconds"] = [2 * seconds for seconds in record["seconds"]]
+    comparison = casmambenchmark.compare_benchmark_results(results, slower_results)
+    assert comparison["regression"].all()
+
+
+# benchmarks of the hot paths on the bundled inputs, whose best time of
+# a few repeats is recorded as the "seconds" property of each test, e.g.
+# in the junit xml of ``pytest --junitxml``
+
+
+def test_benchmark_parent_library_construction(record_property):
+    pytest.importorskip("casm.xtal")
+    import casmam.mapping.mapping as casmammapping
+    import casmam.mapping.parents as casmamparents
+
+    parent_paths = casmammapping.get_parent_library_paths("common")
+
+    seconds = casmambenchmark.time_function(
+        casmamparents.ParentLibrary.from_poscars, parent_paths
+    )
+
+    record_property("seconds", min(seconds))
+    assert len(casmamparents.ParentLibrary.from_poscars(parent_paths)) == len(
+        parent_paths
+    )
+
+
+def test_benchmark_pair_mapping(record_property):
+    pytest.importorskip("casm.xtal")
+    import casmam.mapping.mapping as casmammapping
+
+    parent_library = casmammapping.make_parent_library("common")
+    child_paths = [
+        os.path.join(input_files_dir, name)
+        for name in ["structure.json", "properties.calc.json"]
+    ]
+    child_structures = casmammapping.mask_child_structure_atom_types(
+        casmammapping.get_child_structures(child_paths)
+    )
+
+    seconds = casmambenchmark.time_function(
+        casmambenchmark.map_every_pair, parent_library, child_structures, child_paths
+    )
+
+    record_property("seconds", min(seconds))
+    mapping_results = casmambenchmark.map_every_pair(
+        parent_library, child_structures, child_paths
+    )
+    assert [len(results) for results in mapping_results] == [len(parent_library)] * 2
+
+
+def test_benchmark_analyze(random_mapping_results, record_property):
+    import casmam.mapping.mapping as casmammapping
+
+    mapping_data = casmammapping.organize_mapping_results(random_mapping_results)
+
+    seconds = casmambenchmark.time_function(
+        casmammapping.analyze_mapping_data, mapping_data
+    )
+
+    record_property("seconds", min(seconds))
+    assert len(casmammapping.analyze_mapping_data(mapping_data)) == len(mapping_data)
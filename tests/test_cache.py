@@ -0,0 +1,14 @@
+import casmam.mapping.cache as casmamcache
+
+
+def test_mapping_cache_put_replaces_size_of_existing_entry(tmp_path):
+    cache = casmamcache.MappingCache(str(tmp_path / "cache"))
+    key = cache.make_key("child", "parent", {})
+
+    cache.put(key, list(range(1000)))
+    cache.put(key, list(range(10)))
+    cache.put(key, list(range(10)))
+
+    assert cache.size == sum(entry[2] for entry in cache.entries())
+    assert cache.writes == 3
+    assert cache.get(key) == list(range(10))
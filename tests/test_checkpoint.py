@@ -0,0 +1,57 @@
+import os
+import pytest
+import casmam.mapping.checkpoint as casmamcheckpoint
+
+
+def make_results(child_index):
+    return [[("result", child_index, parent_index)] for parent_index in range(3)]
+
+
+def test_resume_reads_results_back_from_file(tmp_path):
+    path = tmp_path / "run.checkpoint"
+    checkpoint = casmamcheckpoint.MappingCheckpoint(path, {"parents": ["a"]})
+    for child_index in range(5):
+        checkpoint.append("child" + str(child_index), make_results(child_index))
+
+    resumed = casmamcheckpoint.MappingCheckpoint(path, {"parents": ["a"]}, resume=True)
+
+    # only the paths and positions of the records are kept
+    assert set(resumed.completed) == {"child" + str(i) for i in range(5)}
+    assert all(isinstance(offset, int) for offset in resumed.record_offsets.values())
+    assert list(resumed.load_results(["child3", "child0", "child3"])) == [
+        make_results(3),
+        make_results(0),
+        make_results(3),
+    ]
+
+
+def test_resume_drops_partial_record(tmp_path):
+    path = tmp_path / "run.checkpoint"
+    checkpoint = casmamcheckpoint.MappingCheckpoint(path, {})
+    checkpoint.append("child0", make_results(0))
+    checkpoint.append("child1", make_results(1))
+
+    # the run died while writing the results of child1
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    resumed = casmamcheckpoint.MappingCheckpoint(path, {}, resume=True)
+    assert set(resumed.completed) == {"child0"}
+
+    resumed.append("child1", make_results(1))
+    assert list(resumed.load_results(["child0", "child1"])) == [
+        make_results(0),
+        make_results(1),
+    ]
+    assert set(casmamcheckpoint.MappingCheckpoint(path, {}, resume=True).completed) == {
+        "child0",
+        "child1",
+    }
+
+
+def test_resume_of_other_run_fails(tmp_path):
+    path = tmp_path / "run.checkpoint"
+    casmamcheckpoint.MappingCheckpoint(path, {"prefilter": "safe"})
+
+    with pytest.raises(RuntimeError):
+        casmamcheckpoint.MappingCheckpoint(path, {"prefilter": "none"}, resume=True)
@@ -0,0 +1,24 @@
+import os
+import sys
+import subprocess
+import pytest
+import casmam
+
+
+def test_submodules_are_imported_on_first_use():
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import sys, casmam, casmam.mapping; "
+        + "assert 'numpy' not in sys.modules; "
+        + "casmam.mapping.prefilter; "
+        + "assert 'numpy' in sys.modules"
+    )
+
+    subprocess.run([sys.executable, "-c", code], cwd=repo_dir, check=True)
+
+
+def test_lazy_package_attributes():
+    assert {"xtal", "mapping", "xtallib", "scripts"} <= set(dir(casmam))
+    assert casmam.mapping.prefilter.__name__ == "casmam.mapping.prefilter"
+    with pytest.raises(AttributeError):
+        casmam.not_a_submodule
@@ -0,0 +1,362 @@
+import gc
+import json
+import shutil
+import pytest
+import numpy as np
+import pandas as pd
+
+pytest.importorskip("casm.xtal")
+
+import casmam.mapping.checkpoint as casmamcheckpoint  # noqa: E402
+import casmam.mapping.mapping as casmammapping  # noqa: E402
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_best_only_child_without_mappable_parent(
+    parent_library, child_structure_path, n_workers
+):
+    # one site cannot map onto the 13 sites of Li9Al4, so no pair is mapped
+    child_structures = casmammapping.mask_child_structure_atom_types(
+        casmammapping.get_child_structures([child_structure_path] * 2)
+    )
+
+    mapping_results = casmammapping.map_child_structures_onto_parent_structures(
+        parent_library,
+        child_structures,
+        child_paths=["first", "second"],
+        n_workers=n_workers,
+        best_only=True,
+    )
+
+    for child_path, mapping_results_for_one_child in zip(
+        ["first", "second"], mapping_results
+    ):
+        assert len(mapping_results_for_one_child) == len(parent_library)
+        for results in mapping_results_for_one_child:
+            assert results[0].is_dummy()
+            assert results[0].child_path == child_path
+
+
+def count_mapping_results():
+    gc.collect()
+    return sum(isinstance(obj, casmammapping.MappingResult) for obj in gc.get_objects())
+
+
+@pytest.mark.parametrize("resume", [False, True])
+def test_iter_mappings_does_not_retain_results(
+    parent_library, child_structure_path, tmp_path, resume
+):
+    child_paths = []
+    for child_index in range(40):
+        child_paths.append(str(tmp_path / ("structure" + str(child_index) + ".json")))
+        shutil.copy(child_structure_path, child_paths[-1])
+    checkpoint_path = tmp_path / "run.checkpoint"
+    if resume:
+        # every child is read back from the checkpoint
+        for _ in casmammapping.iter_mappings(
+            child_paths,
+            parent_library,
+            checkpoint=casmamcheckpoint.MappingCheckpoint(checkpoint_path, {}),
+        ):
+            pass
+
+    checkpoint = casmamcheckpoint.MappingCheckpoint(checkpoint_path, {}, resume)
+    n_before = count_mapping_results()
+    n_retained = []
+    for _, mapping_results_for_one_child in casmammapping.iter_mappings(
+        child_paths, parent_library, checkpoint=checkpoint
+    ):
+        del mapping_results_for_one_child
+        n_retained.append(count_mapping_results() - n_before)
+
+    # at most the children in flight are in memory, however many are done
+    assert max(n_retained) <= 2 * len(parent_library)
+    assert set(checkpoint.completed) == set(child_paths)
+
+
+def make_mapping_result(total_cost, child_path="original"):
+    result = casmammapping.MappingResult.dummy("parent", child_path)
+    result.atomic_cost = total_cost / 2
+    result.lattice_cost = total_cost / 2
+    result.total_cost = total_cost
+    result.deformation_gradient = np.eye(3)
+    result.permutation = np.array([1, 0], dtype=np.int32)
+    result.displacement = np.zeros((3, 2))
+
+    return result
+
+
+def test_copy_mapping_results_for_child_copies_only_costs():
+    mapping_results = [
+        [make_mapping_result(0.1), make_mapping_result(0.2)],
+        [casmammapping.MappingResult.dummy("other parent", "original")],
+    ]
+
+    copied = casmammapping.copy_mapping_results_for_child(mapping_results, "copy")
+
+    for results, copied_results in zip(mapping_results, copied):
+        for result, copied_result in zip(results, copied_results):
+            assert copied_result.child_path == "copy"
+            assert copied_result.parent_path == result.parent_path
+            assert copied_result.total_cost == result.total_cost or (
+                result.is_dummy() and copied_result.is_dummy()
+            )
+            assert not copied_result.has_mappings()
+    assert mapping_results[0][0].child_path == "original"
+
+    kept = casmammapping.copy_mapping_results_for_child(
+        mapping_results, "copy", keep_mappings=True
+    )
+    assert kept[0][0].has_mappings()
+    assert np.array_equal(kept[0][0].permutation, [1, 0])
+
+
+def test_are_identical_structure_infos():
+    lattice = np.eye(3)
+    frac_coords = np.array([[0.0, 0.5], [0.0, 0.5], [0.0, 0.5]])
+    structure_info = (lattice, frac_coords, ["A", "A"])
+
+    assert casmammapping.are_identical_structure_infos(
+        structure_info, (lattice.copy(), frac_coords.copy(), ["A", "A"])
+    )
+    # the same crystal with its sites in another order
+    assert not casmammapping.are_identical_structure_infos(
+        structure_info, (lattice, frac_coords[:, ::-1], ["A", "A"])
+    )
+
+
+def test_copy_mapping_results_for_parent_aliases_keeps_mappings_of_identical():
+    mapping_results = [[make_mapping_result(0.1)]]
+
+    expanded = casmammapping.copy_mapping_results_for_parent_aliases(
+        mapping_results,
+        [[1, 0, 2]],
+        ["parent 0", "parent 1", "parent 2"],
+        ["other setting", "hash", "hash"],
+    )
+
+    assert [results[0].parent_path for results in expanded] == [
+        "parent 0",
+        "parent",
+        "parent 2",
+    ]
+    assert all(results[0].total_cost == 0.1 for results in expanded)
+    # another setting of the representative gets only its costs
+    assert not expanded[0][0].has_mappings()
+    assert expanded[2][0].has_mappings()
+
+
+def test_copy_mapping_results_for_parent_aliases_checks_divisibility():
+    mapping_results = [[make_mapping_result(0.1)]]
+
+    expanded = casmammapping.copy_mapping_results_for_parent_aliases(
+        mapping_results,
+        [[0, 1, 2]],
+        ["parent", "parent 1", "parent 2"],
+        parent_n_sites=[2, 4, 6],
+        child_n_sites=4,
+    )
+
+    assert [results[0].parent_path for results in expanded] == [
+        "parent",
+        "parent 1",
+        "parent 2",
+    ]
+    assert expanded[1][0].total_cost == 0.1
+    # a supercell that does not divide the child cannot be mapped onto
+    assert expanded[2][0].is_dummy()
+    assert expanded[2][0].child_path == "original"
+
+
+@pytest.mark.filterwarnings("ignore::pandas.errors.PerformanceWarning")
+def test_find_reusable_parents_uses_saved_content_hashes(parent_library, tmp_path):
+    mapping_results_table = casmammapping.organize_mapping_results(
+        [
+            [
+                [
+                    make_mapping_result(
+                        0.1, "training_data/SCEL1_1_1_1_0_0_0/0/structure.json"
+                    )
+                ]
+            ]
+        ]
+    )
+    assert casmammapping.find_reusable_parents(
+        mapping_results_table, parent_library
+    ) == [None]
+
+    mapping_results_table.attrs["parent_content_hashes"] = {"parent": "edited"}
+    assert casmammapping.find_reusable_parents(
+        mapping_results_table, parent_library
+    ) == [None]
+
+    mapping_results_table.attrs["parent_content_hashes"] = {
+        "parent": parent_library.content_hashes[0]
+    }
+    mapping_options = casmammapping.make_configuration_mapping_options()
+    mapping_results_table.attrs["mapping_options"] = mapping_options
+    hdf_path = str(tmp_path / "mapping_results.hdf")
+    casmammapping.write_mapping_results_hdf(mapping_results_table, hdf_path)
+    read_table = casmammapping.read_mapping_results_hdf(hdf_path)
+    assert read_table.attrs["mapping_options"] == mapping_options
+    assert casmammapping.find_reusable_parents(
+        read_table, parent_library, mapping_options
+    ) == ["parent"]
+    # results mapped with other options are not reused
+    assert casmammapping.find_reusable_parents(
+        read_table,
+        parent_library,
+        casmammapping.make_configuration_mapping_options(costs_only=True),
+    ) == [None]
+
+
+def test_copy_parent_columns_sets_new_parent_path():
+    mapping_results_table = casmammapping.organize_mapping_results(
+        [
+            [
+                [
+                    make_mapping_result(
+                        0.1, "training_data/SCEL1_1_1_1_0_0_0/0/structure.json"
+                    )
+                ]
+            ]
+        ]
+    )
+
+    parent_columns = casmammapping.copy_parent_columns(
+        mapping_results_table, "parent", "moved", "elsewhere/moved"
+    )
+
+    assert list(parent_columns.columns.get_level_values(0).unique()) == ["moved"]
+    assert parent_columns.iloc[0][("moved", "total_cost")] == 0.1
+    result = parent_columns.iloc[0][("moved", "mapping_results")]
+    assert result.parent_path == "elsewhere/moved"
+    # the table itself is unchanged
+    assert mapping_results_table.iloc[0][("parent", "mapping_results")].parent_path == (
+        "parent"
+    )
+
+
+def test_analyze_mapping_data_matches_find_best_map_and_flag_conflicts(
+    random_mapping_results,
+):
+    mapping_data = casmammapping.organize_mapping_results(random_mapping_results)
+
+    analysis = casmammapping.analyze_mapping_data(mapping_data)
+
+    for config_name, row in analysis.iterrows():
+        results = list(mapping_data.loc[config_name, (slice(None), "mapping_results")])
+        if all(result.is_dummy() for result in results):
+            assert row["Best parent mapping object"] is None
+            assert row["Best parent map name"] is None
+            assert row["Conflicting maps"] is None
+            continue
+
+        best_map, conflicting_maps = casmammapping.find_best_map_and_flag_conflicts(
+            results
+        )
+        assert row["Best parent mapping object"] is best_map
+        assert row["Best parent map name"] == best_map.parent_path
+        if conflicting_maps is None:
+            assert row["Conflicting maps"] is None
+        else:
+            assert len(row["Conflicting maps"]) == len(conflicting_maps)
+            assert all(
+                a is b for a, b in zip(row["Conflicting maps"], conflicting_maps)
+            )
+    # the fixture has ties, so conflicts are compared too
+    assert analysis["Conflicting maps"].notna().any()
+
+
+@pytest.mark.filterwarnings("ignore::pandas.errors.PerformanceWarning")
+def test_mapping_result_hdf_writer_round_trip(random_mapping_results, tmp_path):
+    hdf_path = str(tmp_path / "mapping_results.hdf")
+    parent_content_hashes = {"parent_0.vasp": "hash"}
+
+    with casmammapping.MappingResultHDFWriter(
+        hdf_path, chunk_size=3, parent_content_hashes=parent_content_hashes
+    ) as writer:
+        for mapping_results_for_one_child in random_mapping_results:
+            writer.append(mapping_results_for_one_child)
+    assert writer.n_chunks == 3
+
+    mapping_data = casmammapping.read_mapping_results_hdf(hdf_path)
+    expected_mapping_data = casmammapping.organize_mapping_results(
+        random_mapping_results
+    )
+    cost_columns = [key for key in expected_mapping_data if "cost" in key[1]]
+    pd.testing.assert_frame_equal(
+        mapping_data[cost_columns], expected_mapping_data[cost_columns]
+    )
+    assert mapping_data.attrs["parent_content_hashes"] == parent_content_hashes
+    result = mapping_data.iloc[-1][("parent_3.vasp", "mapping_results")]
+    expected_result = random_mapping_results[-1][3][0]
+    assert result.total_cost == expected_result.total_cost or (
+        result.is_dummy() and expected_result.is_dummy()
+    )
+
+
+@pytest.mark.filterwarnings("ignore::pandas.errors.PerformanceWarning")
+def test_analyze_mapping_results_hdf_by_chunk(random_mapping_results, tmp_path):
+    hdf_path = str(tmp_path / "mapping_results.hdf")
+    with casmammapping.MappingResultHDFWriter(hdf_path, chunk_size=3) as writer:
+        for mapping_results_for_one_child in random_mapping_results:
+            writer.append(mapping_results_for_one_child)
+
+    assert len(list(casmammapping.iter_mapping_results_hdf(hdf_path))) == 3
+    analysis = casmammapping.analyze_mapping_results_hdf(hdf_path)
+
+    expected_analysis = casmammapping.analyze_mapping_data(
+        casmammapping.organize_mapping_results(random_mapping_results)
+    )
+    assert list(analysis.index) == list(expected_analysis.index)
+    assert list(analysis["Best parent map name"]) == list(
+        expected_analysis["Best parent map name"]
+    )
+    assert [
+        None if maps is None else [result.parent_path for result in maps]
+        for maps in analysis["Conflicting maps"]
+    ] == [
+        None if maps is None else [result.parent_path for result in maps]
+        for maps in expected_analysis["Conflicting maps"]
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 2**20])
+def test_iter_ccasm_query_configurations(tmp_path, chunk_size):
+    path = str(tmp_path / "configs.json")
+
+    def iter_names(text, select=None):
+        with open(path, "w") as f:
+            f.write(text)
+        return [
+            configuration["name"]
+            for configuration in casmammapping.iter_ccasm_query_configurations(
+                path, select, chunk_size
+            )
+        ]
+
+    text = '[{"name": "a", "selected": true},\n {"name": "b", "selected": false}]\n'
+    assert iter_names(text) == ["a", "b"]
+    assert iter_names(text, "selected") == ["a"]
+    assert iter_names(" [ ] ") == []
+    # values cut off by the end of a chunk anywhere
+    text = '[{"name": "\\u00e9\\n", "n": -1.5e+3, "x": null, "selected": true}]'
+    assert iter_names(text, "selected") == ["\u00e9\n"]
+    with pytest.raises(json.JSONDecodeError):
+        iter_names('{"name": "a"}')
+
+    for text in [
+        '[{"name": "a"}, ]',
+        '[{"name": "a"},\n]\n',
+        '[{"name": "a"}] x',
+        '[{"name": "a"}]\n\n[]',
+        '[{"name": "a"}',
+        '[{"name": "a"} {"name": "b"}]',
+        '[{"name": tru}, {"name": "b"}]',
+        '[{"name": "a\n"}]',
+    ]:
+        with pytest.raises(json.JSONDecodeError):
+            iter_names(text)
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(text)
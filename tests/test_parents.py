@@ -0,0 +1,53 @@
+import pytest
+import numpy as np
+
+pytest.importorskip("casm.xtal")
+
+import casmam.xtal.xtal as casmamxtal  # noqa: E402
+import casmam.mapping.parents as casmamparents  # noqa: E402
+
+
+def write_simple_cubic_poscar(path, n_cells):
+    frac_coords = "\n".join(str(i / n_cells) + " 0.0 0.0" for i in range(n_cells))
+    with open(path, "w") as f:
+        f.write(
+            "Al\n1.0\n"
+            + str(3.0 * n_cells)
+            + " 0.0 0.0\n0.0 3.0 0.0\n0.0 0.0 3.0\nAl\n"
+            + str(n_cells)
+            + "\ndirect\n"
+            + frac_coords
+            + "\n"
+        )
+
+
+def test_group_equivalent_parents_groups_supercells(tmp_path, monkeypatch):
+    poscar_paths = [
+        str(tmp_path / name)
+        for name in ["sc2.vasp", "sc.vasp", "a.vasp", "sc3.vasp", "sc6.vasp"]
+    ]
+    for poscar_path, n_cells in zip(poscar_paths, [2, 1, 1, 3, 6]):
+        write_simple_cubic_poscar(poscar_path, n_cells)
+    parent_library = casmamparents.ParentLibrary.from_poscars(poscar_paths)
+    assert list(parent_library.n_sites) == [2, 1, 1, 3, 6]
+
+    # every parent is the same crystal, only the number of sites differs
+    monkeypatch.setattr(
+        casmamxtal,
+        "make_primitive_structure_info",
+        lambda lattice, frac_coords, atom_types, tol: (
+            np.eye(3),
+            np.zeros((3, 1)),
+            ["A"],
+        ),
+    )
+    monkeypatch.setattr(casmamxtal, "are_equivalent_structures", lambda a, b, tol: True)
+
+    # the representative has the fewest sites
+    assert casmamparents.group_equivalent_parents(parent_library) == [[1, 0, 2, 3, 4]]
+    # supercells are only grouped with a cell whose number of sites
+    # divides theirs
+    assert casmamparents.group_equivalent_parents(parent_library.select([0, 3, 4])) == [
+        [0, 2],
+        [1],
+    ]
@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+import casmam.mapping.prefilter as casmamprefilter
+
+
+def test_prefilter_pairs():
+    child_descriptors = {
+        "n_sites": np.array([4, 3]),
+        "coordination_number": np.array([12.0, 8.0]),
+    }
+    parent_descriptors = {
+        "n_sites": np.array([1, 2, 4]),
+        "coordination_number": np.array([12.0, 8.0, 11.0]),
+    }
+
+    assert casmamprefilter.prefilter_pairs(child_descriptors, parent_descriptors).all()
+    assert np.array_equal(
+        casmamprefilter.prefilter_pairs(child_descriptors, parent_descriptors, "safe"),
+        [[True, True, True], [True, False, False]],
+    )
+    assert np.array_equal(
+        casmamprefilter.prefilter_pairs(
+            child_descriptors, parent_descriptors, "heuristic"
+        ),
+        [[True, False, True], [False, False, False]],
+    )
+    with pytest.raises(RuntimeError):
+        casmamprefilter.prefilter_pairs(child_descriptors, parent_descriptors, "fast")
+
+
+def test_get_mean_coordination_numbers():
+    fcc_conventional = (
+        np.eye(3),
+        0.5 * np.array([[0, 1, 1, 0], [0, 1, 0, 1], [0, 0, 1, 1]]),
+    )
+    structures = [
+        (2.0 * np.eye(3), np.zeros((3, 1))),
+        (np.array([[-1, 1, 1], [1, -1, 1], [1, 1, -1]]) / 2, np.zeros((3, 1))),
+        fcc_conventional,
+        (np.array([[0, 1, 1], [1, 0, 1], [1, 1, 0]]) / 2, np.zeros((3, 1))),
+        # a site outside the unit cell
+        (
+            fcc_conventional[0],
+            fcc_conventional[1] + [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 2]],
+        ),
+    ]
+    lattices, frac_coords = zip(*structures)
+
+    coordination_numbers = casmamprefilter.get_mean_coordination_numbers(
+        lattices, frac_coords
+    )
+
+    # the second shell of bcc is within the default shell tolerance
+    assert np.array_equal(coordination_numbers, [6, 14, 12, 12, 12])
+    assert [
+        casmamprefilter.get_mean_coordination_number(*structure)
+        for structure in structures
+    ] == list(coordination_numbers)
+    # in batches of a single site
+    assert np.array_equal(
+        casmamprefilter.get_mean_coordination_numbers(
+            lattices, frac_coords, max_distances=1
+        ),
+        coordination_numbers,
+    )
@@ -0,0 +1,90 @@
+import os
+import time
+import pytest
+import numpy as np
+import casmam.mapping.scheduling as casmamscheduling
+
+
+def test_longest_first_order_by_child_keeps_pairs_of_a_child_together():
+    pair_costs = np.array([[1.0, 5.0, 0.0], [9.0, 2.0, 3.0], [0.0, 0.0, 4.0]])
+
+    pairs = [
+        divmod(int(pair_index), 3)
+        for pair_index in casmamscheduling.longest_first_order_by_child(pair_costs)
+    ]
+
+    assert pairs == [
+        (1, 0),
+        (1, 2),
+        (1, 1),
+        (0, 1),
+        (0, 0),
+        (0, 2),
+        (2, 2),
+        (2, 0),
+        (2, 1),
+    ]
+
+
+def test_batch_pairs_by_child_splits_children_without_mixing_them():
+    pair_costs = np.array([[1.0, 5.0, 0.0], [9.0, 2.0, 3.0], [0.0, 0.0, 4.0]])
+
+    batches = casmamscheduling.batch_pairs_by_child(pair_costs, 2)
+
+    assert [(child_index, list(parents)) for child_index, parents in batches] == [
+        (1, [0, 2]),
+        (1, [1]),
+        (0, [1, 0]),
+        (2, [2]),
+    ]
+
+
+def test_count_supercells():
+    # number of sublattices of index n of a three dimensional lattice
+    assert [casmamscheduling.count_supercells(volume) for volume in range(1, 9)] == [
+        1,
+        7,
+        13,
+        35,
+        31,
+        91,
+        57,
+        155,
+    ]
+
+
+def test_partition_into_shards():
+    costs = np.array([5.0, 1.0, 4.0, 3.0, 3.0, 2.0, 0.0])
+
+    shard_indices = casmamscheduling.partition_into_shards(costs, 3)
+
+    loads = np.bincount(shard_indices, weights=costs, minlength=3)
+    assert list(loads) == [6.0, 6.0, 6.0]
+    assert np.array_equal(
+        shard_indices, casmamscheduling.partition_into_shards(costs, 3)
+    )
+    assert np.array_equal(
+        casmamscheduling.partition_into_shards(costs, 1), np.zeros(len(costs))
+    )
+
+
+def test_time_budget_worker_keeps_its_process_until_a_call_times_out():
+    worker = casmamscheduling.TimeBudgetWorker()
+    try:
+        worker_pid = worker.call(os.getpid, 60.0)
+        assert worker_pid != os.getpid()
+        assert worker.call(os.getpid, 60.0) == worker_pid
+
+        with pytest.raises(ZeroDivisionError):
+            worker.call(divmod, 60.0, 1, 0)
+        assert worker.call(os.getpid, 60.0) == worker_pid
+
+        with pytest.raises(TimeoutError):
+            worker.call(time.sleep, 0.1, 60.0)
+        assert worker.call(os.getpid, 60.0) != worker_pid
+
+        with pytest.raises(RuntimeError):
+            worker.call(os._exit, 60.0, 1)
+        assert worker.call(os.getpid, 60.0) != worker_pid
+    finally:
+        worker.stop()
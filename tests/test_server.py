@@ -0,0 +1,42 @@
+import threading
+import pytest
+
+pytest.importorskip("casm.xtal")
+
+import casmam.mapping.server as casmamserver  # noqa: E402
+
+
+@pytest.fixture
+def mapping_client(parent_poscar_path, tmp_path):
+    socket_path = str(tmp_path / "mapping.sock")
+    server = casmamserver.MappingServer(socket_path, [parent_poscar_path], 2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield casmamserver.MappingClient(socket_path, timeout=60)
+
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_server_maps_and_rejects_invalid_requests(mapping_client, child_structure_path):
+    assert len(mapping_client.ping()["parent_paths"]) == 1
+
+    mapping_results = mapping_client.map_child_paths([child_structure_path] * 3)
+    assert len(mapping_results) == 3
+    assert all(results[0][0].is_dummy() for results in mapping_results)
+
+    for request in [
+        {"command": "map", "child_paths": [], "prefilter": "safe", "best_only": False},
+        {"command": "map", "child_paths": ["a"], "prefilter": "x", "best_only": False},
+        {"command": "map", "child_paths": ["a"], "prefilter": "safe"},
+        ["map"],
+    ]:
+        with pytest.raises(RuntimeError):
+            mapping_client.request(request)
+    with pytest.raises(RuntimeError):
+        mapping_client.map_configurations_onto_parent_structures([])
+
+    # the server still answers after invalid requests
+    assert len(mapping_client.ping()["parent_paths"]) == 1
@@ -0,0 +1,41 @@
+import pytest
+import numpy as np
+
+pytest.importorskip("casm.xtal")
+
+import casmam.mapping.parents as casmamparents  # noqa: E402
+import casmam.mapping.snapshot as casmamsnapshot  # noqa: E402
+
+
+def make_snapshot(child_paths):
+    structure_info = (np.eye(3), np.zeros((3, 1)), ["A"])
+
+    return casmamsnapshot.ChildStructureSnapshot.from_structure_infos(
+        child_paths,
+        [structure_info] * len(child_paths),
+        casmamparents.get_file_signatures(child_paths),
+    )
+
+
+def test_get_n_sites_of_empty_snapshot(child_structure_path, tmp_path):
+    snapshot = make_snapshot([])
+
+    assert snapshot.get_n_sites([]).dtype == int
+    assert len(snapshot.get_n_sites([])) == 0
+    assert list(snapshot.get_n_sites([child_structure_path])) == [-1]
+
+    snapshot.save(str(tmp_path / "empty.snapshot"))
+    loaded = casmamsnapshot.ChildStructureSnapshot.load(
+        str(tmp_path / "empty.snapshot")
+    )
+    assert len(loaded) == 0
+    assert list(loaded.get_n_sites([child_structure_path])) == [-1]
+
+
+def test_get_n_sites(child_structure_path):
+    snapshot = make_snapshot([child_structure_path])
+
+    assert list(snapshot.get_n_sites([child_structure_path, "missing.json"])) == [
+        1,
+        -1,
+    ]
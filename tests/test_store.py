@@ -0,0 +1,39 @@
+import pytest
+import numpy as np
+
+pytest.importorskip("casm.xtal")
+
+import casmam.mapping.mapping as casmammapping  # noqa: E402
+import casmam.mapping.store as casmamstore  # noqa: E402
+
+
+def test_mapping_result_store_round_trip(random_mapping_results, tmp_path):
+    store = casmamstore.MappingResultStore.from_mapping_results(random_mapping_results)
+    store.parent_content_hashes = {"parent_0.vasp": "hash"}
+    store.mapping_options = casmammapping.make_configuration_mapping_options(1)
+    store.save(str(tmp_path / "results.mapping"))
+
+    loaded = casmamstore.MappingResultStore.load(str(tmp_path / "results.mapping"))
+
+    assert loaded.shape == (7, 4)
+    assert loaded.parent_content_hashes == store.parent_content_hashes
+    assert loaded.mapping_options == store.mapping_options
+    for child_index, mapping_results_for_one_child in enumerate(random_mapping_results):
+        for parent_index, (expected,) in enumerate(mapping_results_for_one_child):
+            result = loaded.get_mapping_result(child_index, parent_index)
+            assert result.child_path == expected.child_path
+            assert result.parent_path == expected.parent_path
+            assert result.has_mappings() == expected.has_mappings()
+            for name in casmammapping.MappingResult.__slots__[2:]:
+                assert np.array_equal(
+                    getattr(result, name), getattr(expected, name), equal_nan=True
+                ), name
+
+    mapping_data = casmammapping.organize_mapping_results(random_mapping_results)
+    cost_columns = [key for key in mapping_data if "cost" in key[1]]
+    assert np.array_equal(
+        loaded.to_dataframe()[cost_columns].to_numpy(),
+        mapping_data[cost_columns].to_numpy(),
+        equal_nan=True,
+    )
+    assert loaded.to_dataframe().attrs["mapping_options"] == store.mapping_options